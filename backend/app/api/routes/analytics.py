@@ -0,0 +1,41 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.services.detection_log import get_detection_log
+
+router = APIRouter()
+
+def _log():
+    log = get_detection_log()
+    if log is None:
+        raise HTTPException(status_code=404, detail="Detection log is disabled (DETECTION_LOG=off)")
+    return log
+
+@router.get("/stats")
+def analytics_stats(
+    minutes: Optional[int] = Query(None, ge=1, le=settings.ANALYTICS_WINDOW_MINUTES),
+    user=Depends(get_current_user),
+):
+    """
+    Mask compliance across all sessions over the last `minutes` (default: the
+    whole ANALYTICS_WINDOW_MINUTES window), all-time totals and log counters.
+    """
+    return _log().get_stats(minutes)
+
+@router.get("/sessions/{session_id}")
+def session_analytics(
+    session_id: str,
+    minutes: Optional[int] = Query(None, ge=1, le=settings.ANALYTICS_WINDOW_MINUTES),
+    series: bool = Query(False, description="Include per-minute buckets"),
+    tracks: bool = Query(False, description="Include per-track summaries"),
+    user=Depends(get_current_user),
+):
+    """
+    Mask compliance of one tracker session: faces, mask ratio, unique tracked
+    people and new tracks over the window, optionally per minute and per track.
+    """
+    stats = _log().session_stats(session_id, minutes, series=series, tracks=tracks)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No frames of this session in the analytics window")
+    return stats
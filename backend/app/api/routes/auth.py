@@ -1,23 +1,11 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, validator
-from passlib.context import CryptContext
 from datetime import timedelta
-from app.core.security import create_access_token
-import json, os
+from app.core.security import create_access_token, hash_password, verify_password
+from app.services.user_store import UserExists, get_user_store
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-USERS_FILE = "users.json"
-
-def load_users():
-    if not os.path.exists(USERS_FILE):
-        return {}
-    with open(USERS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_users(users):
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
 
 class RegisterIn(BaseModel):
     username: str
@@ -44,29 +32,25 @@ class TokenOut(BaseModel):
     token_type: str = "bearer"
 
 @router.post("/register", response_model=dict)
-def register(data: RegisterIn):
-    users = load_users()
-    if data.username in users:
+async def register(data: RegisterIn):
+    store = get_user_store()
+    if await run_in_threadpool(store.exists, data.username):
         raise HTTPException(status_code=400, detail="User already exists")
     
-    # Truncate password to 72 bytes for bcrypt
-    password_bytes = data.password.encode('utf-8')[:72]
-    hashed = pwd_context.hash(password_bytes.decode('utf-8'))
-    
-    users[data.username] = {"password": hashed}
-    save_users(users)
+    hashed = await hash_password(data.password)
+    try:
+        await run_in_threadpool(store.create, data.username, hashed)
+    except UserExists:
+        raise HTTPException(status_code=400, detail="User already exists")
     return {"msg": "registered"}
 
 @router.post("/login", response_model=TokenOut)
-def login(data: RegisterIn):
-    users = load_users()
-    if data.username not in users:
+async def login(data: RegisterIn):
+    hashed = await run_in_threadpool(get_user_store().get_password_hash, data.username)
+    if hashed is None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Truncate password to 72 bytes for bcrypt
-    password_bytes = data.password.encode('utf-8')[:72]
-    
-    if not pwd_context.verify(password_bytes.decode('utf-8'), users[data.username]["password"]):
+    if not await verify_password(data.password, hashed):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token({"sub": data.username}, expires_delta=timedelta(minutes=60))
@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.services.inference_executor import get_inference_executor
+from app.services.model_registry import get_model_registry
+
+router = APIRouter()
+
+@router.get("/live")
+def live():
+    """The process is up and serving; does not depend on the models."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+def ready():
+    """Ready once the models are loaded and warmed up (and, in workers mode, a worker is ready)."""
+    registry = get_model_registry()
+    if settings.MODEL_PRELOAD:
+        # Retries a failed load once its backoff has passed; no-op while loading or ready
+        registry.start()
+    status = registry.status()
+    # Without preloading, models load on the first inference request
+    is_ready = status["ready"] or not settings.MODEL_PRELOAD
+
+    if settings.INFERENCE_EXECUTOR == "workers":
+        pool = get_inference_executor().worker_pool
+        status["workers_ready"] = sum(1 for w in pool.workers if w.ready)
+        is_ready = is_ready and status["workers_ready"] > 0
+
+    status["ready"] = is_ready
+    return JSONResponse(status, status_code=200 if is_ready else 503)
@@ -0,0 +1,58 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.core.config import settings
+from app.core.security import get_token_cache
+from app.services.batch_scheduler import get_batch_scheduler
+from app.services.detection_log import get_detection_log
+from app.services.inference_executor import get_inference_executor
+from app.services.model_registry import get_model_registry
+from app.services.result_cache import get_result_cache
+from app.services.tracker_manager import get_session_manager
+from app.utils.metrics import registry
+
+router = APIRouter()
+
+def _cache_counter(name: str):
+    cache = get_result_cache()
+    return getattr(cache, name) if cache is not None else None
+
+def _detection_log_counter(name: str):
+    log = get_detection_log()
+    return getattr(log, name) if log is not None else None
+
+def _token_cache_counter(name: str):
+    cache = get_token_cache()
+    return getattr(cache, name) if cache is not None else None
+
+# Gauges are read at scrape time, nothing is updated on the request path
+registry.gauge("facemask_tracker_sessions", "Active tracker sessions",
+               lambda: get_session_manager().get_session_count())
+registry.gauge("facemask_inference_in_flight", "Inferences currently running",
+               lambda: get_inference_executor().in_flight)
+registry.gauge("facemask_inference_waiting", "Requests waiting for an inference slot",
+               lambda: get_inference_executor().waiting)
+registry.gauge("facemask_inference_rejected_total", "Requests rejected with 503 by admission control",
+               lambda: get_inference_executor().rejected, kind="counter")
+registry.gauge("facemask_batch_queue_depth", "Frames waiting for the next batch",
+               lambda: get_batch_scheduler().queue_depth() if settings.BATCH_ENABLED else None)
+registry.gauge("facemask_result_cache_hits_total", "Result cache hits",
+               lambda: _cache_counter("hits"), kind="counter")
+registry.gauge("facemask_result_cache_misses_total", "Result cache misses",
+               lambda: _cache_counter("misses"), kind="counter")
+registry.gauge("facemask_token_cache_hits_total", "Requests authenticated from the verified-token cache",
+               lambda: _token_cache_counter("hits"), kind="counter")
+registry.gauge("facemask_token_cache_misses_total", "Requests whose token signature was verified",
+               lambda: _token_cache_counter("misses"), kind="counter")
+registry.gauge("facemask_detection_log_dropped_total", "Results not logged because the writer fell behind",
+               lambda: _detection_log_counter("dropped"), kind="counter")
+registry.gauge("facemask_detection_log_rows_total", "Detection rows written to log segments",
+               lambda: _detection_log_counter("rows"), kind="counter")
+registry.gauge("facemask_detection_log_pending", "Results queued for the detection log writer",
+               lambda: _detection_log_counter("pending"))
+registry.gauge("facemask_models_ready", "1 once the models are loaded and warmed up",
+               lambda: int(get_model_registry().is_ready()))
+
+@router.get("/metrics")
+def metrics():
+    """Prometheus text exposition of all metrics."""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
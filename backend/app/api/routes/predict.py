@@ -1,28 +1,279 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, WebSocket, WebSocketDisconnect, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from app.core.security import get_current_user
+from typing import Callable, List, Optional
+import asyncio
+import base64
+import functools
+import json
+import logging
+import tempfile
+import time
+import uuid
+from app.core.config import settings
+from app.core.security import get_current_user, verify_token
 from app.services import ai_service, minio_service
+from app.services.batch_scheduler import get_batch_scheduler
+from app.services.bulk_predict import stream_ndjson, stream_predictions
+from app.services.detection import DetectOptions, parse_detect_options
+from app.services.detection_log import record_detections
+from app.services.inference_executor import ExecutorSaturated, get_inference_executor
+from app.services.model_registry import ModelNotReady
+from app.services.render import BINARY_MODES, RenderOptions, detections_header, render_async
+from app.services.result_cache import HASH_METADATA_KEY, ResultCache, content_hash, get_result_cache
+from app.services.tracker_manager import DETECT_MODES, get_session_manager
+from app.services.worker_pool import WorkerUnavailable
+from app.utils.metrics import observe_prediction
+from app.utils.timing import server_timing_header
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class PredictIn(BaseModel):
     object_name: str
+    response_mode: str = "json"
+    quality: Optional[int] = None
+    max_side: Optional[int] = None
+    detect_max_side: Optional[int] = None
+    min_face_size: Optional[int] = None
+    roi: Optional[str] = None
+
+def _render_options(response_mode: str, quality: Optional[int], max_side: Optional[int]) -> RenderOptions:
+    try:
+        return RenderOptions(mode=response_mode, quality=quality, max_side=max_side)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _detect_options(detect_max_side: Optional[int], min_face_size: Optional[int],
+                    roi: Optional[str]) -> Optional[DetectOptions]:
+    try:
+        return parse_detect_options(detect_max_side, min_face_size, roi)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _check_detect_mode(detect_mode: Optional[str]):
+    if detect_mode and detect_mode not in DETECT_MODES:
+        raise HTTPException(status_code=400, detail=f"detect_mode must be one of {', '.join(DETECT_MODES)}")
+
+async def _run_prediction(data: bytes, session_id: Optional[str], return_image: bool,
+                          detect_mode: Optional[str] = None, detect_options: Optional[DetectOptions] = None):
+    """Run a prediction on the inference executor; returns (result, decoded frame or None, stage timings)."""
+    executor = get_inference_executor()
+    try:
+        if session_id:
+            # Use tracking-enabled detection
+            (result, image), stages = await executor.run_timed(
+                ai_service.predict_from_bytes_with_tracking, data, session_id,
+                return_image=return_image, detect_mode=detect_mode, detect_options=detect_options, stateful=True
+            )
+            return result, image, stages
+        # Use stateless detection
+        return await executor.predict_stateless(data, return_image=return_image, detect_options=detect_options)
+    except (ExecutorSaturated, WorkerUnavailable, ModelNotReady) as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{e}, retry later",
+            headers={"Retry-After": str(getattr(e, "retry_after", executor.retry_after))},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _cache_call(cache: ResultCache, fn, *args):
+    """Memory-tier cache calls run inline; with a disk tier they go to the threadpool."""
+    if cache.disk_dir:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+def _affinity(session_id: str) -> dict:
+    """Worker that served the session and the one it hashes to (sticky routing hint)."""
+    manager = get_session_manager()
+    return {"worker": manager.worker_id, "preferred_worker": manager.preferred_worker(session_id)}
+
+def _affinity_headers(session_id: Optional[str]) -> dict:
+    if not session_id:
+        return {}
+    affinity = _affinity(session_id)
+    headers = {"X-Worker-Id": affinity["worker"]}
+    if affinity["preferred_worker"]:
+        headers["X-Session-Affinity"] = affinity["preferred_worker"]
+    return headers
+
+def _build_response(result: dict, encoded: Optional[bytes], options: RenderOptions, stages: dict,
+                    wrap: Optional[Callable[[dict], dict]] = None, session_id: Optional[str] = None) -> Response:
+    headers = {"Server-Timing": server_timing_header(stages)} if settings.SERVER_TIMING_ENABLED else {}
+    headers.update(_affinity_headers(session_id))
+    if encoded is not None:
+        detections = detections_header(result)
+        if detections is not None:
+            headers["X-Detections"] = detections
+            return Response(content=encoded, media_type=BINARY_MODES[options.mode], headers=headers)
+        # Too many detections for a header: answer in JSON with the image embedded
+        result = {**result, "image_base64": base64.b64encode(encoded).decode("utf-8"),
+                  "image_media_type": BINARY_MODES[options.mode]}
+    return JSONResponse(wrap(result) if wrap else result, headers=headers)
+
+async def _predict_response(endpoint: str, data, session_id: Optional[str], options: RenderOptions,
+                            wrap: Optional[Callable[[dict], dict]] = None,
+                            detect_mode: Optional[str] = None,
+                            digest: Optional[str] = None,
+                            detect_options: Optional[DetectOptions] = None) -> Response:
+    """
+    Predict, then annotate/encode on the render pool according to the response mode.
+    
+    Stateless predictions are served from the result cache when the same
+    image bytes were answered before with the same models and options.
+    Binary modes return the image as the body and the detections as the
+    X-Detections header (JSON with the image embedded when the detections
+    do not fit in DETECTIONS_HEADER_MAX_BYTES); all other modes return JSON.
+    
+    Args:
+        endpoint: Endpoint name for metrics
+        data: Image bytes, or a coroutine function returning them (only awaited when needed)
+        digest: Precomputed content hash of the image (e.g. from MinIO metadata)
+        detect_options: Detection resolution, ROI and minimum face size; with a
+            session they become the session's options
+    """
+    started = time.perf_counter()
+    cache = None if session_id else get_result_cache()
+    key = None
+    if cache is not None:
+        if digest is None:
+            if callable(data):
+                data = await data()
+            digest = await run_in_threadpool(content_hash, data)
+        key = cache.make_key(digest, options, detect_options)
+        cached = await _cache_call(cache, cache.get, key)
+        if cached is not None:
+            stages = {"cache": (time.perf_counter() - started) * 1000.0}
+            stages["total"] = stages["cache"]
+            observe_prediction(endpoint, stages, cached[0], cached=True)
+            # Not logged again: retries and repeated uploads of the same image
+            # would count its faces twice in the compliance aggregates
+            return _build_response(*cached, options, stages, wrap)
+    if callable(data):
+        data = await data()
+    
+    result, image, stages = await _run_prediction(data, session_id, options.needs_image, detect_mode, detect_options)
+
+    render_started = time.perf_counter()
+    try:
+        result, encoded = await render_async(result, image, options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stages["render"] = (time.perf_counter() - render_started) * 1000.0
+
+    if key is not None:
+        size = 256 + 96 * len(result["results"]) + len(result.get("image_base64", "")) + len(encoded or b"")
+        await _cache_call(cache, cache.put, key, (result, encoded), size)
+    stages["total"] = (time.perf_counter() - started) * 1000.0
+    observe_prediction(endpoint, stages, result)
+    record_detections(session_id, result)
+    return _build_response(result, encoded, options, stages, wrap, session_id)
 
 @router.post("/from-minio")
-def predict_from_minio(payload: PredictIn, user=Depends(get_current_user)):
+async def predict_from_minio(payload: PredictIn, user=Depends(get_current_user)):
     object_name = payload.object_name
-    try:
-        local_path = minio_service.download_to_temp(minio_service.settings.MINIO_BUCKET, object_name)
-        result = ai_service.predict_mask(local_path)
-        return {"object_name": object_name, "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    bucket = minio_service.settings.MINIO_BUCKET
+    options = _render_options(payload.response_mode, payload.quality, payload.max_side)
+    detect_options = _detect_options(payload.detect_max_side, payload.min_face_size, payload.roi)
+    
+    digest = None
+    if get_result_cache() is not None:
+        # Objects uploaded through /upload carry their content hash: a cache hit skips the download
+        try:
+            digest = await run_in_threadpool(minio_service.get_metadata, bucket, object_name, HASH_METADATA_KEY)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    async def fetch() -> bytes:
+        try:
+            return await run_in_threadpool(minio_service.get_object_bytes, bucket, object_name)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    return await _predict_response(
+        "from-minio", fetch, None, options, wrap=lambda result: {"object_name": object_name, "result": result},
+        digest=digest, detect_options=detect_options
+    )
+
+class BatchPredictIn(BaseModel):
+    object_names: Optional[List[str]] = None
+    prefix: Optional[str] = None
+    bucket: Optional[str] = None
+    concurrency: Optional[int] = None
+    manifest_name: Optional[str] = None
+
+@router.post("/batch-minio")
+async def predict_batch_minio(payload: BatchPredictIn, user=Depends(get_current_user)):
+    """
+    Predict many stored objects in one request.
+    
+    Objects are given as `object_names` or selected by `prefix`. They are
+    prefetched concurrently and predicted as they arrive; results stream
+    back as NDJSON in completion order, one line per object followed by a
+    summary line. With `manifest_name` the NDJSON is written to that object
+    in the bucket instead and only the summary is returned.
+    
+    Args:
+        payload: Object names or prefix, bucket (default MINIO_BUCKET),
+            concurrency (default BULK_CONCURRENCY) and optional manifest_name
+        user: Authenticated user
+    """
+    if bool(payload.object_names) == (payload.prefix is not None):
+        raise HTTPException(status_code=400, detail="Provide either object_names or prefix")
+    bucket = payload.bucket or minio_service.settings.MINIO_BUCKET
+    concurrency = min(payload.concurrency or settings.BULK_CONCURRENCY, settings.BULK_MAX_CONCURRENCY)
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be positive")
+    
+    if payload.object_names:
+        if len(payload.object_names) > settings.BULK_MAX_OBJECTS:
+            raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_OBJECTS} objects per request")
+        object_names = payload.object_names
+    else:
+        try:
+            object_names = await run_in_threadpool(
+                minio_service.list_object_names, bucket, payload.prefix, settings.BULK_MAX_OBJECTS
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    results = stream_predictions(
+        object_names,
+        functools.partial(minio_service.get_object_bytes, bucket),
+        concurrency=concurrency,
+    )
+    if not payload.manifest_name:
+        return StreamingResponse(stream_ndjson(results), media_type="application/x-ndjson")
+    
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as manifest:
+        summary = None
+        async for line in stream_ndjson(results):
+            manifest.write(line)
+            summary = line
+        length = manifest.tell()
+        manifest.seek(0)
+        try:
+            await run_in_threadpool(
+                minio_service.upload_stream, bucket, payload.manifest_name, manifest, length,
+                "application/x-ndjson",
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return {"manifest_name": payload.manifest_name, "bucket": bucket, **json.loads(summary)}
 
 @router.post("/from-file")
-def predict_from_file(
+async def predict_from_file(
     file: UploadFile = File(...),
     session_id: Optional[str] = Form(None),
+    response_mode: str = Form("base64"),
+    quality: Optional[int] = Form(None),
+    max_side: Optional[int] = Form(None),
+    detect_mode: Optional[str] = Form(None),
+    detect_max_side: Optional[int] = Form(None),
+    min_face_size: Optional[int] = Form(None),
+    roi: Optional[str] = Form(None),
     user=Depends(get_current_user)
 ):
     """
@@ -31,26 +282,35 @@ def predict_from_file(
     Args:
         file: Uploaded image file
         session_id: Optional session ID for tracking (enables BoT-SORT)
+        response_mode: "json", "base64" (default), "preview", "jpeg", "webp" or "png"
+        quality: JPEG/WebP quality for the returned image
+        max_side: Downscale the returned image to this longest side
+        detect_mode: Detection scheduling of the session, "every" or "adaptive"
+        detect_max_side: Downscale the frame to this longest side for detection (default DETECT_MAX_SIDE)
+        min_face_size: Ignore faces smaller than this many pixels (default MIN_FACE_SIZE)
+        roi: JSON list of polygons, vertices as 0-1 fractions of the image size
         user: Authenticated user
         
     Returns:
-        Detection results with drawn image
+        Detection results with the annotated image, either embedded in
+        the JSON or as the binary response body
     """
-    tmp_path = ai_service.save_upload_file_tmp(file)
-    
-    if session_id:
-        # Use tracking-enabled detection
-        result = ai_service.predict_from_image_path_with_tracking(tmp_path, session_id, draw_on_image=True)
-    else:
-        # Use stateless detection
-        result = ai_service.predict_from_image_path(tmp_path, draw_on_image=True)
-    
-    return result
+    options = _render_options(response_mode, quality, max_side)
+    _check_detect_mode(detect_mode)
+    detect_options = _detect_options(detect_max_side, min_face_size, roi)
+    data = await file.read()
+    return await _predict_response(
+        "from-file", data, session_id, options, detect_mode=detect_mode, detect_options=detect_options
+    )
 
 @router.post("/from-file-json")
-def predict_from_file_json(
+async def predict_from_file_json(
     file: UploadFile = File(...),
     session_id: Optional[str] = Form(None),
+    detect_mode: Optional[str] = Form(None),
+    detect_max_side: Optional[int] = Form(None),
+    min_face_size: Optional[int] = Form(None),
+    roi: Optional[str] = Form(None),
     user=Depends(get_current_user)
 ):
     """
@@ -59,18 +319,186 @@ def predict_from_file_json(
     Args:
         file: Uploaded image file
         session_id: Optional session ID for tracking (enables BoT-SORT)
+        detect_mode: Detection scheduling of the session, "every" or "adaptive"
+        detect_max_side: Downscale the frame to this longest side for detection (default DETECT_MAX_SIDE)
+        min_face_size: Ignore faces smaller than this many pixels (default MIN_FACE_SIZE)
+        roi: JSON list of polygons, vertices as 0-1 fractions of the image size
         user: Authenticated user
         
     Returns:
         Detection results as JSON
     """
-    tmp_path = ai_service.save_upload_file_tmp(file)
+    _check_detect_mode(detect_mode)
+    detect_options = _detect_options(detect_max_side, min_face_size, roi)
+    data = await file.read()
+    return await _predict_response(
+        "from-file-json", data, session_id, RenderOptions(mode="json"), detect_mode=detect_mode,
+        detect_options=detect_options
+    )
+
+@router.get("/batching/stats")
+def batching_stats(user=Depends(get_current_user)):
+    """Batch-size and queue-wait metrics of the micro-batching scheduler."""
+    return get_batch_scheduler().get_stats()
+
+@router.get("/executor/stats")
+def executor_stats(user=Depends(get_current_user)):
+    """Load and admission counters of the inference executor."""
+    return get_inference_executor().get_stats()
+
+@router.get("/cache/stats")
+def cache_stats(user=Depends(get_current_user)):
+    """Hit/miss/eviction counters of the content-hash result cache."""
+    cache = get_result_cache()
+    return cache.get_stats() if cache is not None else {"enabled": False}
+
+@router.get("/sessions/stats")
+def sessions_stats(user=Depends(get_current_user)):
+    """Active tracker sessions: estimated memory usage, cache hit ratio and detection rate."""
+    return get_session_manager().get_session_stats()
+
+class _LatestFrame:
+    """
+    Single-slot mailbox between the WebSocket reader and the inference loop.
     
-    if session_id:
-        # Use tracking-enabled detection
-        result = ai_service.predict_from_image_path_with_tracking(tmp_path, session_id, draw_on_image=False)
-    else:
-        # Use stateless detection
-        result = ai_service.predict_from_image_path(tmp_path, draw_on_image=False)
+    A new frame replaces one that has not been picked up yet, so a client
+    sending faster than the server can infer only ever waits for its newest
+    frame instead of building a backlog.
+    """
     
-    return result
+    def __init__(self):
+        self._frame: Optional[bytes] = None
+        self._seq = 0
+        self._event = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+    
+    def put(self, frame: bytes):
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self._seq += 1
+        self._event.set()
+    
+    def close(self):
+        self.closed = True
+        self._event.set()
+    
+    async def get(self):
+        """Wait for the newest frame; returns (seq, frame) or None once closed."""
+        await self._event.wait()
+        if not self.closed:
+            self._event.clear()
+        if self._frame is None:
+            return None
+        frame, self._frame = self._frame, None
+        return self._seq, frame
+
+@router.websocket("/ws")
+async def predict_ws(
+    websocket: WebSocket,
+    token: str = Query(...),
+    session_id: Optional[str] = Query(None),
+    annotate: bool = Query(False),
+    response_mode: Optional[str] = Query(None),
+    quality: Optional[int] = Query(None),
+    max_side: Optional[int] = Query(None),
+    detect_mode: Optional[str] = Query(None),
+    detect_max_side: Optional[int] = Query(None),
+    min_face_size: Optional[int] = Query(None),
+    roi: Optional[str] = Query(None),
+):
+    """
+    Live inference over a persistent WebSocket.
+    
+    The client authenticates once with `token` (the JWT from /auth/login),
+    then sends encoded frames (JPEG/PNG) as binary messages. Each processed
+    frame is answered with a JSON detection message; with a binary
+    response mode (jpeg/webp/png) the annotated image follows as a binary
+    message, with base64/preview it is embedded in the JSON. Frames that
+    arrive while the previous one is still being processed are dropped,
+    newest wins.
+    
+    Args:
+        token: JWT access token
+        session_id: Tracker session to bind to (generated if omitted)
+        annotate: Shorthand for response_mode=jpeg
+        response_mode: See app.services.render (default "json")
+        quality: JPEG/WebP quality for returned images
+        max_side: Downscale returned images to this longest side
+        detect_mode: Detection scheduling of the session, "every" or "adaptive"
+        detect_max_side, min_face_size, roi: Detection options of the session, see /from-file
+    """
+    try:
+        verify_token(token)
+        _check_detect_mode(detect_mode)
+        options = RenderOptions(mode=response_mode or ("jpeg" if annotate else "json"),
+                                quality=quality, max_side=max_side)
+        detect_options = parse_detect_options(detect_max_side, min_face_size, roi)
+    except (HTTPException, ValueError):
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    session_id = session_id or uuid.uuid4().hex
+    await websocket.send_json({"type": "session", "session_id": session_id, **_affinity(session_id)})
+    
+    slot = _LatestFrame()
+    
+    async def reader():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    slot.put(message["bytes"])
+        except WebSocketDisconnect:
+            pass
+        finally:
+            slot.close()
+    
+    reader_task = asyncio.create_task(reader())
+    try:
+        while True:
+            item = await slot.get()
+            if item is None:
+                if slot.closed:
+                    break
+                continue
+            seq, frame = item
+            
+            try:
+                (result, image), stages = await get_inference_executor().run_timed(
+                    ai_service.predict_from_bytes_with_tracking,
+                    frame, session_id, return_image=options.needs_image, detect_mode=detect_mode,
+                    detect_options=detect_options, stateful=True
+                )
+                # Encode on the render pool, outside the inference slot
+                render_started = time.perf_counter()
+                result, encoded = await render_async(result, image, options)
+                stages["render"] = (time.perf_counter() - render_started) * 1000.0
+                stages["total"] += stages["render"]
+                observe_prediction("ws", stages, result)
+                record_detections(session_id, result)
+            except (ExecutorSaturated, WorkerUnavailable, ModelNotReady):
+                # Server is saturated or still loading: drop this frame, the client keeps streaming
+                slot.dropped += 1
+                continue
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "frame": seq, "detail": str(e)})
+                continue
+            except Exception as e:
+                # One bad frame must not end the stream
+                logger.exception("WebSocket session %s: frame %d failed", session_id, seq)
+                await websocket.send_json({"type": "error", "frame": seq, "detail": f"Internal error: {type(e).__name__}"})
+                continue
+            
+            result.update({"type": "result", "frame": seq, "dropped": slot.dropped})
+            await websocket.send_json(result)
+            if encoded is not None:
+                await websocket.send_bytes(encoded)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader_task.cancel()
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, File, UploadFile, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.core.security import get_current_user
 from app.services.minio_service import minio_client, upload_fileobj, settings as minio_settings
+from app.services.result_cache import HASH_METADATA_KEY, hash_fileobj
 import uuid
 
 router = APIRouter()
@@ -11,8 +13,14 @@ async def upload_file(file: UploadFile = File(...), user=Depends(get_current_use
     ext = file.filename.split(".")[-1] if "." in file.filename else "bin"
     object_name = f"{uuid.uuid4().hex}.{ext}"
     try:
-        # file.file is a SpooledTemporaryFile; we can pass to minio client
-        upload_fileobj(minio_settings.MINIO_BUCKET, object_name, file.file)
+        # Stored with the object so /predict/from-minio can hit the result cache without downloading it
+        digest = await run_in_threadpool(hash_fileobj, file.file)
+        # file.file is a SpooledTemporaryFile; it is streamed part by part on a worker thread
+        await run_in_threadpool(
+            upload_fileobj, minio_settings.MINIO_BUCKET, object_name, file.file,
+            metadata={HASH_METADATA_KEY: digest},
+            content_type=file.content_type or "application/octet-stream",
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    return {"object_name": object_name}
+    return {"object_name": object_name, "content_hash": digest}
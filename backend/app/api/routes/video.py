@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+import os
+import shutil
+import tempfile
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.services import minio_service
+from app.services.detection import parse_detect_options
+from app.services.video_pipeline import get_video_job_manager
+
+router = APIRouter()
+
+def _save_upload(fileobj, suffix: str) -> str:
+    """Copy an uploaded video to a temp file in chunks; OpenCV needs a path."""
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    with tmp:
+        fileobj.seek(0)
+        shutil.copyfileobj(fileobj, tmp, 1024 * 1024)
+    return tmp.name
+
+@router.post("/jobs", status_code=202)
+async def create_video_job(
+    file: Optional[UploadFile] = File(None),
+    object_name: Optional[str] = Form(None),
+    annotate: bool = Form(True),
+    batch_size: Optional[int] = Form(None),
+    detect_max_side: Optional[int] = Form(None),
+    min_face_size: Optional[int] = Form(None),
+    roi: Optional[str] = Form(None),
+    user=Depends(get_current_user)
+):
+    """
+    Start a server-side video job.
+
+    Args:
+        file: Uploaded video, or
+        object_name: Video already stored in MinIO
+        annotate: Also write an annotated video back to MinIO
+        batch_size: Frames per detector call (default VIDEO_BATCH_SIZE)
+        detect_max_side: Downscale frames to this longest side for detection (default DETECT_MAX_SIDE)
+        min_face_size: Ignore faces smaller than this many pixels (default MIN_FACE_SIZE)
+        roi: JSON list of polygons, vertices as 0-1 fractions of the frame size
+        user: Authenticated user
+
+    Returns:
+        The job status; poll GET /video/jobs/{job_id} until it is finished
+    """
+    if (file is None) == (object_name is None):
+        raise HTTPException(status_code=400, detail="Provide either file or object_name")
+    if batch_size is not None and batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    try:
+        detect_options = parse_detect_options(detect_max_side, min_face_size, roi)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if file is not None:
+            suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
+            path = await run_in_threadpool(_save_upload, file.file, suffix)
+            source = file.filename
+        else:
+            path = await run_in_threadpool(
+                minio_service.download_to_temp, minio_service.settings.MINIO_BUCKET, object_name
+            )
+            source = object_name
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    job = get_video_job_manager().submit(
+        path, source, annotate=annotate, batch_size=batch_size or settings.VIDEO_BATCH_SIZE,
+        detect_options=detect_options
+    )
+    return job.to_dict()
+
+@router.get("/jobs")
+def list_video_jobs(user=Depends(get_current_user)):
+    """All known jobs, finished ones are kept for VIDEO_JOB_TTL seconds."""
+    return get_video_job_manager().list()
+
+@router.get("/jobs/{job_id}")
+def get_video_job(job_id: str, user=Depends(get_current_user)):
+    """Status, progress, per-stage fps and outputs of a job."""
+    job = get_video_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}")
+def cancel_video_job(job_id: str, user=Depends(get_current_user)):
+    """Cancel a queued or running job."""
+    manager = get_video_job_manager()
+    if not manager.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return manager.get(job_id).to_dict()
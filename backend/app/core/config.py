@@ -5,14 +5,162 @@ class Settings(BaseSettings):
     MINIO_ACCESS_KEY: str
     MINIO_SECRET_KEY: str
     MINIO_BUCKET: str = "uploads"
+    MINIO_POOL_SIZE: int = 32
+    MINIO_PART_SIZE: int = 8 * 1024 * 1024  # multipart upload part size (>= 5 MiB)
+
+    # Bulk prediction over MinIO objects (/predict/batch-minio)
+    BULK_CONCURRENCY: int = 8
+    BULK_MAX_CONCURRENCY: int = 32
+    BULK_MAX_OBJECTS: int = 10000
 
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Verified tokens are trusted for TOKEN_CACHE_TTL seconds without
+    # re-checking the signature (0 disables the cache)
+    TOKEN_CACHE_TTL: float = 30.0
+    TOKEN_CACHE_SIZE: int = 4096
+
+    # User accounts (SQLite); an existing USERS_FILE is imported once
+    USER_DB_PATH: str = "users.db"
+    USERS_FILE: str = "users.json"
+    USER_CACHE_SIZE: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4
 
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8000
 
+    # Per-request Server-Timing headers with the stage durations
+    SERVER_TIMING_ENABLED: bool = True
+
+    # Inference backend: "native" (Ultralytics + Keras), "onnx" (ONNX Runtime) or "stub"
+    INFERENCE_BACKEND: str = "native"
+    YOLO_WEIGHTS: str = "yolov8n-face.pt"
+    MASK_MODEL_PATH: str = ""  # default: model/model.h5
+    ONNX_DETECTOR_PATH: str = ""  # default: model/yolov8n-face.onnx
+    ONNX_CLASSIFIER_PATH: str = ""  # default: model/model.onnx
+    ONNX_INT8_CLASSIFIER_PATH: str = ""  # default: model/model_int8.onnx
+    MASK_CLASSIFIER: str = ""  # "keras", "onnx", "onnx-int8"; empty = follow INFERENCE_BACKEND
+    ONNX_PROVIDERS: str = "CPUExecutionProvider"
+    ONNX_THREADS: int = 0  # 0 = ONNX Runtime default
+
+    # INFERENCE_BACKEND=stub: synthetic faces after a fixed delay (load tests, no weights)
+    STUB_FACES: int = 2
+    STUB_DETECT_MS: float = 8.0  # per detector call
+    STUB_DETECT_IMAGE_MS: float = 2.0  # per frame in the call
+    STUB_CLASSIFY_MS: float = 0.5  # per face
+
+    # Background model loading and warm-up (see /health/ready)
+    MODEL_PRELOAD: bool = True
+    MODEL_WAIT_TIMEOUT: float = 10.0
+    MODEL_RETRY_BACKOFF: float = 5.0  # seconds before retrying a failed load, doubled per failure
+    MODEL_RETRY_MAX_BACKOFF: float = 300.0
+    WARMUP_BATCH_SIZES: str = "1,8"
+
+    # Cross-request micro-batching for stateless predictions
+    BATCH_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 10.0
+
+    # Large JPEGs are decoded at 1/2, 1/4 or 1/8 resolution while the
+    # longer side stays >= this value (0 disables reduced decoding)
+    DECODE_MAX_SIDE: int = 0
+
+    # Detector input: frames are downscaled so the longer side is at most
+    # DETECT_MAX_SIDE before detection (0 = full resolution); faces are
+    # still classified from full-resolution crops. Faces smaller than
+    # MIN_FACE_SIZE pixels are ignored.
+    DETECT_MAX_SIDE: int = 0
+    MIN_FACE_SIZE: int = 0
+
+    # Dedicated inference executor with admission control. Keep
+    # INFERENCE_WORKERS >= BATCH_MAX_SIZE so batches can fill up.
+    INFERENCE_EXECUTOR: str = "thread"  # "thread", "process" or "workers"
+    INFERENCE_WORKERS: int = 8
+    INFERENCE_MAX_IN_FLIGHT: int = 0  # 0 = same as INFERENCE_WORKERS
+    INFERENCE_MAX_QUEUE: int = 32
+    INFERENCE_QUEUE_TIMEOUT: float = 5.0
+    INFERENCE_RETRY_AFTER: int = 1
+
+    # Multi-process worker pool (INFERENCE_EXECUTOR=workers)
+    WORKER_POOL_SIZE: int = 0  # 0 = one worker per CPU
+    WORKER_THREADS: int = 1
+    WORKER_PIN_CPUS: bool = False
+    WORKER_SLOT_BYTES: int = 3840 * 2160 * 3
+    WORKER_SLOTS_PER_WORKER: int = 2
+    WORKER_HEARTBEAT_TIMEOUT: float = 30.0
+
+    # Annotated-image responses (see app/services/render.py)
+    RENDER_WORKERS: int = 2
+    PREVIEW_MAX_SIDE: int = 640
+    PREVIEW_QUALITY: int = 70
+    DETECTIONS_HEADER_MAX_BYTES: int = 6144  # X-Detections of binary modes; larger results answer in JSON
+    PNG_COMPRESSION: int = 1
+
+    # Content-hash cache of stateless prediction responses
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_MAX_MB: int = 256
+    RESULT_CACHE_TTL: float = 3600.0
+    RESULT_CACHE_DIR: str = ""  # optional disk tier
+
+    # Server-side video jobs (/video/jobs)
+    VIDEO_MAX_CONCURRENT_JOBS: int = 1
+    VIDEO_BATCH_SIZE: int = 8
+    VIDEO_QUEUE_SIZE: int = 32
+    VIDEO_JOB_TTL: int = 3600
+    VIDEO_OUTPUT_PREFIX: str = "videos/"
+    VIDEO_CODEC: str = "mp4v"
+
+    # Per-session tracker pool
+    TRACKER_CONFIG: str = "botsort.yaml"
+    TRACKER_FRAME_RATE: int = 30
+    TRACKER_MAX_SESSIONS: int = 500
+    TRACKER_SESSION_TIMEOUT: int = 300
+    TRACK_STALE_FRAMES: int = 90  # drop a track's label history after this many frames unseen
+
+    # Shared tracker sessions for several workers/replicas: "local" (in
+    # process), "memory" or "redis" (SESSION_STORE_URL). WORKER_ID names
+    # this worker (default host-pid); SESSION_WORKERS lists all workers
+    # for consistent-hash affinity hints. Snapshots are signed with a key
+    # derived from SESSION_STORE_SECRET, required (and the same on every
+    # worker) unless SESSION_STORE=local; keep it distinct from JWT_SECRET_KEY.
+    SESSION_STORE: str = "local"
+    SESSION_STORE_URL: str = "redis://localhost:6379/0"
+    SESSION_STORE_SECRET: str = ""
+    SESSION_SYNC_INTERVAL: int = 1  # frames between snapshot writes
+    WORKER_ID: str = ""
+    SESSION_WORKERS: str = ""
+
+    # Track-level classification cache (reuse smoothed labels of stable tracks)
+    TRACK_CACHE_ENABLED: bool = True
+    TRACK_CACHE_MAX_AGE: int = 10
+    TRACK_CACHE_MIN_HISTORY: int = 3
+    TRACK_CACHE_MIN_CONFIDENCE: float = 0.8
+    TRACK_CACHE_CONFIDENCE_DECAY: float = 0.98
+    TRACK_CACHE_MAX_SCALE_CHANGE: float = 0.3
+
+    # Detection scheduling for tracked sessions: "every" frame, or "adaptive"
+    # (full detection every K frames or on motion, Kalman-propagated boxes in
+    # between; K grows on static scenes and under load)
+    TRACK_DETECT_MODE: str = "every"
+    TRACK_DETECT_MIN_INTERVAL: int = 1
+    TRACK_DETECT_MAX_INTERVAL: int = 8
+    TRACK_DETECT_MOTION_THRESHOLD: float = 6.0
+
+    # Detection log (every served face as a row) and windowed compliance
+    # aggregates: "off", "memory" (aggregates only), "local" (segments in
+    # DETECTION_LOG_DIR) or "minio" (segments under DETECTION_LOG_PREFIX)
+    DETECTION_LOG: str = "memory"
+    DETECTION_LOG_DIR: str = "detection_log"
+    DETECTION_LOG_PREFIX: str = "detections/"
+    DETECTION_LOG_FORMAT: str = "parquet"  # npz when pyarrow is not installed
+    DETECTION_LOG_SEGMENT_ROWS: int = 250000
+    DETECTION_LOG_FLUSH_SECONDS: float = 60.0
+    DETECTION_LOG_MAX_PENDING: int = 10000  # results queued for the writer before dropping
+    ANALYTICS_WINDOW_MINUTES: int = 60
+    ANALYTICS_MAX_SESSIONS: int = 1000
+
     class Config:
         env_file = "../.env"
         env_file_encoding = 'utf-8'
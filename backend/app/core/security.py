@@ -1,10 +1,18 @@
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import threading
+import time
 from jose import jwt, JWTError
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from passlib.context import CryptContext
 from app.core.config import settings
 
 security = HTTPBearer()
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -16,14 +24,127 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+class TokenCache:
+    """
+    LRU of verified token payloads.
+
+    A webcam client sends the same token with every frame; a cached entry
+    skips the signature check and claim parsing. Entries live for at most
+    `ttl` seconds and never past the token's own expiry. Only successfully
+    verified tokens are cached.
+
+    Attributes:
+        max_entries: Tokens kept
+        ttl: Seconds a verified token is trusted without re-checking
+        hits, misses: Lookup counters
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 30.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if now < entry[0]:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, payload: dict):
+        expires_at = time.time() + self.ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._entries[token] = (expires_at, payload)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+_token_cache: Optional[TokenCache] = None
+_token_cache_lock = threading.Lock()
+
+def get_token_cache() -> Optional[TokenCache]:
+    """Get the global verified-token cache, or None when TOKEN_CACHE_TTL is 0."""
+    global _token_cache
+    if settings.TOKEN_CACHE_TTL <= 0:
+        return None
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+    return _token_cache
+
 def verify_token(token: str):
+    cache = get_token_cache()
+    if cache is not None:
+        payload = cache.get(token)
+        if payload is not None:
+            return payload
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if cache is not None:
+        cache.put(token, payload)
+    return payload
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     payload = verify_token(token)
     return payload  # here payload could contain 'sub' = username / user_id
+
+# bcrypt is deliberately slow (~100+ ms); it runs on a small dedicated pool so
+# logins neither block the event loop nor crowd out the default threadpool
+_password_executor: Optional[ThreadPoolExecutor] = None
+_password_executor_lock = threading.Lock()
+
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        with _password_executor_lock:
+            if _password_executor is None:
+                _password_executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.PASSWORD_HASH_WORKERS), thread_name_prefix="password-hash"
+                )
+    return _password_executor
+
+def _bcrypt_input(password: str) -> str:
+    # bcrypt only uses the first 72 bytes
+    return password.encode("utf-8")[:72].decode("utf-8", "ignore")
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), pwd_context.hash, _bcrypt_input(password))
+
+async def verify_password(password: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_password_executor(), pwd_context.verify, _bcrypt_input(password), hashed
+    )
@@ -1,7 +1,14 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import auth, upload, predict
+from app.api.routes import auth, upload, predict, health, video, metrics, analytics
 from app.core.logger import setup_logging
+from app.core.config import settings
+from app.services import minio_service
+from app.services.detection_log import get_detection_log, shutdown_detection_log
+from app.services.inference_executor import get_inference_executor, shutdown_inference_executor
+from app.services.model_registry import get_model_registry
+from app.services.video_pipeline import shutdown_video_jobs
 
 setup_logging()
 
@@ -18,6 +25,26 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(upload.router, prefix="/upload", tags=["upload"])
 app.include_router(predict.router, prefix="/predict", tags=["predict"])
+app.include_router(health.router, prefix="/health", tags=["health"])
+app.include_router(video.router, prefix="/video", tags=["video"])
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(metrics.router, tags=["metrics"])
+
+@app.on_event("startup")
+def startup():
+    # Models load and warm up in the background; /auth and /upload serve right away
+    if settings.MODEL_PRELOAD:
+        get_model_registry().start()
+    # Sync startup handlers run on the event loop thread; video jobs submit through it
+    get_inference_executor().bind_loop(asyncio.get_running_loop())
+    get_detection_log()
+    minio_service.init_buckets([settings.MINIO_BUCKET])
+
+@app.on_event("shutdown")
+def shutdown():
+    shutdown_video_jobs()
+    shutdown_inference_executor()
+    shutdown_detection_log()
 
 @app.get("/")
 def root():
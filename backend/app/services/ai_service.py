@@ -1,191 +1,356 @@
 
 import os
-import tempfile
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 os.environ['PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION'] = 'python'
 
+import pickle
+import sys
 import cv2
 import numpy as np
-import base64
-from tensorflow.keras.models import load_model
-from ultralytics import YOLO
-from fastapi import UploadFile
-from typing import Optional
+from typing import List, Optional, Sequence
+from app.core.config import settings
+from app.services.detection import DetectOptions, detect_faces
+from app.services.inference_backends import Detections
+from app.services.model_registry import get_model_registry
+from app.services.inference_executor import current_load
+from app.services.preprocess import clip_boxes, motion_thumbnail, prepare_face_batch
+from app.services.render import RenderOptions, render
 from app.services.tracker_manager import get_session_manager
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MASK_MODEL_PATH = os.path.join(BASE_DIR, "..", "..", "model", "model.h5")
-
-face_detector = YOLO('yolov8n-face.pt') 
-
-mask_net = load_model(MASK_MODEL_PATH)
-
-def detect_and_predict_mask(image, draw_on_image=True):
+from app.services.batch_scheduler import get_batch_scheduler
+from app.utils.image_utils import choose_reduce_factor, decode_image_bytes
+from app.utils.timing import StageTimer, timed
+
+_tracker_cfg = None
+
+def create_tracker():
+    """Build a fresh BoT-SORT/ByteTrack instance; all sessions share the YOLO weights."""
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+
+    global _tracker_cfg
+    if _tracker_cfg is None:
+        _tracker_cfg = IterableSimpleNamespace(**yaml_load(check_yaml(settings.TRACKER_CONFIG)))
+    tracker_cls = TRACKER_MAP[_tracker_cfg.tracker_type]
+    return tracker_cls(args=_tracker_cfg, frame_rate=settings.TRACKER_FRAME_RATE)
+
+# Tracker attributes that make up its state; the rest (config, Kalman matrices,
+# GMC/ReID helpers) is rebuilt by create_tracker() when a snapshot is restored
+_TRACKER_STATE = ("frame_id", "tracked_stracks", "lost_stracks", "_ids")
+_TRACK_SHARED = ("kalman_filter", "next_id")
+
+def dump_tracker(tracker) -> bytes:
+    """
+    Serialize a tracker's state for a session snapshot.
+
+    Keeps the frame counter, tracked and lost tracks (Kalman mean and
+    covariance, IDs, scores) and the next track ID. Removed tracks and the
+    camera-motion reference frame are left out: after a restore, motion
+    compensation starts over on the next frame.
+    """
+    state = {}
+    for name in _TRACKER_STATE:
+        if not hasattr(tracker, name):
+            continue
+        value = getattr(tracker, name)
+        if name.endswith("stracks"):
+            value = [(type(t), {k: v for k, v in vars(t).items() if k not in _TRACK_SHARED}) for t in value]
+        state[name] = value
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_tracker(data: bytes):
+    """
+    Fresh tracker from create_tracker() with the state of dump_tracker() output.
+
+    Unpickles its input: only call it on snapshots whose HMAC was verified
+    (TrackerSession.restore does that before calling it).
+    """
+    tracker = create_tracker()
+    state = pickle.loads(data)
+    tracker.frame_id = state.get("frame_id", 0)
+    per_tracker_ids = hasattr(tracker, "_ids")
+    if per_tracker_ids and state.get("_ids") is not None:
+        tracker._ids = state["_ids"]
+    max_id = 0
+    for name in ("tracked_stracks", "lost_stracks"):
+        tracks = []
+        for cls, attrs in state.get(name, ()):
+            track = cls.__new__(cls)
+            track.__dict__.update(attrs)
+            track.kalman_filter = tracker.kalman_filter
+            max_id = max(max_id, int(track.track_id))
+            tracks.append(track)
+        setattr(tracker, name, tracks)
+    if per_tracker_ids:
+        if state.get("_ids") is None:
+            tracker._ids = iter(range(max_id + 1, sys.maxsize))
+        for track in tracker.tracked_stracks + tracker.lost_stracks:
+            track.next_id = tracker._ids.__next__
+    else:
+        # Older Ultralytics numbers tracks from a process-wide counter
+        from ultralytics.trackers.basetrack import BaseTrack
+        BaseTrack._count = max(BaseTrack._count, max_id)
+    return tracker
+
+get_session_manager().set_tracker_factory(create_tracker, dump=dump_tracker, load=load_tracker)
+
+def propagate_tracks(tracker) -> np.ndarray:
+    """
+    Advance a tracker one frame on its Kalman motion model alone, without detections.
+
+    Returns:
+        Rows shaped like tracker.update() output for the confirmed, tracked tracks
+    """
+    tracker.frame_id += 1
+    stracks = tracker.tracked_stracks + tracker.lost_stracks
+    if stracks:
+        type(stracks[0]).multi_predict(stracks)
+    rows = [t.result for t in tracker.tracked_stracks if t.is_activated]
+    if not rows:
+        return np.empty((0, 8), dtype=np.float32)
+    return np.asarray(rows, dtype=np.float32)
+
+def _collect_faces(image, detections: Detections):
     (h, w) = image.shape[:2]
-    faces_list = []
-    locations = []
-
-    results_yolo = face_detector(image, conf=0.5, verbose=False)
-
-    for r in results_yolo:
-        boxes = r.boxes
-        for box in boxes:
-            b = box.xyxy[0].cpu().numpy().astype(int)
-            startX, startY, endX, endY = b
-
-            startX, startY = max(0, startX), max(0, startY)
-            endX, endY = min(w - 1, endX), min(h - 1, endY)
-
-            face = image[startY:endY, startX:endX]
-            if face.size == 0:
-                continue
-
-            face_input = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
-            face_input = cv2.resize(face_input, (128, 128))
-            face_input = face_input / 255.0
-            face_input = np.expand_dims(face_input, axis=0)
-
-            faces_list.append(face_input)
-            locations.append((startX, startY, endX, endY))
+    boxes, _ = clip_boxes(detections.xyxy, w, h)
+    return [tuple(int(v) for v in b) for b in boxes]
 
+def _build_response(image, locations, predictions):
+    (h, w) = image.shape[:2]
     final_results = []
 
-    if len(faces_list) > 0:
-        faces_array = np.vstack(faces_list)
-        predictions = mask_net.predict(faces_array, batch_size=32, verbose=0)
+    for box, pred in zip(locations, predictions):
+        (nomask, mask) = pred
+        label = "Mask" if mask > nomask else "No Mask"
+        confidence = float(max(mask, nomask))
 
-        for box, pred in zip(locations, predictions):
-            (nomask, mask) = pred
-            label = "Mask" if mask > nomask else "No Mask"
-            confidence = float(max(mask, nomask))
+        (startX, startY, endX, endY) = box
 
-            (startX, startY, endX, endY) = box
-            
-            if draw_on_image:
-                color = (0, 255, 0) if label == "Mask" else (0, 0, 255)
-                cv2.rectangle(image, (startX, startY), (endX, endY), color, 3)
-                label_text = f"{label}: {confidence:.2f}"
-                y = startY - 10 if startY - 10 > 10 else startY + 10
-                cv2.putText(image, label_text, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        final_results.append({
+            "box": {"startX": int(startX), "startY": int(startY), "endX": int(endX), "endY": int(endY)},
+            "label": label,
+            "confidence": round(confidence, 4)
+        })
 
-            final_results.append({
-                "box": {"startX": int(startX), "startY": int(startY), "endX": int(endX), "endY": int(endY)},
-                "label": label,
-                "confidence": round(confidence, 4)
-            })
-
-    response = {
+    return {
         "faces_detected": len(final_results),
         "results": final_results,
         "width": w,
         "height": h
     }
 
+def _attach_image(response, image, draw_on_image):
+    """Legacy in-line rendering: full-resolution annotated JPEG as base64."""
     if draw_on_image:
-        _, buffer = cv2.imencode('.jpg', image)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
-        response["image_base64"] = image_base64
-
+        render(response, image, RenderOptions(mode="base64"))
     return response
 
-def save_upload_file_tmp(upload_file: UploadFile) -> str:
-    suffix = os.path.splitext(upload_file.filename)[1]
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    tmp.write(upload_file.file.read())
-    tmp.flush()
-    tmp.close()
-    return tmp.name
+def detect_and_predict_mask(image, draw_on_image=True, timer: Optional[StageTimer] = None,
+                            detect_options: Optional[DetectOptions] = None):
+    response = detect_and_predict_mask_batch([image], timer=timer, detect_options=[detect_options])[0]
+    return _attach_image(response, image, draw_on_image)
+
+def detect_and_predict_mask_batch(images: List[np.ndarray], timer: Optional[StageTimer] = None,
+                                  detect_options: Sequence[Optional[DetectOptions]] = ()) -> List[dict]:
+    """
+    Run one YOLO call over all frames and one mask_net call over all faces.
+
+    Drawing and encoding are left to app.services.render so they do not
+    run on the batch thread.
+
+    Args:
+        images: BGR frames, possibly of different sizes
+        timer: Optional per-stage timing collector
+        detect_options: Detection resolution/ROI/min face size per frame (None = settings)
+
+    Returns:
+        One response dict (boxes and labels) per frame
+    """
+    # Backend (native Ultralytics/Keras or ONNX Runtime) is selected by settings.INFERENCE_BACKEND
+    face_detector, mask_net = get_model_registry().models()
+
+    with timed(timer, "detect"):
+        # Downscaled for the detector; boxes come back in full-resolution coordinates
+        detections = detect_faces(face_detector, images, detect_options)
+
+    with timed(timer, "preprocess"):
+        per_image = [_collect_faces(image, d) for image, d in zip(images, detections)]
+        crops = [(image, box) for image, locations in zip(images, per_image) for box in locations]
+        faces_array = prepare_face_batch(crops) if crops else None
+
+    with timed(timer, "classify"):
+        if faces_array is not None:
+            predictions = mask_net.predict(faces_array)
+        else:
+            predictions = np.empty((0, 2), dtype=np.float32)
+
+    responses = []
+    offset = 0
+    for image, locations in zip(images, per_image):
+        preds = predictions[offset:offset + len(locations)]
+        offset += len(locations)
+        responses.append(_build_response(image, locations, preds))
+
+    return responses
+
+def predict_image(image, timer: Optional[StageTimer] = None, detect_options: Optional[DetectOptions] = None):
+    """Stateless prediction, coalesced with other requests when batching is enabled."""
+    if settings.BATCH_ENABLED:
+        with timed(timer, "batch"):
+            return get_batch_scheduler().submit(image, detect_options).result()
+    return detect_and_predict_mask_batch([image], timer=timer, detect_options=[detect_options])[0]
 
 def predict_from_image_path(image_path: str, draw_on_image=True):
     image = cv2.imread(image_path)
     if image is None:
         raise ValueError("Cannot read image")
-    return detect_and_predict_mask(image, draw_on_image=draw_on_image)
+    return _attach_image(predict_image(image), image, draw_on_image)
+
+def decode_upload(data: bytes):
+    """Decode upload bytes in memory, reduced-resolution for large JPEGs if configured."""
+    reduce_factor = choose_reduce_factor(data, settings.DECODE_MAX_SIDE)
+    return decode_image_bytes(data, reduce_factor=reduce_factor)
+
+def predict_from_bytes(data: bytes, return_image=False, timer: Optional[StageTimer] = None,
+                       detect_options: Optional[DetectOptions] = None):
+    """
+    Stateless prediction for encoded image bytes.
+
+    Returns:
+        Tuple of (result, decoded frame or None); the frame is what
+        app.services.render annotates when the client wants an image back
+    """
+    with timed(timer, "decode"):
+        image = decode_upload(data)
+    result = predict_image(image, timer=timer, detect_options=detect_options)
+    return result, (image if return_image else None)
 
 # Bot-sort tracking
-def detect_and_predict_mask_with_tracking(image, session_id: str, draw_on_image=True):
+def detect_and_predict_mask_with_tracking(image, session_id: str, draw_on_image=True,
+                                          detect_mode: Optional[str] = None,
+                                          detections: Optional[Detections] = None,
+                                          timer: Optional[StageTimer] = None,
+                                          detect_options: Optional[DetectOptions] = None,
+                                          shared: bool = True):
+    """
+    Detect, track and classify one frame of a session.
+
+    Args:
+        image: BGR frame
+        session_id: Tracker session the frame belongs to
+        draw_on_image: Attach the annotated frame as base64
+        detect_mode: Set the session's detection scheduling ("every"/"adaptive")
+        detections: Detector output computed by the caller (e.g. batched over
+            several frames of a video); skips detection scheduling
+        timer: Optional per-stage timing collector
+        detect_options: Set the session's detection resolution, ROI and minimum face size
+        shared: Load/save the session through the shared session store; False
+            for sessions that stay in this process (video jobs)
+    """
     (h, w) = image.shape[:2]
     
-    # Get or create tracking session
+    # Get or create tracking session (each session owns its tracker state)
     session_manager = get_session_manager()
-    tracker_session = session_manager.get_or_create_session(session_id)
+    tracker_session = session_manager.get_or_create_session(session_id, shared=shared)
+    if detect_mode:
+        tracker_session.detect_mode = detect_mode
+    if detect_options is not None:
+        tracker_session.detect_options = detect_options
     
-    faces_list = []
     locations = []
     track_ids = []
-
-    # Use BoT-SORT tracking instead of simple detection
-    results_yolo = face_detector.track(
-        image, 
-        conf=0.5, 
-        verbose=False,
-        tracker="botsort.yaml",
-        persist=True  # Maintain tracker state across calls
-    )
-
-    for r in results_yolo:
-        boxes = r.boxes
-        for box in boxes:
-            b = box.xyxy[0].cpu().numpy().astype(int)
-            startX, startY, endX, endY = b
-
-            startX, startY = max(0, startX), max(0, startY)
-            endX, endY = min(w - 1, endX), min(h - 1, endY)
-
-            face = image[startY:endY, startX:endX]
-            if face.size == 0:
-                continue
-
-            face_input = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
-            face_input = cv2.resize(face_input, (128, 128))
-            face_input = face_input / 255.0
-            face_input = np.expand_dims(face_input, axis=0)
-
-            faces_list.append(face_input)
-            locations.append((startX, startY, endX, endY))
-            
-            # Extract track ID from BoT-SORT
-            if box.id is not None:
-                track_id = int(box.id.cpu().numpy()[0])
-                track_ids.append(track_id)
+    crops = []
+    classify_ids = []
+
+    face_detector, mask_net = get_model_registry().models()
+
+    # Frames of one session must reach its tracker in order, one at a time: the
+    # lock spans scheduling, detection and the tracker update so concurrent
+    # requests cannot reorder frames or interleave the adaptive schedule
+    with tracker_session.lock:
+        with timed(timer, "schedule"):
+            adaptive = tracker_session.detect_mode == "adaptive" and detections is None
+            run_detection = tracker_session.should_detect(
+                motion_thumbnail(image) if adaptive else None,
+                load=current_load(),
+                min_interval=settings.TRACK_DETECT_MIN_INTERVAL,
+                max_interval=settings.TRACK_DETECT_MAX_INTERVAL,
+                motion_threshold=settings.TRACK_DETECT_MOTION_THRESHOLD,
+            )
+            tracker_session.prune_stale(settings.TRACK_STALE_FRAMES)
+
+        if run_detection and detections is None:
+            with timed(timer, "detect"):
+                detections = detect_faces(face_detector, [image], [tracker_session.detect_options])[0]
+
+        with timed(timer, "track"):
+            if run_detection:
+                tracks = tracker_session.tracker.update(detections, image)
             else:
-                track_ids.append(-1)  # No track ID assigned
-
-    final_results = []
+                tracks = propagate_tracks(tracker_session.tracker)
+    if len(tracks) == 0:
+        tracks = np.empty((0, 8), dtype=np.float32)
+
+    with timed(timer, "preprocess"):
+        # tracks rows: x1, y1, x2, y2, track_id, score, cls, det_index
+        boxes, keep = clip_boxes(tracks[:, :4], w, h)
+        # Label history slots are shared by the session's concurrent frames
+        with tracker_session.lock:
+            for (startX, startY, endX, endY), track_id in zip(boxes.tolist(), tracks[keep, 4].astype(int).tolist()):
+                locations.append((startX, startY, endX, endY))
+                track_ids.append(track_id)
 
-    if len(faces_list) > 0:
-        faces_array = np.vstack(faces_list)
-        predictions = mask_net.predict(faces_array, batch_size=32, verbose=0)
+                if not run_detection:
+                    # Propagated box: keep the smoothed label, mask_net only runs on detection frames
+                    tracker_session.mark_seen(track_id)
+                    continue
+
+                # Stable, confidently classified tracks reuse their smoothed label
+                box_area = float((endX - startX) * (endY - startY))
+                if settings.TRACK_CACHE_ENABLED and not tracker_session.needs_classification(
+                    track_id,
+                    box_area,
+                    max_age=settings.TRACK_CACHE_MAX_AGE,
+                    min_history=settings.TRACK_CACHE_MIN_HISTORY,
+                    min_confidence=settings.TRACK_CACHE_MIN_CONFIDENCE,
+                    confidence_decay=settings.TRACK_CACHE_CONFIDENCE_DECAY,
+                    max_scale_change=settings.TRACK_CACHE_MAX_SCALE_CHANGE,
+                ):
+                    tracker_session.mark_cached(track_id)
+                    continue
+
+                crops.append((image, (startX, startY, endX, endY)))
+                classify_ids.append(track_id)
+                tracker_session.mark_classified(track_id, box_area)
+
+        faces_array = prepare_face_batch(crops) if crops else None
+
+    with timed(timer, "classify"):
+        if faces_array is not None:
+            # mask_net runs unlocked, only the history update is serialized
+            predictions = mask_net.predict(faces_array)
+
+            with tracker_session.lock:
+                for pred, track_id in zip(predictions, classify_ids):
+                    (nomask, mask) = pred
+                    raw_label = "Mask" if mask > nomask else "No Mask"
+                    raw_confidence = float(max(mask, nomask))
+
+                    # Update tracking session with raw prediction
+                    tracker_session.update_track(track_id, raw_label, raw_confidence)
+
+    if shared and session_manager.store is not None:
+        with timed(timer, "session_sync"):
+            session_manager.save_session(session_id, tracker_session)
 
-        for box, pred, track_id in zip(locations, predictions, track_ids):
-            (nomask, mask) = pred
-            raw_label = "Mask" if mask > nomask else "No Mask"
-            raw_confidence = float(max(mask, nomask))
+    final_results = []
 
-            # Update tracking session with raw prediction
-            if track_id != -1:
-                tracker_session.update_track(track_id, raw_label, raw_confidence)
-                # Get smoothed prediction from history
-                label, confidence = tracker_session.get_smoothed_prediction(track_id)
-            else:
-                # No tracking, use raw prediction
-                label = raw_label
-                confidence = raw_confidence
+    with tracker_session.lock:
+        for box, track_id in zip(locations, track_ids):
+            # Get smoothed prediction from history
+            label, confidence = tracker_session.get_smoothed_prediction(track_id)
 
             (startX, startY, endX, endY) = box
-            
-            if draw_on_image:
-                color = (0, 255, 0) if label == "Mask" else (0, 0, 255)
-                cv2.rectangle(image, (startX, startY), (endX, endY), color, 3)
-                
-                # Include track ID in label for debugging
-                if track_id != -1:
-                    label_text = f"ID:{track_id} {label}: {confidence:.2f}"
-                else:
-                    label_text = f"{label}: {confidence:.2f}"
-                    
-                y = startY - 10 if startY - 10 > 10 else startY + 10
-                cv2.putText(image, label_text, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
             final_results.append({
                 "box": {"startX": int(startX), "startY": int(startY), "endX": int(endX), "endY": int(endY)},
@@ -199,15 +364,11 @@ def detect_and_predict_mask_with_tracking(image, session_id: str, draw_on_image=
         "results": final_results,
         "width": w,
         "height": h,
-        "session_id": session_id
+        "session_id": session_id,
+        "detected": run_detection
     }
 
-    if draw_on_image:
-        _, buffer = cv2.imencode('.jpg', image)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
-        response["image_base64"] = image_base64
-
-    return response
+    return _attach_image(response, image, draw_on_image)
 
 # predict every frame
 def predict_from_image_path_with_tracking(image_path: str, session_id: str, draw_on_image=True):
@@ -215,3 +376,14 @@ def predict_from_image_path_with_tracking(image_path: str, session_id: str, draw
     if image is None:
         raise ValueError("Cannot read image")
     return detect_and_predict_mask_with_tracking(image, session_id, draw_on_image=draw_on_image)
+
+def predict_from_bytes_with_tracking(data: bytes, session_id: str, return_image=False,
+                                     detect_mode: Optional[str] = None, timer: Optional[StageTimer] = None,
+                                     detect_options: Optional[DetectOptions] = None):
+    """Tracked counterpart of predict_from_bytes; returns (result, decoded frame or None)."""
+    with timed(timer, "decode"):
+        image = decode_upload(data)
+    result = detect_and_predict_mask_with_tracking(image, session_id, draw_on_image=False,
+                                                   detect_mode=detect_mode, timer=timer,
+                                                   detect_options=detect_options)
+    return result, (image if return_image else None)
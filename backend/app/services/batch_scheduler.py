@@ -0,0 +1,202 @@
+"""
+Dynamic micro-batching for stateless inference.
+
+Frames submitted by concurrent requests are queued and coalesced into a
+single batch, bounded by a maximum batch size and a maximum wait measured
+from the moment the oldest frame was enqueued. Each batch runs one YOLO
+call and one mask_net call, and results are fanned back to the callers
+through futures.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.metrics import observe_stages
+from app.utils.timing import StageTimer
+
+
+class _PendingFrame:
+    """A frame waiting in the queue together with the future of its caller."""
+
+    __slots__ = ("image", "options", "future", "enqueued_at")
+
+    def __init__(self, image: np.ndarray, options: Any = None):
+        self.image = image
+        self.options = options
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchMetrics:
+    """
+    Counters used to tune the latency/throughput trade-off.
+
+    Attributes:
+        batches: Number of batches executed
+        frames: Number of frames processed
+        batch_size_counts: Histogram of batch sizes (size -> count)
+        recent_waits: Queue wait (ms) of the most recent frames
+    """
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.batch_size_counts: Dict[int, int] = {}
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_batch_ms = 0.0
+        self.recent_waits = deque(maxlen=window)
+
+    def record(self, waits_ms: List[float], batch_ms: float):
+        """Record one executed batch."""
+        size = len(waits_ms)
+        with self._lock:
+            self.batches += 1
+            self.frames += size
+            self.batch_size_counts[size] = self.batch_size_counts.get(size, 0) + 1
+            self.total_wait_ms += sum(waits_ms)
+            self.max_wait_ms = max(self.max_wait_ms, max(waits_ms))
+            self.total_batch_ms += batch_ms
+            self.recent_waits.extend(waits_ms)
+
+    def snapshot(self, queue_depth: int = 0) -> dict:
+        """Return a JSON-serializable view of the metrics."""
+        with self._lock:
+            waits = np.fromiter(self.recent_waits, dtype=np.float64)
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "queue_depth": queue_depth,
+                "avg_batch_size": round(self.frames / self.batches, 3) if self.batches else 0.0,
+                "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+                "avg_queue_wait_ms": round(self.total_wait_ms / self.frames, 3) if self.frames else 0.0,
+                "p50_queue_wait_ms": round(float(np.percentile(waits, 50)), 3) if waits.size else 0.0,
+                "p95_queue_wait_ms": round(float(np.percentile(waits, 95)), 3) if waits.size else 0.0,
+                "max_queue_wait_ms": round(self.max_wait_ms, 3),
+                "avg_batch_ms": round(self.total_batch_ms / self.batches, 3) if self.batches else 0.0,
+            }
+
+
+class BatchScheduler:
+    """
+    Coalesces frames from concurrent requests into batched inference calls.
+
+    Attributes:
+        process_batch: Callable taking a list of images and a list of per-image
+            options, returning one result per image
+        max_batch_size: Upper bound on frames per batch
+        max_wait_ms: Longest time the oldest frame may wait for the batch to fill
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[np.ndarray], List[Any]], List[dict]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.metrics = BatchMetrics()
+        self._queue: "queue.Queue[_PendingFrame]" = queue.Queue()
+
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, image: np.ndarray, options: Any = None) -> Future:
+        """
+        Queue a frame for the next batch.
+
+        Args:
+            image: BGR frame
+            options: Per-frame detection options handed to process_batch
+
+        Returns:
+            Future resolving to the same dict as detect_and_predict_mask
+        """
+        pending = _PendingFrame(image, options)
+        self._queue.put(pending)
+        return pending.future
+
+    def queue_depth(self) -> int:
+        """Approximate number of frames waiting for a batch."""
+        return self._queue.qsize()
+
+    def get_stats(self) -> dict:
+        """Batch-size and queue-wait metrics."""
+        stats = self.metrics.snapshot(self.queue_depth())
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait_ms
+        return stats
+
+    def _collect_batch(self) -> List[_PendingFrame]:
+        """Block for one frame, then gather more until the batch is full or the deadline passes."""
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Worker loop: collect, run, fan out."""
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            waits_ms = [(started - p.enqueued_at) * 1000.0 for p in batch]
+
+            try:
+                results = self.process_batch([p.image for p in batch], [p.options for p in batch])
+            except Exception as e:
+                for p in batch:
+                    p.future.set_exception(e)
+                continue
+            finally:
+                self.metrics.record(waits_ms, (time.perf_counter() - started) * 1000.0)
+
+            for p, result in zip(batch, results):
+                p.future.set_result(result)
+
+
+_scheduler: Optional[BatchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler() -> BatchScheduler:
+    """Get the global batch scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from app.services.ai_service import detect_and_predict_mask_batch
+
+                def process_batch(images: List[np.ndarray], options: List[Any]) -> List[dict]:
+                    # Model stages are timed once per batch, requests only see the "batch" stage
+                    timer = StageTimer()
+                    results = detect_and_predict_mask_batch(images, timer=timer, detect_options=options)
+                    observe_stages(timer.stages)
+                    return results
+
+                _scheduler = BatchScheduler(
+                    process_batch,
+                    max_batch_size=settings.BATCH_MAX_SIZE,
+                    max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                )
+    return _scheduler
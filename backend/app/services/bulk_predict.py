@@ -0,0 +1,125 @@
+"""
+Bulk prediction over many stored objects.
+
+Objects are fetched concurrently on a dedicated prefetch pool (the MinIO
+client shares one pooled HTTP connection manager), handed to the
+inference executor as soon as their bytes arrive, where concurrent frames
+are coalesced by the batch scheduler, and results are yielded in
+completion order. At most `concurrency` objects are in flight at once, so
+memory stays bounded however long the object list is.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from app.core.config import settings
+from app.services.detection_log import record_detections
+from app.services.inference_executor import ExecutorSaturated, get_inference_executor
+from app.utils.metrics import observe_prediction
+
+
+async def predict_bytes_with_backoff(data: bytes) -> dict:
+    """Stateless JSON-only prediction that waits out executor saturation instead of failing."""
+    executor = get_inference_executor()
+    while True:
+        try:
+            result, _, stages = await executor.predict_stateless(data)
+            observe_prediction("batch-minio", stages, result)
+            record_detections(None, result)
+            return result
+        except ExecutorSaturated as e:
+            await asyncio.sleep(e.retry_after)
+
+
+async def stream_predictions(
+    object_names: Iterable[str],
+    fetch: Callable[[str], bytes],
+    predict: Callable[[bytes], Awaitable[dict]] = predict_bytes_with_backoff,
+    concurrency: int = 8,
+    fetch_executor: Optional[ThreadPoolExecutor] = None,
+) -> AsyncIterator[dict]:
+    """
+    Fetch and predict objects with bounded concurrency, yielding as they complete.
+
+    Args:
+        object_names: Names to process
+        fetch: Blocking callable returning the object bytes (runs on the prefetch pool)
+        predict: Coroutine turning image bytes into a result dict
+        concurrency: Objects fetched or predicted at the same time
+        fetch_executor: Pool for fetch calls (default: the shared prefetch pool)
+
+    Yields:
+        {"object_name", "result"} or {"object_name", "error"} per object
+    """
+    loop = asyncio.get_running_loop()
+    fetch_executor = fetch_executor or get_prefetch_executor()
+
+    async def process(name: str) -> dict:
+        try:
+            data = await loop.run_in_executor(fetch_executor, fetch, name)
+        except Exception as e:
+            return {"object_name": name, "error": f"fetch failed: {e}"}
+        try:
+            return {"object_name": name, "result": await predict(data)}
+        except Exception as e:
+            return {"object_name": name, "error": str(e) or type(e).__name__}
+
+    names = iter(object_names)
+    pending = set()
+    try:
+        for name in names:
+            pending.add(asyncio.ensure_future(process(name)))
+            if len(pending) >= max(1, concurrency):
+                break
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # Refill the window before handing the result out
+                name = next(names, None)
+                if name is not None:
+                    pending.add(asyncio.ensure_future(process(name)))
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def stream_ndjson(items: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """Encode results as NDJSON lines, ending with a summary line."""
+    started = time.perf_counter()
+    count = errors = 0
+    async for item in items:
+        count += 1
+        errors += "error" in item
+        yield (json.dumps(item, separators=(",", ":")) + "\n").encode("utf-8")
+    yield (json.dumps({"summary": summarize_run(count, errors, time.perf_counter() - started)}) + "\n").encode("utf-8")
+
+
+def summarize_run(count: int, errors: int, elapsed_s: float) -> dict:
+    """Counts and throughput of one bulk run."""
+    return {
+        "objects": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed_s, 3),
+        "objects_per_s": round(count / elapsed_s, 2) if elapsed_s > 0 else None,
+    }
+
+
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+_prefetch_lock = threading.Lock()
+
+
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used to download objects, creating it on first use."""
+    global _prefetch_executor
+    if _prefetch_executor is None:
+        with _prefetch_lock:
+            if _prefetch_executor is None:
+                _prefetch_executor = ThreadPoolExecutor(
+                    max_workers=settings.BULK_MAX_CONCURRENCY, thread_name_prefix="prefetch"
+                )
+    return _prefetch_executor
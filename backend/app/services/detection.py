@@ -0,0 +1,216 @@
+"""
+Detection resolution, regions of interest and minimum face size.
+
+The detector gets a copy of the frame cropped to the bounding rectangle
+of the region-of-interest polygons and downscaled once so its longer side
+is at most `max_side`, and runs at that input size. Boxes are mapped back
+to original coordinates, so the crops mask_net classifies still come
+from the full-resolution frame. Faces centered outside every ROI polygon
+or smaller than `min_face` pixels are dropped before tracking and
+classification.
+
+Options are set globally (DETECT_MAX_SIDE, MIN_FACE_SIZE), per request,
+or per tracker session.
+"""
+
+import dataclasses
+import json
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.inference_backends import Detections
+
+Polygon = Tuple[Tuple[float, float], ...]
+
+
+@dataclass(frozen=True)
+class DetectOptions:
+    """
+    How faces are detected in a frame.
+
+    Attributes:
+        max_side: Longer side of the frame the detector sees (0 = full resolution)
+        min_face: Smallest face side in original pixels (0 = no minimum)
+        roi: Region-of-interest polygons, vertices as (x, y) fractions of the frame
+            width/height; empty = the whole frame
+    """
+
+    max_side: int = 0
+    min_face: int = 0
+    roi: Tuple[Polygon, ...] = ()
+
+    def __post_init__(self):
+        if self.max_side < 0 or (0 < self.max_side < 32):
+            raise ValueError("detect max_side must be 0 or at least 32")
+        if self.min_face < 0:
+            raise ValueError("min_face must not be negative")
+        for polygon in self.roi:
+            if len(polygon) < 3:
+                raise ValueError("ROI polygons need at least 3 vertices")
+            if any(not (0.0 <= v <= 1.0) for point in polygon for v in point):
+                raise ValueError("ROI vertices must be fractions of the frame size (0-1)")
+
+    @property
+    def imgsz(self) -> Optional[int]:
+        """Detector input size for this resolution (multiple of 32), None for the model default."""
+        return -(-self.max_side // 32) * 32 if self.max_side else None
+
+    def cache_key(self) -> str:
+        roi = ";".join(",".join(f"{x:.4f}/{y:.4f}" for x, y in polygon) for polygon in self.roi)
+        return f"{self.max_side}:{self.min_face}:{roi}"
+
+    def replace(self, **changes) -> "DetectOptions":
+        """Copy with the given fields changed; None values are ignored."""
+        return dataclasses.replace(self, **{k: v for k, v in changes.items() if v is not None})
+
+    def to_json(self) -> str:
+        """Compact JSON form, read back by from_json()."""
+        return json.dumps({"max_side": self.max_side, "min_face": self.min_face, "roi": self.roi},
+                          separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> "DetectOptions":
+        """
+        Options from to_json() output.
+
+        Raises:
+            ValueError: Malformed JSON or invalid values
+        """
+        try:
+            value = json.loads(text)
+            roi = tuple(tuple((float(x), float(y)) for x, y in polygon) for polygon in value.get("roi", ()))
+            return cls(max_side=int(value.get("max_side", 0)), min_face=int(value.get("min_face", 0)), roi=roi)
+        except (TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid detect options: {e}")
+
+
+def default_detect_options() -> DetectOptions:
+    """Options from settings (DETECT_MAX_SIDE, MIN_FACE_SIZE, no ROI)."""
+    return DetectOptions(max_side=settings.DETECT_MAX_SIDE, min_face=settings.MIN_FACE_SIZE)
+
+
+def parse_roi(text: Optional[str]) -> Optional[Tuple[Polygon, ...]]:
+    """
+    Parse ROI polygons from JSON: [[[x, y], [x, y], [x, y], ...], ...] in 0-1 fractions.
+
+    A single polygon ([[x, y], ...]) is accepted too; "[]" clears the ROI.
+
+    Raises:
+        ValueError: Malformed JSON or polygons
+    """
+    if text is None or not text.strip():
+        return None
+    try:
+        value = json.loads(text)
+        if value and isinstance(value[0][0], (int, float)):
+            value = [value]
+        return tuple(tuple((float(x), float(y)) for x, y in polygon) for polygon in value)
+    except (ValueError, TypeError, IndexError) as e:
+        raise ValueError(f"Invalid ROI polygons: {e}")
+
+
+def parse_detect_options(max_side: Optional[int] = None, min_face: Optional[int] = None,
+                         roi: Optional[str] = None) -> Optional[DetectOptions]:
+    """
+    Per-request options on top of the settings; None when nothing was given.
+
+    Raises:
+        ValueError: Invalid values or ROI JSON
+    """
+    polygons = parse_roi(roi)
+    if max_side is None and min_face is None and polygons is None:
+        return None
+    return default_detect_options().replace(max_side=max_side, min_face=min_face, roi=polygons)
+
+
+def _roi_pixels(options: DetectOptions, width: int, height: int) -> List[np.ndarray]:
+    scale = np.array([width, height], dtype=np.float32)
+    return [np.asarray(polygon, dtype=np.float32) * scale for polygon in options.roi]
+
+
+def prepare_for_detection(image: np.ndarray, options: DetectOptions) -> Tuple[np.ndarray, float, int, int]:
+    """
+    Crop a frame to the ROI bounding rectangle and downscale it for the detector.
+
+    Returns:
+        Tuple of (detector input, scale factor, x offset, y offset) where an
+        original coordinate is detector coordinate / scale + offset
+    """
+    (h, w) = image.shape[:2]
+    x0, y0, x1, y1 = 0, 0, w, h
+    if options.roi:
+        points = np.concatenate(_roi_pixels(options, w, h))
+        x0, y0 = (int(v) for v in np.floor(points.min(axis=0)).clip(0))
+        x1, y1 = int(min(w, np.ceil(points[:, 0].max()))), int(min(h, np.ceil(points[:, 1].max())))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            x0, y0, x1, y1 = 0, 0, w, h
+        image = image[y0:y1, x0:x1]
+
+    scale = 1.0
+    (rh, rw) = image.shape[:2]
+    longer = max(rh, rw)
+    if options.max_side and longer > options.max_side:
+        scale = options.max_side / float(longer)
+        size = (max(1, int(round(rw * scale))), max(1, int(round(rh * scale))))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image, scale, x0, y0
+
+
+def filter_detections(detections: Detections, shape, options: DetectOptions) -> Detections:
+    """Drop faces smaller than options.min_face or centered outside every ROI polygon."""
+    if not len(detections) or (not options.min_face and not options.roi):
+        return detections
+    xyxy = detections.xyxy
+    keep = np.ones(len(detections), dtype=bool)
+    if options.min_face:
+        keep &= np.minimum(xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]) >= options.min_face
+    if options.roi:
+        (h, w) = shape[:2]
+        polygons = _roi_pixels(options, w, h)
+        centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2.0
+        for i in np.flatnonzero(keep):
+            center = (float(centers[i, 0]), float(centers[i, 1]))
+            keep[i] = any(cv2.pointPolygonTest(p, center, False) >= 0 for p in polygons)
+    return detections if keep.all() else detections[keep]
+
+
+def detect_faces(detector, images: Sequence[np.ndarray], options: Sequence[Optional[DetectOptions]] = (),
+                 conf: float = 0.5) -> List[Detections]:
+    """
+    Run the detector over frames with per-frame detection options.
+
+    Frames sharing a detector input size run as one batched call.
+
+    Args:
+        detector: Backend detector (see app.services.inference_backends)
+        images: BGR frames at full resolution
+        options: One DetectOptions (or None for the defaults) per frame; may be empty
+        conf: Confidence threshold
+
+    Returns:
+        Detections per frame, in original frame coordinates
+    """
+    default = default_detect_options()
+    resolved = [(options[i] if i < len(options) else None) or default for i in range(len(images))]
+    prepared = [prepare_for_detection(image, opts) for image, opts in zip(images, resolved)]
+
+    groups = {}
+    for i, opts in enumerate(resolved):
+        groups.setdefault(opts.imgsz, []).append(i)
+
+    results: List[Optional[Detections]] = [None] * len(images)
+    for imgsz, indices in groups.items():
+        batch = detector.detect([prepared[i][0] for i in indices], conf=conf, imgsz=imgsz)
+        for i, detections in zip(indices, batch):
+            _, scale, x0, y0 = prepared[i]
+            if scale != 1.0 or x0 or y0:
+                xyxy = detections.xyxy / scale
+                xyxy[:, [0, 2]] += x0
+                xyxy[:, [1, 3]] += y0
+                detections = Detections(xyxy, detections.conf, detections.cls)
+            results[i] = filter_detections(detections, images[i].shape, resolved[i])
+    return results
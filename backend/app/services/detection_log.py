@@ -0,0 +1,627 @@
+"""
+Columnar detection log and windowed mask-compliance aggregates.
+
+Predict endpoints, video jobs and bulk runs hand every result to
+DetectionLog.record(), which only appends it to a queue. A background
+thread turns queued results into rows (timestamp, session_id, track_id,
+label, confidence, box), updates the aggregates and writes the rows out
+as columnar segments, so logging never adds latency to inference. If the writer falls DETECTION_LOG_MAX_PENDING
+results behind, new results are dropped and counted instead of queueing
+without bound.
+
+    off     nothing is recorded
+    memory  aggregates only (default)
+    local   aggregates + segments under DETECTION_LOG_DIR
+    minio   aggregates + segments in MINIO_BUCKET under DETECTION_LOG_PREFIX
+
+Segments are Parquet (pyarrow) or compressed .npz when pyarrow is not
+installed, one file per DETECTION_LOG_SEGMENT_ROWS rows or
+DETECTION_LOG_FLUSH_SECONDS, in date=YYYY-MM-DD/ partitions.
+
+Aggregates cover the last ANALYTICS_WINDOW_MINUTES in one-minute buckets
+per session and across all sessions: frames, faces, masked/unmasked faces,
+tracks seen and new tracks. Window totals are kept up to date as buckets
+fill and expire, so a stats query costs the same whatever the number of
+rows logged. They are per process; with several workers the segments are
+the complete record.
+"""
+
+import io
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.tracker_manager import LABELS, get_session_manager
+
+logger = logging.getLogger(__name__)
+
+_LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+_MASK = _LABEL_CODES["Mask"]
+_NO_MASK = _LABEL_CODES["No Mask"]
+
+# Bucket counters; LAST_SEEN counts the tracks whose latest sighting falls in
+# the bucket, so its sum over any range of buckets is the distinct tracks seen
+_FIELDS = ("frames", "faces", "masked", "unmasked", "tracks", "new_tracks", "last_seen")
+_FRAMES, _FACES, _MASKED, _UNMASKED, _TRACKS, _NEW_TRACKS, _LAST_SEEN = range(len(_FIELDS))
+_NFIELDS = len(_FIELDS)
+
+SINKS = ("off", "memory", "local", "minio")
+
+
+class WindowCounts:
+    """
+    Counters in fixed-width time buckets over a sliding window.
+
+    A ring of `buckets` rows plus running totals over the whole ring:
+    adding to a bucket updates both, and a bucket is subtracted from the
+    totals once, when the window moves past it.
+    """
+
+    def __init__(self, buckets: int, bucket_seconds: float = 60.0):
+        self.size = max(1, buckets)
+        self.bucket_seconds = bucket_seconds
+        self.index = array("q", [-1]) * self.size
+        self.counts = array("q", [0]) * (self.size * _NFIELDS)
+        self.totals = [0] * _NFIELDS
+        self.head = -1
+
+    def bucket_of(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds)
+
+    def advance(self, bucket: int):
+        """Move the window to end at `bucket`, expiring the buckets that fall out."""
+        if bucket <= self.head:
+            return
+        counts, totals = self.counts, self.totals
+        for b in range(max(self.head + 1, bucket - self.size + 1), bucket + 1):
+            slot = b % self.size
+            if self.index[slot] >= 0:
+                base = slot * _NFIELDS
+                for i in range(_NFIELDS):
+                    totals[i] -= counts[base + i]
+                    counts[base + i] = 0
+            self.index[slot] = b
+        self.head = bucket
+
+    def contains(self, bucket: int) -> bool:
+        return bucket >= 0 and self.index[bucket % self.size] == bucket
+
+    def add(self, bucket: int, field: int, amount: int = 1) -> bool:
+        """Add to a bucket; False if it is already outside the window."""
+        self.advance(bucket)
+        if self.index[bucket % self.size] != bucket:
+            return False
+        self.counts[(bucket % self.size) * _NFIELDS + field] += amount
+        self.totals[field] += amount
+        return True
+
+    def values(self, minutes: Optional[int] = None) -> List[int]:
+        """Counter sums over the newest `minutes` buckets (the whole window by default)."""
+        if minutes is None or minutes >= self.size:
+            return list(self.totals)
+        values = [0] * _NFIELDS
+        for b in range(self.head - minutes + 1, self.head + 1):
+            if self.contains(b):
+                base = (b % self.size) * _NFIELDS
+                for i in range(_NFIELDS):
+                    values[i] += self.counts[base + i]
+        return values
+
+    def series(self) -> List[dict]:
+        """Non-empty buckets of the window, oldest first."""
+        rows = []
+        for b in range(self.head - self.size + 1, self.head + 1):
+            if not self.contains(b):
+                continue
+            base = (b % self.size) * _NFIELDS
+            row = self.counts[base:base + _NFIELDS]
+            if row[_FRAMES]:
+                rows.append(_summary(row, start=b * self.bucket_seconds))
+        return rows
+
+
+def _summary(values, **extra) -> dict:
+    faces = values[_FACES]
+    summary = dict(extra)
+    summary.update({
+        "frames": values[_FRAMES],
+        "faces": faces,
+        "masked": values[_MASKED],
+        "unmasked": values[_UNMASKED],
+        "mask_ratio": round(values[_MASKED] / faces, 4) if faces else None,
+    })
+    return summary
+
+
+class _Aggregate:
+    """Window and all-time counters of one session (or of all sessions)."""
+
+    __slots__ = ("window", "tracks", "first_seen", "last_seen", "frames", "faces", "masked", "total_tracks")
+
+    def __init__(self, minutes: int):
+        self.window = WindowCounts(minutes)
+        # track_id -> [first_seen, last_seen, last bucket, faces, masked]
+        self.tracks: Dict[int, list] = {}
+        self.first_seen = None
+        self.last_seen = None
+        self.frames = 0
+        self.faces = 0
+        self.masked = 0
+        self.total_tracks = 0
+
+    def report(self, minutes: Optional[int]) -> dict:
+        values = self.window.values(minutes)
+        window = _summary(values, minutes=min(minutes or self.window.size, self.window.size))
+        window["unique_tracks"] = values[_LAST_SEEN]
+        window["new_tracks"] = values[_NEW_TRACKS]
+        return {
+            "window": window,
+            "all_time": {
+                "frames": self.frames,
+                "faces": self.faces,
+                "masked": self.masked,
+                "mask_ratio": round(self.masked / self.faces, 4) if self.faces else None,
+                "tracks": self.total_tracks,
+                "first_seen": self.first_seen,
+                "last_seen": self.last_seen,
+            },
+        }
+
+
+def load_segment(source) -> Dict[str, np.ndarray]:
+    """
+    Columns of a segment file (path or bytes) as numpy arrays.
+
+    Returns timestamp (float seconds), session_id (object), track_id (-1 for
+    untracked faces), label (object), confidence and box (N x 4).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+        is_npz = source.getvalue()[:2] == b"PK"
+    else:
+        is_npz = str(source).endswith(".npz")
+    if is_npz:
+        with np.load(source, allow_pickle=False) as npz:
+            names = npz["session_names"].astype(object)
+            labels = np.append(npz["label_names"].astype(object), None)
+            return {
+                "timestamp": npz["timestamp"],
+                "session_id": names[npz["session_code"]],
+                "track_id": npz["track_id"],
+                "label": labels[npz["label_code"]],
+                "confidence": npz["confidence"],
+                "box": npz["box"],
+            }
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(source)
+
+    def column(name):
+        return table.column(name).to_numpy(zero_copy_only=False)
+
+    def strings(name):
+        # Decode dictionary columns first, their nulls get lost otherwise
+        return table.column(name).cast(pa.string()).to_numpy(zero_copy_only=False)
+
+    return {
+        "timestamp": table.column("timestamp").cast(pa.int64()).to_numpy() / 1e6,
+        "session_id": strings("session_id"),
+        "track_id": table.column("track_id").fill_null(-1).to_numpy(),
+        "label": strings("label"),
+        "confidence": column("confidence"),
+        "box": np.stack([column(c) for c in ("x1", "y1", "x2", "y2")], axis=1),
+    }
+
+
+class DetectionLog:
+    """
+    Asynchronous detection log with in-memory windowed aggregates.
+
+    Args:
+        sink: "memory", "local" or "minio" (see module docstring)
+        directory: Segment directory for the local sink (and MinIO failures)
+        prefix: Object prefix for the minio sink
+        fmt: "parquet" or "npz"; parquet falls back to npz without pyarrow
+        segment_rows: Rows per segment
+        flush_seconds: Longest time rows wait before a segment is written
+        max_pending: Results queued for the writer before new ones are dropped
+        window_minutes: Length of the aggregate window
+        max_sessions: Sessions with aggregates (least recently seen are dropped)
+    """
+
+    def __init__(self, sink: str = "memory", directory: str = "detection_log", prefix: str = "detections/",
+                 fmt: str = "parquet", segment_rows: int = 250000, flush_seconds: float = 60.0,
+                 max_pending: int = 10000, window_minutes: int = 60, max_sessions: int = 1000,
+                 poll_interval: float = 0.05):
+        if sink not in SINKS[1:]:
+            raise ValueError(f"Unknown DETECTION_LOG {sink!r}, expected one of {', '.join(SINKS)}")
+        if fmt not in ("parquet", "npz"):
+            raise ValueError(f"Unknown DETECTION_LOG_FORMAT {fmt!r}, expected parquet or npz")
+        self.sink = sink
+        self.directory = directory
+        self.prefix = prefix
+        self.fmt = fmt
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                logger.warning("pyarrow is not installed, writing detection log segments as .npz")
+                self.fmt = "npz"
+        self.segment_rows = max(1, segment_rows)
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.window_minutes = max(1, window_minutes)
+        self.max_sessions = max_sessions
+        self.poll_interval = poll_interval
+        self.worker_id = get_session_manager().worker_id
+
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._global = _Aggregate(self.window_minutes)
+        self._sessions: "OrderedDict[str, _Aggregate]" = OrderedDict()
+
+        self._reset_segment()
+        self.recorded = 0
+        self.dropped = 0
+        self.rows = 0
+        self.segments = 0
+        self.segment_bytes = 0
+        self.write_errors = 0
+        self._segment_seq = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="detection-log", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # Request path
+
+    def record(self, session_id: Optional[str], result: Optional[dict], timestamp: Optional[float] = None):
+        """Queue the faces of one served frame; never blocks."""
+        if result is None:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((timestamp or time.time(), session_id or "", result.get("results") or ()))
+        self.recorded += 1
+
+    # Writer thread
+
+    def _run(self):
+        last_housekeeping = time.time()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                now = time.time()
+                with self._writer_lock:
+                    self._drain()
+                    if self._ts and now - self._segment_opened >= self.flush_seconds:
+                        self._write_segment()
+                if now - last_housekeeping >= self._global.window.bucket_seconds:
+                    self._housekeeping(now)
+                    last_housekeeping = now
+            except Exception:
+                logger.exception("Detection log writer failed")
+        self.flush()
+
+    def flush(self):
+        """Ingest everything queued so far and write the open segment now."""
+        with self._writer_lock:
+            self._drain()
+            self._write_segment()
+
+    def _drain(self):
+        batch = []
+        pending = self._pending
+        while pending:
+            batch.append(pending.popleft())
+        if not batch:
+            return
+        with self._lock:
+            for ts, session_id, faces in batch:
+                self._aggregate(ts, session_id, faces)
+        if self.sink != "memory":
+            for ts, session_id, faces in batch:
+                self._append_rows(ts, session_id, faces)
+
+    def _session(self, session_id: str) -> _Aggregate:
+        stats = self._sessions.get(session_id)
+        if stats is None:
+            stats = self._sessions[session_id] = _Aggregate(self.window_minutes)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return stats
+
+    def _aggregate(self, ts: float, session_id: str, faces):
+        targets = (self._global, self._session(session_id)) if session_id else (self._global,)
+        session = targets[-1] if session_id else None
+        bucket = self._global.window.bucket_of(ts)
+        masked = unmasked = new_tracks = moved = 0
+        for face in faces:
+            code = _LABEL_CODES.get(face.get("label"), -1)
+            masked += code == _MASK
+            unmasked += code == _NO_MASK
+            track_id = face.get("track_id")
+            if session is None or track_id is None:
+                continue
+            track = session.tracks.get(track_id)
+            if track is None:
+                track = session.tracks[track_id] = [ts, ts, -1, 0, 0]
+                new_tracks += 1
+            if bucket > track[2]:
+                # The track's latest sighting moves to this bucket
+                for agg in targets:
+                    if agg.window.contains(track[2]):
+                        agg.window.add(track[2], _LAST_SEEN, -1)
+                track[2] = bucket
+                moved += 1
+            track[1] = max(track[1], ts)
+            track[3] += 1
+            track[4] += code == _MASK
+
+        for agg in targets:
+            if agg.first_seen is None:
+                agg.first_seen = ts
+            agg.last_seen = ts
+            agg.frames += 1
+            agg.faces += len(faces)
+            agg.masked += masked
+            agg.total_tracks += new_tracks
+            window = agg.window
+            if not window.add(bucket, _FRAMES):
+                continue
+            for field, amount in ((_FACES, len(faces)), (_MASKED, masked), (_UNMASKED, unmasked),
+                                  (_NEW_TRACKS, new_tracks), (_TRACKS, moved), (_LAST_SEEN, moved)):
+                if amount:
+                    window.add(bucket, field, amount)
+
+    def _housekeeping(self, now: float):
+        """Drop tracks, and sessions, not seen within the window."""
+        oldest = self._global.window.bucket_of(now) - self.window_minutes + 1
+        with self._lock:
+            for session_id in list(self._sessions):
+                stats = self._sessions[session_id]
+                stale = [t for t, track in stats.tracks.items() if track[2] < oldest]
+                for track_id in stale:
+                    del stats.tracks[track_id]
+                if stats.window.bucket_of(stats.last_seen) < oldest:
+                    del self._sessions[session_id]
+
+    # Segments
+
+    def _reset_segment(self):
+        self._ts = array("d")
+        self._session_code = array("i")
+        self._track = array("i")
+        self._label = array("b")
+        self._conf = array("f")
+        self._box = array("i")
+        self._session_names: Dict[str, int] = {}
+        self._segment_day = None
+        self._segment_opened = time.time()
+
+    def _append_rows(self, ts: float, session_id: str, faces):
+        if not faces:
+            return
+        day = int(ts // 86400)
+        if self._segment_day != day:
+            if self._ts:
+                self._write_segment()
+            self._segment_day = day
+        code = self._session_names.setdefault(session_id, len(self._session_names))
+        for face in faces:
+            box = face["box"]
+            self._ts.append(ts)
+            self._session_code.append(code)
+            track_id = face.get("track_id")
+            self._track.append(-1 if track_id is None else int(track_id))
+            self._label.append(_LABEL_CODES.get(face.get("label"), -1))
+            self._conf.append(face.get("confidence", 0.0))
+            self._box.extend((box["startX"], box["startY"], box["endX"], box["endY"]))
+        if len(self._ts) >= self.segment_rows:
+            self._write_segment()
+
+    def _encode_segment(self) -> bytes:
+        ts = np.frombuffer(self._ts, dtype=np.float64)
+        codes = np.frombuffer(self._session_code, dtype=np.int32)
+        names = list(self._session_names)
+        track = np.frombuffer(self._track, dtype=np.int32)
+        label = np.frombuffer(self._label, dtype=np.int8)
+        conf = np.frombuffer(self._conf, dtype=np.float32)
+        box = np.frombuffer(self._box, dtype=np.int32).reshape(-1, 4)
+        buf = io.BytesIO()
+        if self.fmt == "npz":
+            np.savez_compressed(
+                buf, timestamp=ts, session_code=codes, session_names=np.array(names, dtype=str),
+                track_id=track, label_code=label, label_names=np.array(LABELS, dtype=str),
+                confidence=conf, box=box,
+            )
+            return buf.getvalue()
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({
+            "timestamp": pa.array((ts * 1e6).astype(np.int64), type=pa.timestamp("us", tz="UTC")),
+            "session_id": pa.DictionaryArray.from_arrays(codes, names),
+            "track_id": pa.array(track, mask=track < 0),
+            "label": pa.DictionaryArray.from_arrays(pa.array(label, mask=label < 0), list(LABELS)),
+            "confidence": conf,
+            "x1": box[:, 0], "y1": box[:, 1], "x2": box[:, 2], "y2": box[:, 3],
+        })
+        pq.write_table(table, buf, compression="zstd")
+        return buf.getvalue()
+
+    def _write_segment(self):
+        if not self._ts:
+            return
+        rows = len(self._ts)
+        day = datetime.fromtimestamp(self._ts[0], tz=timezone.utc).strftime("%Y-%m-%d")
+        name = f"date={day}/{self.worker_id}-{int(self._ts[0] * 1000)}-{self._segment_seq:06d}.{self.fmt}"
+        self._segment_seq += 1
+        try:
+            payload = self._encode_segment()
+        except Exception:
+            self.write_errors += 1
+            logger.exception("Could not encode detection log segment (%d rows dropped)", rows)
+            self._reset_segment()
+            return
+        self._reset_segment()
+        try:
+            if self.sink == "minio":
+                self._write_minio(name, payload)
+            else:
+                self._write_local(name, payload)
+        except Exception as e:
+            self.write_errors += 1
+            if self.sink != "minio":
+                logger.error("Could not write detection log segment %s: %s", name, e)
+                return
+            logger.warning("Could not upload detection log segment %s, keeping it locally: %s", name, e)
+            self._write_local(name, payload)
+        self.rows += rows
+        self.segments += 1
+        self.segment_bytes += len(payload)
+
+    def _write_local(self, name: str, payload: bytes):
+        path = os.path.join(self.directory, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers listing the directory never see a partial segment
+        with open(path + ".tmp", "wb") as f:
+            f.write(payload)
+        os.replace(path + ".tmp", path)
+
+    def _write_minio(self, name: str, payload: bytes):
+        from app.services import minio_service
+
+        minio_service.ensure_bucket(settings.MINIO_BUCKET)
+        minio_service.upload_stream(settings.MINIO_BUCKET, self.prefix + name, io.BytesIO(payload), len(payload))
+
+    # Queries
+
+    def get_stats(self, minutes: Optional[int] = None) -> dict:
+        """All-session aggregates plus log counters."""
+        with self._lock:
+            self._global.window.advance(self._global.window.bucket_of(time.time()))
+            report = self._global.report(minutes)
+            report["sessions"] = len(self._sessions)
+        report["log"] = {
+            "sink": self.sink,
+            "format": self.fmt if self.sink != "memory" else None,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "pending": self.pending,
+            "rows_written": self.rows,
+            "segments": self.segments,
+            "segment_bytes": self.segment_bytes,
+            "write_errors": self.write_errors,
+        }
+        return report
+
+    def session_stats(self, session_id: str, minutes: Optional[int] = None, series: bool = False,
+                      tracks: bool = False) -> Optional[dict]:
+        """
+        Aggregates of one session, None if it has no frames in the window.
+
+        Args:
+            minutes: Window length to report (defaults to the whole window)
+            series: Include per-minute buckets
+            tracks: Include per-track summaries of the tracks seen in the window
+        """
+        with self._lock:
+            stats = self._sessions.get(session_id)
+            if stats is None:
+                return None
+            stats.window.advance(stats.window.bucket_of(time.time()))
+            report = self._session_report(session_id, stats, minutes, series, tracks)
+        return report
+
+    def _session_report(self, session_id, stats: _Aggregate, minutes, series, tracks) -> dict:
+        report = {"session_id": session_id, **stats.report(minutes)}
+        if series:
+            report["series"] = stats.window.series()
+        if tracks:
+            oldest = stats.window.head - stats.window.size + 1
+            report["tracks"] = [
+                {
+                    "track_id": track_id,
+                    "first_seen": first,
+                    "last_seen": last,
+                    "faces": faces,
+                    "mask_ratio": round(masked / faces, 4) if faces else None,
+                }
+                for track_id, (first, last, bucket, faces, masked) in stats.tracks.items()
+                if bucket >= oldest
+            ]
+        return report
+
+    def close(self):
+        """Stop the writer after ingesting the queue and writing the open segment."""
+        self._stop.set()
+        self._thread.join(timeout=30)
+
+
+def _create_detection_log() -> Optional[DetectionLog]:
+    sink = settings.DETECTION_LOG.lower()
+    if sink == "off":
+        return None
+    return DetectionLog(
+        sink=sink,
+        directory=settings.DETECTION_LOG_DIR,
+        prefix=settings.DETECTION_LOG_PREFIX,
+        fmt=settings.DETECTION_LOG_FORMAT.lower(),
+        segment_rows=settings.DETECTION_LOG_SEGMENT_ROWS,
+        flush_seconds=settings.DETECTION_LOG_FLUSH_SECONDS,
+        max_pending=settings.DETECTION_LOG_MAX_PENDING,
+        window_minutes=settings.ANALYTICS_WINDOW_MINUTES,
+        max_sessions=settings.ANALYTICS_MAX_SESSIONS,
+    )
+
+
+_log: Optional[DetectionLog] = None
+_log_created = False
+_log_lock = threading.Lock()
+
+
+def get_detection_log() -> Optional[DetectionLog]:
+    """Get the global detection log, or None when DETECTION_LOG is off."""
+    global _log, _log_created
+    if not _log_created:
+        with _log_lock:
+            if not _log_created:
+                _log = _create_detection_log()
+                _log_created = True
+    return _log
+
+
+def record_detections(session_id: Optional[str], result: Optional[dict]):
+    """Queue a served result for the detection log (no-op when it is off)."""
+    log = get_detection_log()
+    if log is not None:
+        log.record(session_id, result)
+
+
+def shutdown_detection_log():
+    """Write out everything still queued (app shutdown)."""
+    global _log, _log_created
+    with _log_lock:
+        if _log is not None:
+            _log.close()
+        _log = None
+        _log_created = False
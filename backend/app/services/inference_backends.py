@@ -0,0 +1,319 @@
+"""
+Pluggable inference backends for the face detector and the mask classifier.
+
+"native" runs Ultralytics YOLO (PyTorch) and the Keras mask_net; "onnx"
+runs both exported models on ONNX Runtime so TensorFlow and PyTorch stay
+out of the inference hot path. Framework imports are deferred to the
+backend that needs them. "stub" needs no weights at all: it returns
+synthetic faces after a configurable delay, for load tests on CPU-only
+machines (see benchmarks/loadtest.py).
+
+Detectors return one Detections per image. Detections exposes the same
+numpy attributes (xyxy, xywh, conf, cls) that the Ultralytics trackers
+read, so it can be passed to BoT-SORT/ByteTrack directly.
+"""
+
+import ast
+import hashlib
+import os
+import time
+from typing import List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "..", "..", "model")
+
+
+class Detections:
+    """Boxes detected in one image, in original image coordinates."""
+
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: Optional[np.ndarray] = None):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.zeros_like(self.conf) if cls is None else np.asarray(cls, dtype=np.float32).reshape(-1)
+
+    @property
+    def xywh(self) -> np.ndarray:
+        xywh = np.empty_like(self.xyxy)
+        xywh[:, 0] = (self.xyxy[:, 0] + self.xyxy[:, 2]) / 2
+        xywh[:, 1] = (self.xyxy[:, 1] + self.xyxy[:, 3]) / 2
+        xywh[:, 2] = self.xyxy[:, 2] - self.xyxy[:, 0]
+        xywh[:, 3] = self.xyxy[:, 3] - self.xyxy[:, 1]
+        return xywh
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def __getitem__(self, index) -> "Detections":
+        return Detections(self.xyxy[index], self.conf[index], self.cls[index])
+
+
+class UltralyticsDetector:
+    """YOLO face detector on PyTorch through Ultralytics."""
+
+    name = "ultralytics"
+
+    def __init__(self, weights: str):
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+
+    def detect(self, images: Sequence[np.ndarray], conf: float = 0.5, imgsz: Optional[int] = None) -> List[Detections]:
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        results = self.model(list(images), conf=conf, verbose=False, **kwargs)
+        out = []
+        for r in results:
+            boxes = r.boxes.cpu().numpy()
+            out.append(Detections(boxes.xyxy, boxes.conf, boxes.cls))
+        return out
+
+
+class KerasClassifier:
+    """The float32 Keras mask_net."""
+
+    name = "keras"
+
+    def __init__(self, path: str):
+        from tensorflow.keras.models import load_model
+        self.model = load_model(path)
+
+    def predict(self, faces: np.ndarray) -> np.ndarray:
+        return self.model.predict(faces, batch_size=32, verbose=0)
+
+
+def _onnx_session(path: str):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if settings.ONNX_THREADS > 0:
+        options.intra_op_num_threads = settings.ONNX_THREADS
+        options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    providers = [p.strip() for p in settings.ONNX_PROVIDERS.split(",") if p.strip()]
+    return ort.InferenceSession(path, sess_options=options, providers=providers)
+
+
+class OnnxDetector:
+    """
+    YOLOv8 face detector exported to ONNX.
+
+    Reproduces Ultralytics pre/post-processing: letterbox to imgsz (minimal
+    stride-32 padding when the model has dynamic axes), RGB /255 NCHW input,
+    confidence filtering and NMS, boxes mapped back to the original image.
+    """
+
+    name = "onnx"
+
+    def __init__(self, path: str, imgsz: int = 640, iou: float = 0.7, max_det: int = 300):
+        self.session = _onnx_session(path)
+        self.input_name = self.session.get_inputs()[0].name
+        shape = self.session.get_inputs()[0].shape
+        self.dynamic = not all(isinstance(d, int) for d in shape[2:])
+        self.fixed_batch = isinstance(shape[0], int)
+        self.imgsz = imgsz if self.dynamic else int(shape[2])
+        self.iou = iou
+        self.max_det = max_det
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.num_classes = len(ast.literal_eval(meta["names"])) if "names" in meta else 1
+
+    def _letterbox(self, image: np.ndarray, imgsz: int):
+        h, w = image.shape[:2]
+        r = min(imgsz / h, imgsz / w)
+        new_w, new_h = int(round(w * r)), int(round(h * r))
+        dw, dh = imgsz - new_w, imgsz - new_h
+        if self.dynamic:
+            dw, dh = dw % 32, dh % 32
+        left, top = dw // 2, dh // 2
+        if (new_w, new_h) != (w, h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        image = cv2.copyMakeBorder(image, top, dh - top, left, dw - left, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        blob = cv2.dnn.blobFromImage(image, 1 / 255.0, swapRB=True)
+        return blob, r, left, top
+
+    def _postprocess(self, output: np.ndarray, r: float, left: int, top: int, shape, conf: float) -> Detections:
+        preds = output.T  # (anchors, 4 + nc + extra)
+        class_scores = preds[:, 4:4 + self.num_classes]
+        scores = class_scores.max(axis=1)
+        keep = scores >= conf
+        if not np.any(keep):
+            return Detections(np.empty((0, 4)), np.empty(0))
+        preds, scores, cls = preds[keep], scores[keep], class_scores[keep].argmax(axis=1)
+
+        xywh = preds[:, :4]
+        boxes = np.empty_like(xywh)
+        boxes[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+        boxes[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+        boxes[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+        boxes[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+
+        nms_boxes = np.stack([boxes[:, 0], boxes[:, 1], xywh[:, 2], xywh[:, 3]], axis=1)
+        idx = cv2.dnn.NMSBoxes(nms_boxes.tolist(), scores.tolist(), conf, self.iou)
+        idx = np.asarray(idx, dtype=int).reshape(-1)[:self.max_det]
+
+        boxes = boxes[idx]
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - left) / r
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - top) / r
+        h, w = shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        return Detections(boxes, scores[idx], cls[idx])
+
+    def detect(self, images: Sequence[np.ndarray], conf: float = 0.5, imgsz: Optional[int] = None) -> List[Detections]:
+        # A fixed-shape export only runs at its own input size
+        imgsz = imgsz if imgsz and self.dynamic else self.imgsz
+        prepared = [self._letterbox(image, imgsz) for image in images]
+        results: List[Optional[Detections]] = [None] * len(images)
+
+        # Images sharing a letterboxed shape run as one batch (unless the export has a fixed batch)
+        groups = {}
+        for i, (blob, _, _, _) in enumerate(prepared):
+            key = blob.shape if not self.fixed_batch else i
+            groups.setdefault(key, []).append(i)
+        for indices in groups.values():
+            batch = np.concatenate([prepared[i][0] for i in indices], axis=0)
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+            for i, output in zip(indices, outputs):
+                _, r, left, top = prepared[i]
+                results[i] = self._postprocess(output, r, left, top, images[i].shape, conf)
+        return results
+
+
+class OnnxClassifier:
+    """mask_net converted to ONNX (NHWC float32 input, softmax output)."""
+
+    name = "onnx"
+
+    def __init__(self, path: str):
+        self.session = _onnx_session(path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, faces: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: faces.astype(np.float32, copy=False)})[0]
+
+
+class StubDetector:
+    """
+    Weight-free stand-in for the face detector.
+
+    Each frame gets STUB_FACES boxes on a fixed grid, nudged by the frame
+    content so boxes move a little between frames and trackers can follow
+    them. A call sleeps STUB_DETECT_MS plus STUB_DETECT_IMAGE_MS per frame,
+    which releases the GIL like real inference does.
+    """
+
+    name = "stub"
+
+    def __init__(self, faces: int = 2, call_ms: float = 8.0, image_ms: float = 2.0):
+        self.faces = faces
+        self.call_ms = call_ms
+        self.image_ms = image_ms
+
+    def _boxes(self, image: np.ndarray) -> np.ndarray:
+        h, w = image.shape[:2]
+        side = max(8.0, min(w, h) / 6.0)
+        shift = float(image[::32, ::32].mean()) / 255.0 * side * 0.25
+        columns = max(1, int(np.ceil(np.sqrt(self.faces))))
+        boxes = np.empty((self.faces, 4), dtype=np.float32)
+        for i in range(self.faces):
+            row, col = divmod(i, columns)
+            x = (col + 0.5) * w / columns - side / 2 + shift
+            y = (row + 0.5) * h / columns - side / 2 + shift
+            boxes[i] = (x, y, x + side, y + side)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        return boxes
+
+    def detect(self, images: Sequence[np.ndarray], conf: float = 0.5, imgsz: Optional[int] = None) -> List[Detections]:
+        time.sleep((self.call_ms + self.image_ms * len(images)) / 1000.0)
+        out = []
+        for image in images:
+            boxes = self._boxes(image)
+            out.append(Detections(boxes, np.full(len(boxes), 0.9, dtype=np.float32)))
+        return out
+
+
+class StubClassifier:
+    """Weight-free stand-in for mask_net: label from crop brightness, STUB_CLASSIFY_MS per face."""
+
+    name = "stub"
+
+    def __init__(self, face_ms: float = 0.5):
+        self.face_ms = face_ms
+
+    def predict(self, faces: np.ndarray) -> np.ndarray:
+        time.sleep(self.face_ms * len(faces) / 1000.0)
+        mask = faces.reshape(len(faces), -1).mean(axis=1).clip(0.0, 1.0).astype(np.float32)
+        return np.stack([1.0 - mask, mask], axis=1)
+
+
+def detector_path(backend: Optional[str] = None) -> str:
+    """Weights file of the face detector for the configured backend."""
+    backend = backend or settings.INFERENCE_BACKEND
+    if backend == "native":
+        return settings.YOLO_WEIGHTS
+    if backend == "onnx":
+        return settings.ONNX_DETECTOR_PATH or os.path.join(MODEL_DIR, "yolov8n-face.onnx")
+    if backend == "stub":
+        return ""
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def classifier_path(backend: Optional[str] = None) -> str:
+    """Model file of the mask classifier for the configured backend."""
+    backend = backend or settings.MASK_CLASSIFIER or settings.INFERENCE_BACKEND
+    if backend in ("native", "keras"):
+        return settings.MASK_MODEL_PATH or os.path.join(MODEL_DIR, "model.h5")
+    if backend == "onnx":
+        return settings.ONNX_CLASSIFIER_PATH or os.path.join(MODEL_DIR, "model.onnx")
+    if backend == "onnx-int8":
+        return settings.ONNX_INT8_CLASSIFIER_PATH or os.path.join(MODEL_DIR, "model_int8.onnx")
+    if backend == "stub":
+        return ""
+    raise ValueError(f"Unknown classifier backend: {backend}")
+
+
+def create_detector(backend: Optional[str] = None):
+    """Face detector for the configured backend."""
+    backend = backend or settings.INFERENCE_BACKEND
+    if backend == "native":
+        return UltralyticsDetector(detector_path(backend))
+    if backend == "stub":
+        return StubDetector(settings.STUB_FACES, settings.STUB_DETECT_MS, settings.STUB_DETECT_IMAGE_MS)
+    return OnnxDetector(detector_path(backend))
+
+
+def create_classifier(backend: Optional[str] = None):
+    """
+    Mask classifier for the configured backend.
+
+    settings.MASK_CLASSIFIER overrides INFERENCE_BACKEND for the classifier
+    alone: "keras", "onnx" or "onnx-int8" (see scripts/quantize_classifier.py).
+    """
+    backend = backend or settings.MASK_CLASSIFIER or settings.INFERENCE_BACKEND
+    if backend in ("native", "keras"):
+        return KerasClassifier(classifier_path(backend))
+    if backend == "stub":
+        return StubClassifier(settings.STUB_CLASSIFY_MS)
+    return OnnxClassifier(classifier_path(backend))
+
+
+def model_version() -> str:
+    """
+    Short fingerprint of the configured models (backends, files, sizes, mtimes).
+
+    Changes whenever a backend is switched or a model file is replaced, so
+    cached results of the previous models are never served.
+    """
+    parts = [settings.INFERENCE_BACKEND, settings.MASK_CLASSIFIER]
+    for path in (detector_path(), classifier_path()):
+        parts.append(path)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.extend([str(stat.st_size), str(int(stat.st_mtime))])
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).hexdigest()
@@ -0,0 +1,309 @@
+"""
+Bounded executor for model work with admission control.
+
+Route handlers are async and hand inference to a dedicated, fixed-size
+pool instead of FastAPI's shared threadpool. At most `max_in_flight`
+inferences run at once and at most `max_queue` requests wait for a slot;
+anything beyond that (or waiting longer than `queue_timeout`) is rejected
+with ExecutorSaturated so the route can answer 503 with Retry-After
+instead of letting latency grow without bound.
+
+With kind="workers", stateless frames are decoded in the API process and
+handed to a multi-process WorkerPool over shared memory.
+
+Background work on its own threads (video jobs) goes through run_blocking(),
+which takes its slots through the same admission as the routes.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.worker_pool import WorkerPool
+from app.utils.image_utils import choose_reduce_factor, decode_image_bytes
+from app.utils.timing import StageTimer
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a request cannot be admitted to the inference executor."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference capacity exhausted")
+        self.retry_after = retry_after
+
+
+def _init_process_worker():
+    """Process-pool initializer: load and warm up the models before taking work."""
+    from app.services.model_registry import get_model_registry
+    get_model_registry().load()
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict) -> Tuple[Any, Dict[str, float]]:
+    """Run fn with a fresh StageTimer and return its result with the stage timings."""
+    timer = StageTimer()
+    result = fn(*args, timer=timer, **kwargs)
+    return result, timer.stages
+
+
+class InferenceExecutor:
+    """
+    Sized pool for inference with a bounded admission queue.
+
+    Attributes:
+        kind: "thread", "process" or "workers"
+        workers: Pool size
+        max_in_flight: Inferences allowed to run concurrently
+        max_queue: Requests allowed to wait for a slot
+        queue_timeout: Longest wait for a slot (seconds)
+        retry_after: Retry-After hint returned when saturated (seconds)
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 8,
+        max_in_flight: int = 0,
+        max_queue: int = 32,
+        queue_timeout: float = 5.0,
+        retry_after: int = 1,
+        worker_pool: Optional[WorkerPool] = None,
+    ):
+        if kind not in ("thread", "process", "workers"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_in_flight = max_in_flight if max_in_flight > 0 else self.workers
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        # Tracker sessions live in this process, so stateful calls always use threads
+        self._thread_executor = ThreadPoolExecutor(self.workers, thread_name_prefix="inference")
+        if kind == "process":
+            self._executor: Executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_process_worker
+            )
+        else:
+            self._executor = self._thread_executor
+        if kind == "workers" and worker_pool is None:
+            raise ValueError("A WorkerPool is required for kind='workers'")
+        self.worker_pool = worker_pool
+
+        # Admission bookkeeping happens on the event loop, so plain counters suffice
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold an inference slot for the duration of the block, or raise ExecutorSaturated."""
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after)
+
+        self.waiting += 1
+        # wait_for() on Python <= 3.11 can lose a permit granted just as it times out,
+        # so the acquire runs as its own task and a late permit is handed back
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        acquired = False
+        try:
+            await asyncio.wait({acquire}, timeout=self.queue_timeout)
+            acquired = acquire.done()
+        finally:
+            self.waiting -= 1
+            if not acquired:
+                acquire.cancel()
+                acquire.add_done_callback(self._return_permit)
+        if not acquired:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def _return_permit(self, acquire: "asyncio.Future"):
+        """Release a permit the abandoned acquire task obtained after all."""
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._slots.release()
+
+    async def run_timed(self, fn: Callable, *args, stateful: bool = False, **kwargs) -> Tuple[Any, Dict[str, float]]:
+        """
+        Run fn(*args, timer=..., **kwargs) in the pool.
+
+        Args:
+            fn: Module-level function accepting a `timer` keyword argument
+            stateful: Needs in-process state (tracker sessions); always runs on a thread
+
+        Returns:
+            Tuple of (result, stage timings in ms including the admission wait)
+        """
+        queued_at = time.perf_counter()
+        async with self.admit():
+            queue_ms = (time.perf_counter() - queued_at) * 1000.0
+            executor = self._thread_executor if stateful else self._executor
+            loop = asyncio.get_running_loop()
+            result, stages = await loop.run_in_executor(
+                executor, functools.partial(_timed_call, fn, args, kwargs)
+            )
+        stages = {"queue": queue_ms, **stages}
+        stages["total"] = (time.perf_counter() - queued_at) * 1000.0
+        return result, stages
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Event loop that admission runs on, for run_blocking() callers (set at app startup)."""
+        self._loop = loop
+
+    def run_blocking(self, fn: Callable, *args, stateful: bool = False, **kwargs) -> Tuple[Any, Dict[str, float]]:
+        """
+        run_timed() for callers on their own threads, e.g. video jobs.
+
+        The call is admitted on the bound event loop like a request, so
+        background work shares max_in_flight with the routes. Without a
+        running loop (scripts, benchmarks) fn runs inline.
+
+        Raises:
+            ExecutorSaturated: Like run_timed(); callers back off and retry
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            return _timed_call(fn, args, kwargs)
+        return asyncio.run_coroutine_threadsafe(
+            self.run_timed(fn, *args, stateful=stateful, **kwargs), loop
+        ).result()
+
+    async def predict_stateless(
+        self, data: bytes, return_image: bool = False, detect_options=None
+    ) -> Tuple[dict, Optional[np.ndarray], Dict[str, float]]:
+        """
+        Stateless prediction for encoded image bytes.
+
+        Args:
+            data: Encoded image
+            return_image: Also return the decoded frame, for rendering an annotated response
+            detect_options: DetectOptions for this request (None = settings)
+
+        Returns:
+            Tuple of (result, decoded frame or None, stage timings in ms)
+        """
+        if self.worker_pool is None:
+            from app.services import ai_service
+            (result, image), stages = await self.run_timed(
+                ai_service.predict_from_bytes, data, return_image=return_image, detect_options=detect_options
+            )
+            return result, image, stages
+
+        queued_at = time.perf_counter()
+        async with self.admit():
+            stages = {"queue": (time.perf_counter() - queued_at) * 1000.0}
+            loop = asyncio.get_running_loop()
+
+            started = time.perf_counter()
+            image = await loop.run_in_executor(
+                self._thread_executor,
+                lambda: decode_image_bytes(data, choose_reduce_factor(data, settings.DECODE_MAX_SIDE)),
+            )
+            stages["decode"] = (time.perf_counter() - started) * 1000.0
+
+            started = time.perf_counter()
+            future = await loop.run_in_executor(
+                self._thread_executor, self.worker_pool.submit, image, detect_options
+            )
+            result, worker_stages = await asyncio.wrap_future(future)
+            stages["worker"] = (time.perf_counter() - started) * 1000.0
+            stages.update(worker_stages)
+        stages["total"] = (time.perf_counter() - queued_at) * 1000.0
+        return result, (image if return_image else None), stages
+
+    def load(self) -> float:
+        """Admitted plus waiting requests relative to max_in_flight (1.0 = all slots busy)."""
+        return (self.in_flight + self.waiting) / float(self.max_in_flight)
+
+    def shutdown(self):
+        """Stop pools and worker processes."""
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
+        if self._executor is not self._thread_executor:
+            self._executor.shutdown(wait=False)
+        self._thread_executor.shutdown(wait=False)
+
+    def get_stats(self) -> dict:
+        """Current load and admission counters."""
+        stats = {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "load": round(self.load(), 3),
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
+        if self.worker_pool is not None:
+            stats["worker_pool"] = self.worker_pool.get_stats()
+        return stats
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get the global inference executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                worker_pool = None
+                if settings.INFERENCE_EXECUTOR == "workers":
+                    worker_pool = WorkerPool(
+                        num_workers=settings.WORKER_POOL_SIZE or (os.cpu_count() or 1),
+                        threads_per_worker=settings.WORKER_THREADS,
+                        pin_cpus=settings.WORKER_PIN_CPUS,
+                        slot_bytes=settings.WORKER_SLOT_BYTES,
+                        slots_per_worker=settings.WORKER_SLOTS_PER_WORKER,
+                        max_batch=settings.BATCH_MAX_SIZE,
+                        heartbeat_timeout=settings.WORKER_HEARTBEAT_TIMEOUT,
+                    )
+                _executor = InferenceExecutor(
+                    kind=settings.INFERENCE_EXECUTOR,
+                    workers=settings.INFERENCE_WORKERS,
+                    max_in_flight=settings.INFERENCE_MAX_IN_FLIGHT,
+                    max_queue=settings.INFERENCE_MAX_QUEUE,
+                    queue_timeout=settings.INFERENCE_QUEUE_TIMEOUT,
+                    retry_after=settings.INFERENCE_RETRY_AFTER,
+                    worker_pool=worker_pool,
+                )
+    return _executor
+
+
+def current_load() -> float:
+    """Load of the global executor, 0.0 if it has not been created (e.g. inside worker processes)."""
+    executor = _executor
+    return executor.load() if executor is not None else 0.0
+
+
+def shutdown_inference_executor():
+    """Release the global executor (worker processes, shared memory)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
@@ -1,4 +1,8 @@
 import tempfile, os
+import logging
+import threading
+from typing import Iterable, List, Optional
+import urllib3
 from minio import Minio
 from app.core.config import settings
 
@@ -7,33 +11,98 @@ class MinioSettings:
     MINIO_ACCESS_KEY = settings.MINIO_ACCESS_KEY
     MINIO_SECRET_KEY = settings.MINIO_SECRET_KEY
     MINIO_BUCKET = settings.MINIO_BUCKET
+    MINIO_POOL_SIZE = settings.MINIO_POOL_SIZE
+    MINIO_PART_SIZE = settings.MINIO_PART_SIZE
 
 settings = MinioSettings()
 
+logger = logging.getLogger(__name__)
+
 minio_client = Minio(
     settings.MINIO_ENDPOINT,
     access_key=settings.MINIO_ACCESS_KEY,
     secret_key=settings.MINIO_SECRET_KEY,
-    secure=False
+    secure=False,
+    # One shared connection pool sized for concurrent prefetching
+    http_client=urllib3.PoolManager(
+        maxsize=settings.MINIO_POOL_SIZE,
+        timeout=urllib3.Timeout(connect=5.0, read=60.0),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    ),
 )
 
+# Buckets known to exist; checked once (at startup or first use) instead of on every request
+_known_buckets = set()
+_buckets_lock = threading.Lock()
+
 def ensure_bucket(bucket_name: str):
-    if not minio_client.bucket_exists(bucket_name):
-        minio_client.make_bucket(bucket_name)
+    if bucket_name in _known_buckets:
+        return
+    with _buckets_lock:
+        if bucket_name in _known_buckets:
+            return
+        if not minio_client.bucket_exists(bucket_name):
+            minio_client.make_bucket(bucket_name)
+        _known_buckets.add(bucket_name)
 
-def upload_fileobj(bucket_name: str, object_name: str, fileobj):
+def init_buckets(bucket_names: Iterable[str]):
+    """Create/check buckets at startup; an unreachable MinIO is retried on first use."""
+    for bucket_name in bucket_names:
+        try:
+            ensure_bucket(bucket_name)
+        except Exception as e:
+            logger.warning("Bucket check for %s failed, retrying on first use: %s", bucket_name, e)
+
+def upload_fileobj(bucket_name: str, object_name: str, fileobj, metadata: Optional[dict] = None,
+                   content_type: str = "application/octet-stream"):
+    """
+    Stream a seekable file object (e.g. UploadFile.file) to MinIO.
+    
+    The body is read part by part (MINIO_PART_SIZE, multipart upload above
+    that size), so memory stays bounded by one part whatever the file size.
+    """
     ensure_bucket(bucket_name)
-    # fileobj must be a readable file-like object positioned at start
+    fileobj.seek(0, os.SEEK_END)
+    length = fileobj.tell()
     fileobj.seek(0)
-    # minio requires size or will stream; we'll read bytes to memory for simplicity (not ideal for huge files)
-    data = fileobj.read()
-    from io import BytesIO
-    data_stream = BytesIO(data)
-    minio_client.put_object(bucket_name, object_name, data_stream, length=len(data))
+    minio_client.put_object(
+        bucket_name, object_name, fileobj, length=length, part_size=settings.MINIO_PART_SIZE,
+        content_type=content_type, metadata=metadata,
+    )
+
+def get_object_bytes(bucket_name: str, object_name: str) -> bytes:
+    """Read an object body straight into memory, without a temp file."""
+    response = minio_client.get_object(bucket_name, object_name)
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+def get_metadata(bucket_name: str, object_name: str, key: str) -> Optional[str]:
+    """User metadata value of an object (HEAD request, the body is not fetched)."""
+    stat = minio_client.stat_object(bucket_name, object_name)
+    return stat.metadata.get(f"x-amz-meta-{key}") if stat.metadata else None
+
+def list_object_names(bucket_name: str, prefix: str = "", limit: Optional[int] = None) -> List[str]:
+    """Names of the objects under a prefix (recursive), at most `limit` of them."""
+    names = []
+    for obj in minio_client.list_objects(bucket_name, prefix=prefix, recursive=True):
+        if obj.is_dir:
+            continue
+        names.append(obj.object_name)
+        if limit is not None and len(names) >= limit:
+            break
+    return names
+
+def upload_stream(bucket_name: str, object_name: str, stream, length: int,
+                  content_type: str = "application/octet-stream"):
+    """Upload a readable stream of known length."""
+    minio_client.put_object(bucket_name, object_name, stream, length=length, content_type=content_type)
 
 def download_to_temp(bucket_name: str, object_name: str) -> str:
     ensure_bucket(bucket_name)
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix="_"+object_name)
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix="_"+os.path.basename(object_name))
     try:
         response = minio_client.get_object(bucket_name, object_name)
         with open(tmp.name, "wb") as f:
@@ -0,0 +1,165 @@
+"""
+Model registry with background loading, warm-up and readiness.
+
+Importing the service modules no longer loads any model. At startup the
+registry loads the face detector and the mask classifier concurrently on
+background threads, runs a warm-up inference at each configured batch size
+(so graph compilation does not land on the first real request) and only
+then reports ready. Inference code asks the registry for the models and
+gets ModelNotReady if they are still loading. A failed load is reported at
+once and retried on a later start() after an exponential backoff.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelNotReady(Exception):
+    """Raised when inference is requested before the models are loaded and warmed up."""
+
+
+class ModelRegistry:
+    """
+    Owns the detector and classifier instances.
+
+    Attributes:
+        state: "idle", "loading", "warming_up", "ready" or "failed"
+        timings: Seconds spent loading each model and warming up
+        failures: Failed load attempts since the last successful one
+    """
+
+    def __init__(self):
+        self._detector: Any = None
+        self._classifier: Any = None
+        self._ready = threading.Event()
+        # Set when the current load attempt ends, whether it succeeded or failed
+        self._attempt_done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.failures = 0
+        self.timings: Dict[str, float] = {}
+
+    def start(self):
+        """
+        Start loading in the background; returns immediately. Safe to call more than once.
+
+        After a failed load a new attempt starts once the retry backoff has passed.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.state == "failed" and time.monotonic() < self._retry_at:
+                return
+            self._attempt_done = threading.Event()
+            self.state = "loading"
+            self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def load(self):
+        """Load both models concurrently, then warm them up. Blocks until done."""
+        from app.services.inference_backends import create_classifier, create_detector
+
+        self.state = "loading"
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(2, thread_name_prefix="model-load") as pool:
+                detector_future = pool.submit(self._timed, "detector_load_s", create_detector)
+                classifier_future = pool.submit(self._timed, "classifier_load_s", create_classifier)
+                self._detector = detector_future.result()
+                self._classifier = classifier_future.result()
+
+            self.state = "warming_up"
+            self._timed("warmup_s", self._warm_up)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                backoff = min(settings.MODEL_RETRY_MAX_BACKOFF,
+                              settings.MODEL_RETRY_BACKOFF * 2 ** (self.failures - 1))
+                self._retry_at = time.monotonic() + backoff
+                self.state = "failed"
+                self.error = repr(e)
+                # Let a later start() run a new attempt
+                self._thread = None
+            self._attempt_done.set()
+            logger.exception("Model loading failed (attempt %d), retry in %.0fs", self.failures, backoff)
+            raise
+        self.timings["total_s"] = round(time.perf_counter() - started, 3)
+        self.failures = 0
+        self.error = None
+        self.state = "ready"
+        self._ready.set()
+        self._attempt_done.set()
+        logger.info("Models ready: %s", self.timings)
+
+    def _timed(self, name: str, fn):
+        started = time.perf_counter()
+        result = fn()
+        self.timings[name] = round(time.perf_counter() - started, 3)
+        return result
+
+    def _warm_up(self):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        for batch_size in warmup_batch_sizes():
+            self._detector.detect([frame] * batch_size)
+            self._classifier.predict(np.zeros((batch_size, 128, 128, 3), dtype=np.float32))
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def models(self) -> Tuple[Any, Any]:
+        """
+        Get (detector, classifier), waiting up to MODEL_WAIT_TIMEOUT for loading.
+
+        A failed load is reported immediately instead of waiting out the timeout.
+
+        Raises:
+            ModelNotReady: Models are still loading or failed to load
+        """
+        if not self._ready.is_set():
+            self.start()
+            if self.state != "failed":
+                self._attempt_done.wait(settings.MODEL_WAIT_TIMEOUT)
+            if not self._ready.is_set():
+                if self.state == "failed":
+                    raise ModelNotReady(f"Model loading failed: {self.error}")
+                raise ModelNotReady(f"Models not ready (state: {self.state})")
+        return self._detector, self._classifier
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "state": self.state,
+            "error": self.error,
+            "failures": self.failures,
+            "backend": settings.INFERENCE_BACKEND,
+            "timings": dict(self.timings),
+        }
+
+
+def warmup_batch_sizes() -> List[int]:
+    """Batch sizes from settings.WARMUP_BATCH_SIZES ("1,8")."""
+    return [int(v) for v in settings.WARMUP_BATCH_SIZES.split(",") if v.strip()]
+
+
+# Global singleton instance
+_model_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the global model registry."""
+    return _model_registry
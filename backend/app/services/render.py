@@ -0,0 +1,207 @@
+"""
+Annotation and encoding of prediction results.
+
+Inference only produces boxes and labels; drawing and image encoding
+happen here, after the frame has left the batch/worker path, on a small
+dedicated thread pool so a slow PNG or full-resolution JPEG never holds
+up the next batch or an inference slot.
+
+Response modes (chosen per request):
+    json     boxes and labels only, no image
+    base64   JSON with the full-resolution annotated JPEG as base64
+    preview  JSON with a downscaled, lower-quality base64 JPEG
+    jpeg     raw annotated image/jpeg body, detections in X-Detections
+    webp     raw annotated image/webp body, detections in X-Detections
+    png      raw annotated image/png body, detections in X-Detections
+
+X-Detections is capped at DETECTIONS_HEADER_MAX_BYTES (proxies and servers
+reject large headers): crowded frames switch to a compact row form, and
+results that still do not fit are answered as JSON with the image embedded.
+"""
+
+import asyncio
+import base64
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+RESPONSE_MODES = ("json", "base64", "preview", "jpeg", "webp", "png")
+BINARY_MODES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+@dataclass
+class RenderOptions:
+    """
+    How a prediction should be returned to the client.
+
+    Attributes:
+        mode: One of RESPONSE_MODES
+        quality: JPEG/WebP quality 1-100 (None = mode default)
+        max_side: Downscale the annotated image so its longest side fits (None/0 = mode default)
+    """
+    mode: str = "json"
+    quality: Optional[int] = None
+    max_side: Optional[int] = None
+
+    def __post_init__(self):
+        if self.mode not in RESPONSE_MODES:
+            raise ValueError(f"Unknown response mode '{self.mode}', expected one of {', '.join(RESPONSE_MODES)}")
+        if self.quality is not None and not 1 <= self.quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+
+    @property
+    def needs_image(self) -> bool:
+        return self.mode != "json"
+
+    @property
+    def image_format(self) -> str:
+        return self.mode if self.mode in BINARY_MODES else "jpeg"
+
+    def resolved(self) -> Tuple[Optional[int], int]:
+        """(quality, max_side) with mode defaults applied."""
+        if self.mode == "preview":
+            return (self.quality or settings.PREVIEW_QUALITY,
+                    self.max_side if self.max_side is not None else settings.PREVIEW_MAX_SIDE)
+        return self.quality, self.max_side or 0
+
+
+def annotate(image: np.ndarray, result: dict) -> np.ndarray:
+    """Draw boxes and labels of a result dict onto image in place."""
+    for face in result["results"]:
+        box = face["box"]
+        label = face["label"]
+        color = (0, 255, 0) if label == "Mask" else (0, 0, 255)
+        cv2.rectangle(image, (box["startX"], box["startY"]), (box["endX"], box["endY"]), color, 3)
+
+        label_text = f"{label}: {face['confidence']:.2f}"
+        if "track_id" in face:
+            # Include track ID in label for debugging
+            label_text = f"ID:{face['track_id']} {label_text}"
+        y = box["startY"] - 10 if box["startY"] - 10 > 10 else box["startY"] + 10
+        cv2.putText(image, label_text, (box["startX"], y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return image
+
+
+def encode_image(image: np.ndarray, image_format: str = "jpeg", quality: Optional[int] = None,
+                 max_side: int = 0) -> bytes:
+    """
+    Encode a BGR frame, optionally downscaled first.
+
+    Args:
+        image: BGR frame
+        image_format: "jpeg", "webp" or "png"
+        quality: JPEG/WebP quality (None = OpenCV default); ignored for PNG
+        max_side: Longest side after downscaling, 0 keeps the original size
+
+    Returns:
+        Encoded image bytes
+    """
+    (h, w) = image.shape[:2]
+    if max_side and max(h, w) > max_side:
+        scale = max_side / float(max(h, w))
+        image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+    params = []
+    if image_format == "jpeg" and quality is not None:
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    elif image_format == "webp" and quality is not None:
+        params = [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    elif image_format == "png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, settings.PNG_COMPRESSION]
+
+    ok, buffer = cv2.imencode("." + ("jpg" if image_format == "jpeg" else image_format), image, params)
+    if not ok:
+        raise ValueError(f"Cannot encode image as {image_format}")
+    return buffer.tobytes()
+
+
+def render(result: dict, image: Optional[np.ndarray], options: RenderOptions) -> Tuple[dict, Optional[bytes]]:
+    """
+    Apply a response mode to an inference result.
+
+    Args:
+        result: Result dict from ai_service (modified in place for base64/preview)
+        image: Decoded frame the result belongs to; may be None for mode "json"
+        options: Requested response mode
+
+    Returns:
+        Tuple of (result dict, encoded image for binary modes or None)
+    """
+    if not options.needs_image or image is None:
+        return result, None
+
+    quality, max_side = options.resolved()
+    encoded = encode_image(annotate(image, result), options.image_format, quality, max_side)
+    if options.mode in BINARY_MODES:
+        return result, encoded
+
+    result["image_base64"] = base64.b64encode(encoded).decode("utf-8")
+    return result, None
+
+
+_HEADER_RESULT_FIELDS = ("faces_detected", "width", "height", "session_id", "detected")
+
+
+def detections_header(result: dict, max_bytes: Optional[int] = None) -> Optional[str]:
+    """
+    Detections of a result for the X-Detections header of binary responses.
+
+    Only boxes, labels, confidences and track IDs are kept. If that is longer
+    than max_bytes (default DETECTIONS_HEADER_MAX_BYTES), faces are written as
+    rows [startX, startY, endX, endY, label index, confidence, track_id] under
+    "faces" with the label names in "labels".
+
+    Returns:
+        Header value, or None when even the compact form does not fit
+    """
+    max_bytes = settings.DETECTIONS_HEADER_MAX_BYTES if max_bytes is None else max_bytes
+    head = {key: result[key] for key in _HEADER_RESULT_FIELDS if key in result}
+    faces = result.get("results") or []
+
+    value = json.dumps({**head, "results": [
+        {key: face[key] for key in ("box", "label", "confidence", "track_id") if key in face} for face in faces
+    ]}, separators=(",", ":"))
+    if len(value) <= max_bytes:
+        return value
+
+    labels = sorted({face["label"] for face in faces})
+    index = {label: i for i, label in enumerate(labels)}
+    rows = [
+        [face["box"]["startX"], face["box"]["startY"], face["box"]["endX"], face["box"]["endY"],
+         index[face["label"]], round(face["confidence"], 3), face.get("track_id")]
+        for face in faces
+    ]
+    value = json.dumps({**head, "labels": labels, "faces": rows}, separators=(",", ":"))
+    return value if len(value) <= max_bytes else None
+
+
+_render_executor: Optional[ThreadPoolExecutor] = None
+_render_lock = threading.Lock()
+
+
+def get_render_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used for annotation and encoding, creating it on first use."""
+    global _render_executor
+    if _render_executor is None:
+        with _render_lock:
+            if _render_executor is None:
+                _render_executor = ThreadPoolExecutor(
+                    max_workers=settings.RENDER_WORKERS, thread_name_prefix="render"
+                )
+    return _render_executor
+
+
+async def render_async(result: dict, image: Optional[np.ndarray],
+                       options: RenderOptions) -> Tuple[dict, Optional[bytes]]:
+    """render() on the render pool; JSON-only results skip the hop."""
+    if not options.needs_image or image is None:
+        return result, None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_executor(), render, result, image, options)
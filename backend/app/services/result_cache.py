@@ -0,0 +1,214 @@
+"""
+Content-addressed cache of prediction responses.
+
+Byte-identical images (client retries, re-audits, duplicated uploads)
+are answered from the cache instead of re-running YOLO + mask_net. Keys
+combine a BLAKE2b hash of the image bytes, the model version and the
+response options, so switching models or asking for a different image
+rendering never returns a stale or mismatched response.
+
+The memory tier is an LRU bounded by entry count and bytes, with a TTL.
+An optional disk tier (RESULT_CACHE_DIR) keeps entries across restarts
+and behind the memory tier; disk hits are promoted back into memory.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.detection import DetectOptions, default_detect_options
+from app.services.inference_backends import model_version
+from app.services.render import RenderOptions
+
+HASH_METADATA_KEY = "content-hash"
+
+
+def content_hash(data: bytes) -> str:
+    """Fast 128-bit content hash of encoded image bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_fileobj(fileobj, chunk_size: int = 1024 * 1024) -> str:
+    """content_hash of a seekable file object, read in chunks; rewinds it afterwards."""
+    h = hashlib.blake2b(digest_size=16)
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        h.update(chunk)
+    fileobj.seek(0)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of (result, encoded image) responses.
+
+    Attributes:
+        max_entries: Entries kept in memory
+        max_bytes: Approximate memory budget of the cached responses
+        ttl: Seconds an entry stays valid (0 = no expiry)
+        disk_dir: Directory of the disk tier (None = memory only)
+        hits, misses, evictions, expirations, disk_hits: Counters
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 1024 * 1024, ttl: float = 3600.0,
+                 disk_dir: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+        self._model_version = model_version()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def make_key(self, digest: str, options: RenderOptions, detect_options: Optional[DetectOptions] = None) -> str:
+        """Cache key of an image digest under the current models, response and detection options."""
+        detect = (detect_options or default_detect_options()).cache_key()
+        return f"{digest}:{self._model_version}:{options.mode}:{options.quality}:{options.max_side}:{detect}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value or None; counts a hit or a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, _, value = entry
+                if self._expired(stored_at, now):
+                    self._remove(key)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+        self._store(key, value[1], value[0], now=value[2])
+        return value[1]
+
+    def put(self, key: str, value: Any, size: int):
+        """Cache a value of approximately `size` bytes."""
+        now = time.time()
+        self._store(key, value, size, now)
+        self._disk_put(key, value, size)
+
+    def _store(self, key: str, value: Any, size: int, now: float):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        """Drop an entry from the memory tier. Caller holds the lock."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - stored_at > self.ttl
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest() + ".pkl")
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[int, Any, float]]:
+        """(size, value, stored_at) from the disk tier, or None."""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self._expired(stored_at, now):
+                os.remove(path)
+                with self._lock:
+                    self.expirations += 1
+                return None
+            with open(path, "rb") as f:
+                stored_key, size, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        return (size, value, stored_at) if stored_key == key else None
+
+    def _disk_put(self, key: str, value: Any, size: int):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump((key, size, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Empty the memory tier (the disk tier expires by TTL)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk_tier": bool(self.disk_dir),
+                "model_version": self._model_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Get the global result cache, or None when RESULT_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+                    max_bytes=settings.RESULT_CACHE_MAX_MB * 1024 * 1024,
+                    ttl=settings.RESULT_CACHE_TTL,
+                    disk_dir=settings.RESULT_CACHE_DIR or None,
+                )
+    return _cache
+
@@ -0,0 +1,287 @@
+"""
+Shared storage for tracker session snapshots.
+
+Sessions normally live in the memory of the uvicorn worker that created
+them. With SESSION_STORE set, workers write session snapshots (see
+TrackerSession.snapshot) to a store they all reach, and the worker that
+receives a session's next frame picks it up from there:
+
+    local   no store, sessions stay in their process (default)
+    memory  in-process dict; one worker, but exercises the snapshot path
+    redis   any server speaking the Redis protocol (SESSION_STORE_URL)
+
+Each session has two keys: the snapshot and a small meta entry with the
+worker that wrote it and the session version (frames seen), so checking
+whether a local copy is current costs one short GET. Both expire after
+the session timeout.
+
+Snapshots are opaque bytes here; TrackerSession signs them with an HMAC
+and rejects entries that were not written with the session store secret.
+"""
+
+import abc
+import bisect
+import hashlib
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+Meta = Tuple[str, int]
+
+
+class SessionStoreError(Exception):
+    """The store rejected a command or returned something unexpected."""
+
+
+def _encode_meta(meta: Meta) -> bytes:
+    return f"{meta[0]}\n{meta[1]}".encode("utf-8")
+
+
+def _decode_meta(raw: Optional[bytes]) -> Optional[Meta]:
+    if raw is None:
+        return None
+    worker, _, version = raw.decode("utf-8").rpartition("\n")
+    try:
+        return worker, int(version)
+    except ValueError:
+        raise SessionStoreError(f"Malformed session meta {raw!r}")
+
+
+class SessionStore(abc.ABC):
+    """Interface of a session snapshot store."""
+
+    kind = "base"
+
+    @abc.abstractmethod
+    def get_meta(self, session_id: str) -> Optional[Meta]:
+        """(worker, version) of the stored snapshot, or None if there is none."""
+
+    @abc.abstractmethod
+    def load(self, session_id: str) -> Optional[bytes]:
+        """The stored snapshot, or None."""
+
+    @abc.abstractmethod
+    def save(self, session_id: str, data: bytes, meta: Meta, ttl: float):
+        """Store a snapshot and its meta, both expiring after `ttl` seconds."""
+
+    @abc.abstractmethod
+    def delete(self, session_id: str):
+        """Remove a snapshot and its meta."""
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Snapshots in a dict of this process."""
+
+    kind = "memory"
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, bytes, Meta]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, session_id: str):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[session_id]
+                return None
+            return entry
+
+    def get_meta(self, session_id: str) -> Optional[Meta]:
+        entry = self._entry(session_id)
+        return entry[2] if entry is not None else None
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        entry = self._entry(session_id)
+        return entry[1] if entry is not None else None
+
+    def save(self, session_id: str, data: bytes, meta: Meta, ttl: float):
+        with self._lock:
+            self._entries[session_id] = (time.time() + ttl, bytes(data), meta)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+class _RespConnection:
+    """One connection speaking RESP2, the Redis wire protocol."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    @staticmethod
+    def _encode(command: Sequence) -> bytes:
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            elif isinstance(arg, int):
+                arg = str(arg).encode("ascii")
+            parts.append(b"$%d\r\n" % len(arg))
+            parts.append(bytes(arg))
+            parts.append(b"\r\n")
+        return b"".join(parts)
+
+    def _reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the session store")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            return SessionStoreError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the session store")
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._reply() for _ in range(length)]
+        raise SessionStoreError(f"Unexpected reply {line[:32]!r}")
+
+    def execute(self, *commands: Sequence) -> List:
+        """Send commands in one write (pipelined) and return their replies in order."""
+        self.sock.sendall(b"".join(self._encode(c) for c in commands))
+        replies = [self._reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, SessionStoreError):
+                raise reply
+        return replies
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Snapshots in a Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Each thread keeps its own connection; a broken connection is reopened
+    once per call before the error is raised.
+
+    Args:
+        url: redis://[:password@]host[:port][/db]
+        prefix: Key prefix
+        timeout: Socket timeout in seconds
+    """
+
+    kind = "redis"
+
+    def __init__(self, url: str, prefix: str = "facemask:", timeout: float = 2.0):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported session store URL {url!r}, expected redis://host:port/db")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> _RespConnection:
+        conn = _RespConnection(self.host, self.port, self.timeout)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            conn.execute(*setup)
+        return conn
+
+    def _execute(self, *commands: Sequence) -> List:
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            try:
+                return conn.execute(*commands)
+            except (OSError, ConnectionError):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def _keys(self, session_id: str) -> Tuple[str, str]:
+        return f"{self.prefix}session:{session_id}", f"{self.prefix}session-meta:{session_id}"
+
+    def get_meta(self, session_id: str) -> Optional[Meta]:
+        return _decode_meta(self._execute(("GET", self._keys(session_id)[1]))[0])
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        return self._execute(("GET", self._keys(session_id)[0]))[0]
+
+    def save(self, session_id: str, data: bytes, meta: Meta, ttl: float):
+        data_key, meta_key = self._keys(session_id)
+        ttl_ms = max(1, int(ttl * 1000))
+        # Snapshot first: a reader that sees the new meta finds the new snapshot
+        self._execute(("SET", data_key, data, "PX", ttl_ms), ("SET", meta_key, _encode_meta(meta), "PX", ttl_ms))
+
+    def delete(self, session_id: str):
+        self._execute(("DEL", *self._keys(session_id)))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class HashRing:
+    """
+    Consistent hashing of session IDs onto workers.
+
+    Adding or removing a worker only moves the sessions of the ring
+    segments it gains or loses (about 1/N of them).
+
+    Args:
+        nodes: Worker names
+        replicas: Virtual nodes per worker, evens out the segments
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 100):
+        self.nodes = list(dict.fromkeys(nodes))
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._keys = [key for key, _ in points]
+        self._owners = [node for _, node in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._owners[index]
+
+
+def create_session_store(kind: str, url: str = "") -> Optional[SessionStore]:
+    """Store for SESSION_STORE (None for "local")."""
+    kind = (kind or "local").lower()
+    if kind == "local":
+        return None
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "redis":
+        return RedisSessionStore(url)
+    raise ValueError(f"Unknown SESSION_STORE {kind!r}, expected local, memory or redis")
@@ -3,39 +3,174 @@ Tracker Manager for Face Mask Detection with BoT-SORT
 
 This module manages tracking sessions for video/webcam streams, providing:
 - Session-based state management for stateless HTTP API
-- Label smoothing via temporal voting to reduce flicker
+- Label smoothing via temporal voting to reduce flicker (O(1) per update)
 - Automatic cleanup of inactive sessions
+- Per-session tracker state with a cap on concurrent sessions (LRU eviction)
+- Track-level classification cache so stable faces skip mask_net
+- Pruning of tracks not seen for a number of frames
+- Adaptive detection interval: full detection every K frames or on motion
+- Compact session snapshots and an optional shared session store, so a
+  session can move between uvicorn workers or replicas (lazy migration)
 """
 
+import hashlib
+import hmac
+import logging
+import os
+import pickle
+import socket
+import struct
+import sys
 import time
-from collections import defaultdict, deque
-from typing import Dict, Tuple, Optional, List
-from dataclasses import dataclass
+from array import array
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Tuple, Optional, List
 import threading
 
+import cv2
+import numpy as np
 
-@dataclass
-class TrackPrediction:
-    """Stores a single prediction for a track."""
-    label: str
-    confidence: float
-    timestamp: float
+from app.core.config import settings
+from app.services.detection import DetectOptions
+from app.services.session_store import HashRing, SessionStore, SessionStoreError, create_session_store
+
+DETECT_MODES = ("every", "adaptive")
+
+logger = logging.getLogger(__name__)
+
+
+# The two labels mask_net produces; histories store their index
+LABELS = ("Mask", "No Mask")
+_LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+_NUM_LABELS = len(LABELS)
+
+# Snapshot layout: header, then per-track arrays of the live slots only
+# (track ids, label/confidence rings, ring positions, vote totals, cache
+# state), the motion thumbnail, the detect options as JSON and the
+# tracker blob, followed by an HMAC-SHA256 of everything before it.
+# Arrays are written in native byte order.
+_SNAPSHOT_MAGIC = b"FMTS"
+_SNAPSHOT_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct("<4sBBHiiqqqqqqdIHHII")
+_SNAPSHOT_DIGEST = hashlib.sha256().digest_size
+
+
+def _snapshot_digest(key: bytes, body) -> bytes:
+    return hmac.new(key, body, hashlib.sha256).digest()
 
 
 class TrackerSession:
     """
     Manages tracking state and prediction history for a single session.
     
+    Per-track state lives in flat arrays indexed by a slot number: one
+    ring buffer of the last `history_size` labels and confidences per
+    slot, plus running vote counts and confidence sums per label that are
+    updated on push and evict, so smoothing is O(1) whatever the history
+    size. Slots of tracks not seen for a while are recycled by
+    prune_stale(), which keeps a long-running session bounded.
+    
     Attributes:
         history_size: Number of frames to keep for label smoothing
-        track_history: Dict mapping track_id -> deque of predictions
-        last_activity: Timestamp of last update
+        last_activity: Timestamp of the last frame
+        tracker: Session-owned BoT-SORT/ByteTrack instance (None if not tracking)
+        lock: Serializes frames of this session, trackers are not thread-safe
+        cache_hits: Faces served from the smoothed label without running mask_net
+        cache_misses: Faces sent to mask_net
+        pruned_tracks: Tracks dropped by prune_stale()
+        detect_mode: "every" frame or "adaptive" detection scheduling
+        detect_options: Detection resolution, ROI and minimum face size (None = settings)
+        detect_interval: Current K, frames between full detections in adaptive mode
+        frames_seen: Frames processed by this session
+        frames_detected: Frames that ran the face detector
+        synced_meta: (worker, version) of the store entry this copy was loaded
+            from or last written as; not part of snapshots
     """
     
-    def __init__(self, history_size: int = 5):
-        self.history_size = history_size
-        self.track_history: Dict[int, deque] = defaultdict(lambda: deque(maxlen=history_size))
+    __slots__ = (
+        "history_size", "last_activity", "tracker", "lock", "cache_hits", "cache_misses", "pruned_tracks",
+        "detect_mode", "detect_options", "detect_interval", "frames_since_detection", "frames_seen",
+        "frames_detected", "last_motion", "_motion_reference", "_slots", "_free", "_capacity", "_slots_lock",
+        "_last_prune", "_labels", "_confidences", "_head", "_count", "_votes", "_sums", "_last_seen",
+        "_cache_age", "_cache_area", "synced_meta",
+    )
+    
+    def __init__(self, history_size: int = 5, tracker: Any = None, capacity: int = 8):
+        self.history_size = max(1, history_size)
         self.last_activity = time.time()
+        self.tracker = tracker
+        self.lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.pruned_tracks = 0
+        self.detect_mode = settings.TRACK_DETECT_MODE
+        self.detect_options = None
+        self.detect_interval = 1
+        self.frames_since_detection = 0
+        self.frames_seen = 0
+        self.frames_detected = 0
+        self.last_motion = 0.0
+        self._motion_reference: Optional[np.ndarray] = None
+        self.synced_meta: Optional[Tuple[str, int]] = None
+        
+        self._slots: Dict[int, int] = {}  # track_id -> slot
+        self._free: List[int] = []
+        self._capacity = 0
+        self._slots_lock = threading.Lock()
+        self._last_prune = 0
+        self._labels = array("b")  # capacity * history_size ring buffers
+        self._confidences = array("d")
+        self._head = array("i")  # next write position in the ring
+        self._count = array("i")  # predictions in the ring
+        self._votes = array("i")  # capacity * _NUM_LABELS
+        self._sums = array("d")  # capacity * _NUM_LABELS
+        self._last_seen = array("q")  # frames_seen when the track was last in a frame
+        self._cache_age = array("i")  # frames since classified, -1 = never classified
+        self._cache_area = array("d")  # box area when last classified
+        self._grow(capacity)
+    
+    def _grow(self, extra: int):
+        """Add `extra` free slots to every array."""
+        start = self._capacity
+        self._capacity += extra
+        self._labels.extend(bytes(extra * self.history_size))
+        self._confidences.extend([0.0] * (extra * self.history_size))
+        for arr in (self._head, self._count, self._last_seen):
+            arr.extend([0] * extra)
+        self._votes.extend([0] * (extra * _NUM_LABELS))
+        self._sums.extend([0.0] * (extra * _NUM_LABELS))
+        self._cache_age.extend([-1] * extra)
+        self._cache_area.extend([0.0] * extra)
+        # Lowest slots are handed out first
+        self._free.extend(range(self._capacity - 1, start - 1, -1))
+    
+    def _slot(self, track_id: int) -> int:
+        """Slot of a track, allocating (and resetting) one for a new track."""
+        slot = self._slots.get(track_id)
+        if slot is not None:
+            return slot
+        with self._slots_lock:
+            slot = self._slots.get(track_id)
+            if slot is None:
+                if not self._free:
+                    self._grow(self._capacity)
+                slot = self._free.pop()
+                self._head[slot] = 0
+                self._count[slot] = 0
+                base = slot * _NUM_LABELS
+                for code in range(_NUM_LABELS):
+                    self._votes[base + code] = 0
+                    self._sums[base + code] = 0.0
+                self._cache_age[slot] = -1
+                self._cache_area[slot] = 0.0
+                self._last_seen[slot] = self.frames_seen
+                self._slots[track_id] = slot
+            return slot
+    
+    @property
+    def track_count(self) -> int:
+        """Tracks currently holding a slot."""
+        return len(self._slots)
     
     def update_track(self, track_id: int, label: str, confidence: float):
         """
@@ -46,41 +181,225 @@ class TrackerSession:
             label: Prediction label ("Mask" or "No Mask")
             confidence: Prediction confidence (0-1)
         """
-        prediction = TrackPrediction(
-            label=label,
-            confidence=confidence,
-            timestamp=time.time()
-        )
-        self.track_history[track_id].append(prediction)
-        self.last_activity = time.time()
+        slot = self._slot(track_id)
+        code = _LABEL_CODES[label]
+        pos = slot * self.history_size + self._head[slot]
+        votes_base = slot * _NUM_LABELS
+        
+        if self._count[slot] == self.history_size:
+            # Ring is full: evict the oldest prediction from the running totals
+            old = votes_base + self._labels[pos]
+            self._votes[old] -= 1
+            # Reset instead of subtracting to zero so rounding errors cannot accumulate
+            self._sums[old] = self._sums[old] - self._confidences[pos] if self._votes[old] else 0.0
+        else:
+            self._count[slot] += 1
+        
+        self._labels[pos] = code
+        self._confidences[pos] = confidence
+        self._votes[votes_base + code] += 1
+        self._sums[votes_base + code] += confidence
+        self._head[slot] = (self._head[slot] + 1) % self.history_size
+        self._last_seen[slot] = self.frames_seen
     
     def get_smoothed_prediction(self, track_id: int) -> Tuple[str, float]:
         """
         Get smoothed prediction using majority voting over history.
         
+        Ties go to the label of the oldest prediction in the history.
+        
         Args:
             track_id: Track ID to get prediction for
             
         Returns:
             Tuple of (label, average_confidence)
         """
-        history = self.track_history[track_id]
-        
-        if not history:
+        slot = self._slots.get(track_id)
+        if slot is None or not self._count[slot]:
             return "Unknown", 0.0
         
-        # Count votes for each label
-        label_votes = defaultdict(list)
-        for pred in history:
-            label_votes[pred.label].append(pred.confidence)
+        base = slot * _NUM_LABELS
+        first, second = self._votes[base], self._votes[base + 1]
+        if first != second:
+            winner = 0 if first > second else 1
+        else:
+            oldest = (self._head[slot] - self._count[slot]) % self.history_size
+            winner = self._labels[slot * self.history_size + oldest]
+        
+        return LABELS[winner], self._sums[base + winner] / self._votes[base + winner]
+    
+    def needs_classification(
+        self,
+        track_id: int,
+        box_area: float,
+        max_age: int = 10,
+        min_history: int = 3,
+        min_confidence: float = 0.8,
+        confidence_decay: float = 0.98,
+        max_scale_change: float = 0.3,
+    ) -> bool:
+        """
+        Decide whether a tracked face must be re-classified this frame.
+        
+        A cached label is reused while the track has enough confident history,
+        the periodic refresh is not due, the confidence (decayed per cached
+        frame) stays above the threshold and the box size is stable.
         
-        # Find label with most votes
-        winner_label = max(label_votes.keys(), key=lambda k: len(label_votes[k]))
+        Args:
+            track_id: Track ID of the face
+            box_area: Current box area in pixels
+            max_age: Force a refresh after this many cached frames
+            min_history: Predictions required before the cache is used
+            min_confidence: Smoothed confidence required to reuse the label
+            confidence_decay: Per-frame decay applied to the cached confidence
+            max_scale_change: Relative box-area change that forces a refresh
+            
+        Returns:
+            True if mask_net should run for this face
+        """
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return True
+        age = self._cache_age[slot]
+        count = self._count[slot]
+        if age < 0 or not count or count < min_history:
+            return True
+        if age >= max_age:
+            return True
         
-        # Calculate average confidence for winning label
-        avg_confidence = sum(label_votes[winner_label]) / len(label_votes[winner_label])
+        _, confidence = self.get_smoothed_prediction(track_id)
+        if confidence * confidence_decay ** (age + 1) < min_confidence:
+            return True
         
-        return winner_label, avg_confidence
+        cached_area = self._cache_area[slot]
+        if cached_area <= 0:
+            return True
+        return abs(box_area - cached_area) / cached_area > max_scale_change
+    
+    def mark_classified(self, track_id: int, box_area: float):
+        """Record that mask_net ran for this track on the current frame."""
+        slot = self._slot(track_id)
+        self._cache_age[slot] = 0
+        self._cache_area[slot] = box_area
+        self._last_seen[slot] = self.frames_seen
+        self.cache_misses += 1
+    
+    def mark_cached(self, track_id: int):
+        """Record that the smoothed label was reused for this track."""
+        slot = self._slots[track_id]
+        self._cache_age[slot] += 1
+        self._last_seen[slot] = self.frames_seen
+        self.cache_hits += 1
+    
+    def mark_seen(self, track_id: int):
+        """Record that a track was in the current frame without new predictions (propagated box)."""
+        slot = self._slots.get(track_id)
+        if slot is not None:
+            self._last_seen[slot] = self.frames_seen
+    
+    def prune_stale(self, max_idle_frames: int) -> int:
+        """
+        Free the slots of tracks not seen for more than `max_idle_frames` frames.
+        
+        The scan runs at most every max_idle_frames / 4 frames, so a dead
+        track is dropped within 1.25 * max_idle_frames frames and the cost
+        stays amortized O(1) per frame.
+        
+        Returns:
+            Number of tracks pruned
+        """
+        if max_idle_frames <= 0 or self.frames_seen - self._last_prune < max(1, max_idle_frames // 4):
+            return 0
+        self._last_prune = self.frames_seen
+        cutoff = self.frames_seen - max_idle_frames
+        with self._slots_lock:
+            stale = [track_id for track_id, slot in self._slots.items() if self._last_seen[slot] < cutoff]
+            for track_id in stale:
+                self._free.append(self._slots.pop(track_id))
+        self.pruned_tracks += len(stale)
+        return len(stale)
+    
+    def should_detect(
+        self,
+        thumbnail: Optional[np.ndarray] = None,
+        load: float = 0.0,
+        min_interval: int = 1,
+        max_interval: int = 8,
+        motion_threshold: float = 6.0,
+    ) -> bool:
+        """
+        Decide whether the detector must run on this frame.
+        
+        Motion is the mean absolute difference between the frame thumbnail
+        and the thumbnail of the last detected frame. Motion above the
+        threshold forces a detection and halves K; a quiet scene grows K by
+        one at every scheduled detection. Server load stretches K further
+        (K * (1 + load)), always within [min_interval, max_interval].
+        
+        Args:
+            thumbnail: Grayscale motion thumbnail; None disables scheduling (always detect)
+            load: Inference executor load, 1.0 = all slots busy
+            min_interval: Smallest K
+            max_interval: Largest K
+            motion_threshold: Mean absolute pixel difference that counts as motion
+            
+        Returns:
+            True if the detector should run, False to propagate tracks instead
+        """
+        self.frames_seen += 1
+        self.last_activity = time.time()
+        
+        if thumbnail is None or self._motion_reference is None or self._motion_reference.shape != thumbnail.shape:
+            motion = float("inf")
+        else:
+            motion = float(cv2.absdiff(thumbnail, self._motion_reference).mean())
+        self.last_motion = motion if motion != float("inf") else 0.0
+        
+        if thumbnail is None:
+            detect = True
+        elif motion >= motion_threshold:
+            # Scene changed: detect now and back off towards frequent detection
+            detect = True
+            self.detect_interval = max(min_interval, self.detect_interval // 2)
+        else:
+            effective = min(max_interval, int(np.ceil(self.detect_interval * (1.0 + max(load, 0.0)))))
+            detect = self.frames_since_detection + 1 >= max(min_interval, effective)
+            if detect and motion < motion_threshold / 2:
+                self.detect_interval = min(max_interval, self.detect_interval + 1)
+        
+        if detect:
+            self.frames_since_detection = 0
+            self.frames_detected += 1
+            self._motion_reference = thumbnail
+        else:
+            self.frames_since_detection += 1
+        return detect
+    
+    def get_detection_rate(self) -> float:
+        """Fraction of frames that ran the face detector."""
+        return self.frames_detected / self.frames_seen if self.frames_seen else 1.0
+    
+    def get_cache_hit_ratio(self) -> float:
+        """Fraction of faces served from the classification cache."""
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else 0.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Memory and classification-cache statistics for this session."""
+        return {
+            "memory_bytes": self.estimate_memory_bytes(),
+            "tracks": len(self._slots),
+            "pruned_tracks": self.pruned_tracks,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": round(self.get_cache_hit_ratio(), 4),
+            "detect_mode": self.detect_mode,
+            "detect_interval": self.detect_interval,
+            "frames": self.frames_seen,
+            "frames_detected": self.frames_detected,
+            "detection_rate": round(self.get_detection_rate(), 4),
+            "last_motion": round(self.last_motion, 3),
+        }
     
     def is_active(self, timeout_seconds: int = 300) -> bool:
         """
@@ -93,6 +412,179 @@ class TrackerSession:
             True if session has been active within timeout period
         """
         return (time.time() - self.last_activity) < timeout_seconds
+    
+    def touch(self):
+        """Mark the session as active without adding a prediction."""
+        self.last_activity = time.time()
+    
+    def estimate_memory_bytes(self) -> int:
+        """
+        Approximate memory held by this session.
+        
+        Counts the prediction history and the tracker state (Kalman means and
+        covariances of every kept track, motion-compensation frames, ...).
+        
+        Returns:
+            Estimated size in bytes
+        """
+        history_bytes = sys.getsizeof(self) + sys.getsizeof(self._slots) + sys.getsizeof(self._free)
+        history_bytes += sum(sys.getsizeof(track_id) for track_id in list(self._slots))
+        history_bytes += sum(sys.getsizeof(arr) for arr in (
+            self._labels, self._confidences, self._head, self._count, self._votes, self._sums,
+            self._last_seen, self._cache_age, self._cache_area,
+        ))
+        return history_bytes + _approx_size(self.tracker)
+
+
+    def snapshot(self, dump_tracker: Callable[[Any], bytes] = pickle.dumps, *, key: bytes) -> bytes:
+        """
+        Serialize the session into a compact binary form.
+        
+        Only slots of live tracks are written, so the size follows the number
+        of faces in view rather than the capacity the session grew to.
+        The snapshot is signed with an HMAC so restore() only deserializes
+        the tracker blob of snapshots written by a holder of the key.
+        Call with the session lock held.
+        
+        Args:
+            dump_tracker: Serializes the tracker state
+            key: Secret the snapshot is signed with
+        """
+        live = sorted(self._slots.items(), key=lambda item: item[1])
+        n = len(live)
+        size = self.history_size
+        slots = [slot for _, slot in live]
+
+        def rows(arr: array, width: int) -> bytes:
+            return b"".join(arr[s * width:(s + 1) * width].tobytes() for s in slots)
+
+        def cells(arr: array) -> bytes:
+            return array(arr.typecode, (arr[s] for s in slots)).tobytes()
+
+        motion = self._motion_reference
+        motion_h, motion_w = motion.shape[:2] if motion is not None else (0, 0)
+        options = self.detect_options.to_json().encode() if self.detect_options else b""
+        tracker = dump_tracker(self.tracker) if self.tracker is not None else b""
+        header = _SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, DETECT_MODES.index(self.detect_mode), size,
+            self.detect_interval, self.frames_since_detection, self.frames_seen, self.frames_detected,
+            self.cache_hits, self.cache_misses, self.pruned_tracks, self._last_prune, self.last_motion,
+            n, motion_h, motion_w, len(options), len(tracker),
+        )
+        body = b"".join((
+            header,
+            array("q", (track_id for track_id, _ in live)).tobytes(),
+            rows(self._labels, size), rows(self._confidences, size),
+            cells(self._head), cells(self._count),
+            rows(self._votes, _NUM_LABELS), rows(self._sums, _NUM_LABELS),
+            cells(self._last_seen), cells(self._cache_age), cells(self._cache_area),
+            motion.tobytes() if motion is not None else b"",
+            options, tracker,
+        ))
+        return body + _snapshot_digest(key, body)
+    
+    @classmethod
+    def restore(cls, data: bytes, load_tracker: Callable[[bytes], Any] = pickle.loads, *,
+                key: bytes) -> "TrackerSession":
+        """
+        Rebuild a session from snapshot() output.
+        
+        The HMAC is checked before anything is parsed, so load_tracker only
+        ever sees tracker state this deployment wrote.
+        
+        Args:
+            data: Snapshot bytes
+            load_tracker: Rebuilds the tracker from its serialized state
+            key: Secret the snapshot was signed with
+            
+        Raises:
+            ValueError: Not a snapshot of this format, or not signed with key
+        """
+        view = memoryview(data)
+        if len(view) < _SNAPSHOT_HEADER.size + _SNAPSHOT_DIGEST:
+            raise ValueError("Truncated tracker session snapshot")
+        view, digest = view[:-_SNAPSHOT_DIGEST], view[-_SNAPSHOT_DIGEST:]
+        if not hmac.compare_digest(_snapshot_digest(key, view), digest):
+            raise ValueError("Tracker session snapshot failed authentication")
+        (magic, version, mode, size, detect_interval, frames_since_detection, frames_seen, frames_detected,
+         cache_hits, cache_misses, pruned_tracks, last_prune, last_motion, n, motion_h, motion_w,
+         options_len, tracker_len) = _SNAPSHOT_HEADER.unpack_from(view)
+        if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+            raise ValueError("Unsupported tracker session snapshot")
+        
+        session = cls(size, capacity=max(8, n))
+        session.detect_mode = DETECT_MODES[mode]
+        session.detect_interval = detect_interval
+        session.frames_since_detection = frames_since_detection
+        session.frames_seen = frames_seen
+        session.frames_detected = frames_detected
+        session.cache_hits = cache_hits
+        session.cache_misses = cache_misses
+        session.pruned_tracks = pruned_tracks
+        session._last_prune = last_prune
+        session.last_motion = last_motion
+        
+        offset = _SNAPSHOT_HEADER.size
+        
+        def take(typecode: str, count: int) -> array:
+            nonlocal offset
+            arr = array(typecode)
+            nbytes = count * arr.itemsize
+            arr.frombytes(view[offset:offset + nbytes])
+            offset += nbytes
+            return arr
+        
+        track_ids = take("q", n)
+        session._labels[:n * size] = take("b", n * size)
+        session._confidences[:n * size] = take("d", n * size)
+        session._head[:n] = take("i", n)
+        session._count[:n] = take("i", n)
+        session._votes[:n * _NUM_LABELS] = take("i", n * _NUM_LABELS)
+        session._sums[:n * _NUM_LABELS] = take("d", n * _NUM_LABELS)
+        session._last_seen[:n] = take("q", n)
+        session._cache_age[:n] = take("i", n)
+        session._cache_area[:n] = take("d", n)
+        for track_id in track_ids:
+            session._slots[track_id] = session._free.pop()
+        
+        if motion_h:
+            nbytes = motion_h * motion_w
+            session._motion_reference = np.frombuffer(
+                view[offset:offset + nbytes], dtype=np.uint8
+            ).reshape(motion_h, motion_w).copy()
+            offset += nbytes
+        if options_len:
+            session.detect_options = DetectOptions.from_json(bytes(view[offset:offset + options_len]).decode())
+            offset += options_len
+        if tracker_len:
+            session.tracker = load_tracker(bytes(view[offset:offset + tracker_len]))
+        return session
+
+
+def _approx_size(obj: Any, depth: int = 4, _seen: Optional[set] = None) -> int:
+    """Recursive size estimate that follows containers, object attributes and NumPy buffers."""
+    if obj is None:
+        return 0
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, int, float, bool)):
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += _approx_size(k, depth - 1, _seen) + _approx_size(v, depth - 1, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        for v in obj:
+            size += _approx_size(v, depth - 1, _seen)
+    elif hasattr(obj, "__dict__"):
+        size += _approx_size(vars(obj), depth - 1, _seen)
+    return size
 
 
 class TrackerSessionManager:
@@ -100,47 +592,189 @@ class TrackerSessionManager:
     Global manager for all tracking sessions.
     
     Maintains a registry of sessions indexed by session_id and provides
-    automatic cleanup of inactive sessions.
+    automatic cleanup of inactive sessions. Sessions are kept in LRU order;
+    once max_sessions is reached the least recently used one is evicted.
+    
+    With a shared store, sessions are written back as snapshots after
+    their frames (every sync_interval frames) together with the owning
+    worker and version. A worker serves its in-memory copy while the
+    store entry is its own; when another worker has written the session
+    since, the snapshot is loaded instead (lazy migration). Snapshots are
+    signed with the store secret and unsigned ones are ignored. A consistent
+    hash ring over the known workers gives the preferred worker of each
+    session as an affinity hint for sticky load balancing.
     """
     
-    def __init__(self, cleanup_interval: int = 60, session_timeout: int = 300):
+    def __init__(
+        self,
+        cleanup_interval: int = 60,
+        session_timeout: int = 300,
+        max_sessions: int = 500,
+        tracker_factory: Optional[Callable[[], Any]] = None,
+        store: Optional[SessionStore] = None,
+        worker_id: str = "",
+        workers: Optional[List[str]] = None,
+        sync_interval: int = 1,
+        secret: str = "",
+    ):
         """
         Initialize the session manager.
         
         Args:
             cleanup_interval: How often to run cleanup (seconds)
             session_timeout: Inactive session timeout (seconds)
+            max_sessions: Cap on concurrent sessions (LRU eviction above it)
+            tracker_factory: Creates the per-session tracker state
+            store: Shared session store (None = sessions stay in this process)
+            worker_id: Name of this worker in the store and the hash ring
+            workers: All worker names, for affinity hints (empty = no hints)
+            sync_interval: Write a session to the store every this many frames
+            secret: Secret the snapshot signing key is derived from; must be
+                the same on every worker sharing the store; required with a store
+        
+        Raises:
+            ValueError: A store is given without a secret
         """
-        self.sessions: Dict[str, TrackerSession] = {}
+        self.sessions: "OrderedDict[str, TrackerSession]" = OrderedDict()
         self.cleanup_interval = cleanup_interval
         self.session_timeout = session_timeout
+        self.max_sessions = max_sessions
+        self.tracker_factory = tracker_factory
+        self.tracker_dump: Callable[[Any], bytes] = pickle.dumps
+        self.tracker_load: Callable[[bytes], Any] = pickle.loads
+        self.store = store
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.ring = HashRing(workers) if workers else None
+        self.sync_interval = max(1, sync_interval)
+        if store is not None and not secret:
+            raise ValueError("SESSION_STORE_SECRET must be set when SESSION_STORE is not 'local'")
+        # A subkey, so the configured secret is never used to sign anything directly
+        self._snapshot_key = hmac.new(secret.encode() if secret else os.urandom(32),
+                                      b"tracker-session-snapshot", hashlib.sha256).digest()
+        self.evicted_sessions = 0
+        self.migrated_sessions = 0
+        self.store_errors = 0
         self._lock = threading.Lock()
         
         # Start cleanup thread
         self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
         self._cleanup_thread.start()
     
-    def get_or_create_session(self, session_id: str, history_size: int = 5) -> TrackerSession:
+    def get_or_create_session(self, session_id: str, history_size: int = 5, shared: bool = True) -> TrackerSession:
         """
         Get existing session or create new one.
         
         Args:
             session_id: Unique session identifier
             history_size: Number of frames for smoothing
+            shared: Look the session up in the shared store (False for
+                sessions that never leave this process, e.g. video jobs)
             
         Returns:
             TrackerSession instance
         """
         with self._lock:
-            if session_id not in self.sessions:
-                self.sessions[session_id] = TrackerSession(history_size)
-            return self.sessions[session_id]
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+        
+        if self.store is not None and shared:
+            # Store round trips happen outside the registry lock
+            restored = self._from_store(session_id, session)
+            if restored is not session:
+                with self._lock:
+                    current = self.sessions.get(session_id)
+                    if current is not None and current is not session:
+                        # Another frame of this session got here first
+                        return current
+                    if current is None:
+                        self._evict_lru(self.max_sessions - 1)
+                    self.sessions[session_id] = restored
+                    return restored
+        if session is not None:
+            return session
+        
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                return session
+            self._evict_lru(self.max_sessions - 1)
+            tracker = self.tracker_factory() if self.tracker_factory else None
+            session = TrackerSession(history_size, tracker=tracker)
+            self.sessions[session_id] = session
+            return session
+    
+    def _from_store(self, session_id: str, local: Optional[TrackerSession]) -> Optional[TrackerSession]:
+        """The local copy if it is current, else the session restored from the store."""
+        try:
+            meta = self.store.get_meta(session_id)
+            if meta is None or local is not None and (meta[0] == self.worker_id or meta == local.synced_meta):
+                return local
+            data = self.store.load(session_id)
+            if data is None:
+                return local
+            session = TrackerSession.restore(data, self.tracker_load, key=self._snapshot_key)
+        except (SessionStoreError, OSError, ValueError) as e:
+            self.store_errors += 1
+            logger.warning("Session store unavailable for %s, using local state: %s", session_id, e)
+            return local
+        session.synced_meta = meta
+        self.migrated_sessions += 1
+        logger.info("Tracker session %s moved here from worker %s", session_id, meta[0])
+        return session
+    
+    def save_session(self, session_id: str, session: TrackerSession):
+        """
+        Write a session back to the shared store (no-op without one).
+        
+        Runs after a frame, every sync_interval frames. Store failures are
+        logged and leave the session serving from memory.
+        """
+        if self.store is None or session.frames_seen % self.sync_interval:
+            return
+        with session.lock:
+            data = session.snapshot(self.tracker_dump, key=self._snapshot_key)
+            meta = (self.worker_id, session.frames_seen)
+        try:
+            self.store.save(session_id, data, meta, ttl=self.session_timeout)
+        except (SessionStoreError, OSError) as e:
+            self.store_errors += 1
+            logger.warning("Could not save tracker session %s: %s", session_id, e)
+            return
+        session.synced_meta = meta
+    
+    def preferred_worker(self, session_id: str) -> Optional[str]:
+        """Worker a sticky load balancer should route this session to (None without a ring)."""
+        return self.ring.node_for(session_id) if self.ring is not None else None
     
-    def remove_session(self, session_id: str):
-        """Remove a session from the registry."""
+    def set_tracker_factory(self, tracker_factory: Callable[[], Any],
+                            dump: Optional[Callable[[Any], bytes]] = None,
+                            load: Optional[Callable[[bytes], Any]] = None):
+        """
+        Set the factory used to build tracker state for new sessions.
+        
+        Args:
+            tracker_factory: Creates a fresh tracker
+            dump: Serializes a tracker for snapshots (default pickle)
+            load: Rebuilds a tracker from dump() output (default pickle)
+        """
+        self.tracker_factory = tracker_factory
+        if dump is not None:
+            self.tracker_dump = dump
+        if load is not None:
+            self.tracker_load = load
+    
+    def remove_session(self, session_id: str, shared: bool = True):
+        """Remove a session from the registry and, if shared, from the shared store."""
         with self._lock:
             if session_id in self.sessions:
                 del self.sessions[session_id]
+        if self.store is not None and shared:
+            try:
+                self.store.delete(session_id)
+            except (SessionStoreError, OSError) as e:
+                self.store_errors += 1
+                logger.warning("Could not delete tracker session %s: %s", session_id, e)
     
     def _cleanup_loop(self):
         """Background thread that removes inactive sessions."""
@@ -148,8 +782,15 @@ class TrackerSessionManager:
             time.sleep(self.cleanup_interval)
             self._cleanup_inactive_sessions()
     
+    def _evict_lru(self, keep: int):
+        """Evict least recently used sessions until at most `keep` remain. Caller holds the lock."""
+        while len(self.sessions) > max(keep, 0):
+            session_id, _ = self.sessions.popitem(last=False)
+            self.evicted_sessions += 1
+            logger.info("Evicted least recently used tracker session %s", session_id)
+    
     def _cleanup_inactive_sessions(self):
-        """Remove sessions that have been inactive."""
+        """Remove sessions that have been inactive and enforce the session cap."""
         with self._lock:
             inactive_sessions = [
                 session_id 
@@ -159,16 +800,52 @@ class TrackerSessionManager:
             
             for session_id in inactive_sessions:
                 del self.sessions[session_id]
-                print(f"[TrackerManager] Cleaned up inactive session: {session_id}")
+                logger.info("Cleaned up inactive tracker session %s", session_id)
+            
+            self._evict_lru(self.max_sessions)
     
     def get_session_count(self) -> int:
         """Get current number of active sessions."""
         with self._lock:
             return len(self.sessions)
+    
+    def get_session_stats(self) -> Dict[str, Any]:
+        """
+        Per-session memory accounting, classification-cache hit ratio and
+        effective detection rate.
+        
+        Returns:
+            Dict with totals and a per-session breakdown
+        """
+        with self._lock:
+            sessions = list(self.sessions.items())
+        per_session = {session_id: session.get_stats() for session_id, session in sessions}
+        frames = sum(stats["frames"] for stats in per_session.values())
+        detected = sum(stats["frames_detected"] for stats in per_session.values())
+        return {
+            "detection_rate": round(detected / frames, 4) if frames else 1.0,
+            "session_count": len(per_session),
+            "max_sessions": self.max_sessions,
+            "evicted_sessions": self.evicted_sessions,
+            "worker_id": self.worker_id,
+            "session_store": self.store.kind if self.store is not None else "local",
+            "migrated_sessions": self.migrated_sessions,
+            "store_errors": self.store_errors,
+            "total_bytes": sum(stats["memory_bytes"] for stats in per_session.values()),
+            "sessions": per_session,
+        }
 
 
 # Global singleton instance
-_session_manager = TrackerSessionManager()
+_session_manager = TrackerSessionManager(
+    session_timeout=settings.TRACKER_SESSION_TIMEOUT,
+    max_sessions=settings.TRACKER_MAX_SESSIONS,
+    store=create_session_store(settings.SESSION_STORE, settings.SESSION_STORE_URL),
+    worker_id=settings.WORKER_ID,
+    workers=[w.strip() for w in settings.SESSION_WORKERS.split(",") if w.strip()],
+    sync_interval=settings.SESSION_SYNC_INTERVAL,
+    secret=settings.SESSION_STORE_SECRET,
+)
 
 
 def get_session_manager() -> TrackerSessionManager:
@@ -0,0 +1,174 @@
+"""
+User accounts in SQLite.
+
+Replaces the users.json file that was read in full on every login and
+rewritten in full on every registration. Usernames are the primary key,
+so lookups are an index probe and concurrent registrations of the same
+name are resolved by the database instead of the last writer winning.
+The database runs in WAL mode so readers never wait for a writer; each
+thread keeps its own connection. Password hashes of recently seen users
+are kept in an LRU so repeated logins do not touch the database at all.
+
+An existing users.json (USERS_FILE) is imported once into an empty database.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class UserExists(Exception):
+    """Raised when registering a username that is already taken."""
+
+
+class UserStore:
+    """
+    SQLite-backed user store with an in-memory read cache.
+
+    Attributes:
+        path: Database file
+        cache_size: Password hashes kept in memory (0 disables the cache)
+        hits, misses: Read cache counters
+    """
+
+    def __init__(self, path: str, cache_size: int = 10000, legacy_file: Optional[str] = None):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(_SCHEMA)
+        if legacy_file:
+            self._import_legacy(legacy_file)
+
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _import_legacy(self, legacy_file: str):
+        if not os.path.exists(legacy_file) or self.count():
+            return
+        try:
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                users: Dict[str, dict] = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not import %s: %s", legacy_file, e)
+            return
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                [(name, user["password"], now) for name, user in users.items() if user.get("password")],
+            )
+        logger.info("Imported %d users from %s into %s", len(users), legacy_file, self.path)
+
+    def get_password_hash(self, username: str) -> Optional[str]:
+        """Stored password hash, or None for unknown users."""
+        if self.cache_size > 0:
+            with self._cache_lock:
+                hashed = self._cache.get(username)
+                if hashed is not None:
+                    self._cache.move_to_end(username)
+                    self.hits += 1
+                    return hashed
+                self.misses += 1
+        row = self._conn().execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(username, row[0])
+        return row[0]
+
+    def exists(self, username: str) -> bool:
+        return self.get_password_hash(username) is not None
+
+    def create(self, username: str, password_hash: str):
+        """
+        Add a user.
+
+        Raises:
+            UserExists: The username is taken (also when two registrations race)
+        """
+        try:
+            self._conn().execute(
+                "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                (username, password_hash, time.time()),
+            )
+        except sqlite3.IntegrityError:
+            raise UserExists(username)
+        self._remember(username, password_hash)
+
+    def _remember(self, username: str, password_hash: str):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[username] = password_hash
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def get_stats(self) -> dict:
+        with self._cache_lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "cached": len(self._cache),
+                "cache_size": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_store: Optional[UserStore] = None
+_store_lock = threading.Lock()
+
+
+def get_user_store() -> UserStore:
+    """Get the global user store, creating the database on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = UserStore(
+                    settings.USER_DB_PATH,
+                    cache_size=settings.USER_CACHE_SIZE,
+                    legacy_file=settings.USERS_FILE or None,
+                )
+    return _store
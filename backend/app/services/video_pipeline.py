@@ -0,0 +1,433 @@
+"""
+Server-side video inference as pipelined background jobs.
+
+Each job runs three stages connected by bounded queues, so decoding,
+inference and encoding of different frames overlap and a slow stage
+applies back-pressure instead of buffering the whole video:
+
+    decoder thread -> frames queue -> inference (job thread) -> results queue -> encoder thread
+
+The inference stage detects faces on batches of frames in one detector
+call, then feeds the frames one by one, in order, through
+detect_and_predict_mask_with_tracking on the job's own TrackerSession.
+Each batch is admitted by the shared inference executor, so long jobs
+wait their turn instead of starving the HTTP routes.
+Each processed frame also goes to the detection log under the job's
+session ID (video-<job_id>). The encoder stage writes per-frame
+detections as NDJSON and, optionally, an annotated video; both are uploaded to MinIO when the job finishes.
+Jobs are polled through /video/jobs/{job_id}.
+"""
+
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+
+from app.core.config import settings
+from app.services import ai_service, minio_service
+from app.services.detection import DetectOptions, detect_faces
+from app.services.detection_log import record_detections
+from app.services.inference_executor import ExecutorSaturated, get_inference_executor
+from app.services.model_registry import get_model_registry
+from app.services.render import annotate as annotate_frame
+from app.services.tracker_manager import get_session_manager
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class StageStats:
+    """Frames handled by one pipeline stage and the time it spent working on them."""
+
+    __slots__ = ("frames", "busy_s")
+
+    def __init__(self):
+        self.frames = 0
+        self.busy_s = 0.0
+
+    def add(self, frames: int, seconds: float):
+        self.frames += frames
+        self.busy_s += seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "frames": self.frames,
+            "busy_s": round(self.busy_s, 3),
+            "fps": round(self.frames / self.busy_s, 2) if self.busy_s > 0 else None,
+        }
+
+
+class VideoJob:
+    """
+    State of one video job.
+
+    Attributes:
+        job_id: Identifier used for polling
+        source: Uploaded file name or MinIO object name
+        status: "queued", "running", "completed", "failed" or "cancelled"
+        annotate: Also produce an annotated video
+        batch_size: Frames per detector call
+        detect_options: Detection resolution, ROI and minimum face size (None = settings)
+        frames_total: Frame count reported by the container (0 if unknown)
+        frames_done: Frames that went through all stages
+        outputs: MinIO object names of the results (NDJSON, annotated video)
+        stages: Per-stage frame counts, busy time and fps
+    """
+
+    def __init__(self, input_path: str, source: str, annotate: bool = True, batch_size: int = 8,
+                 detect_options: Optional[DetectOptions] = None):
+        self.job_id = uuid.uuid4().hex
+        self.input_path = input_path
+        self.source = source
+        self.annotate = annotate
+        self.batch_size = max(1, batch_size)
+        self.detect_options = detect_options
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.frames_total = 0
+        self.frames_done = 0
+        self.faces = 0
+        self.labels: Counter = Counter()
+        self.tracks = set()
+        self.outputs: Dict[str, str] = {}
+        self.stages = {"decode": StageStats(), "infer": StageStats(), "encode": StageStats()}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Set on cancel or when any stage fails; every stage polls it
+        self.stop = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def fail(self, error: str):
+        if self.error is None:
+            self.error = error
+        self.stop.set()
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.job_id,
+            "source": self.source,
+            "status": self.status,
+            "error": self.error,
+            "annotate": self.annotate,
+            "frames_total": self.frames_total,
+            "frames_done": self.frames_done,
+            "progress": round(self.frames_done / self.frames_total, 4) if self.frames_total else None,
+            "elapsed_s": round(elapsed, 3),
+            "fps": round(self.frames_done / elapsed, 2) if elapsed > 0 else None,
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+            "faces": self.faces,
+            "labels": dict(self.labels),
+            "unique_tracks": len(self.tracks),
+            "outputs": self.outputs,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _put(q: queue.Queue, item, job: VideoJob) -> bool:
+    """Blocking put that gives up once the job is stopped, so no stage hangs on a full queue."""
+    while not job.stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, job: VideoJob):
+    """Blocking get that returns _END once the job is stopped."""
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if job.stop.is_set():
+                return _END
+
+
+def _decode(capture, frames: queue.Queue, job: VideoJob):
+    stats = job.stages["decode"]
+    index = 0
+    try:
+        while not job.stop.is_set():
+            started = time.perf_counter()
+            ok, frame = capture.read()
+            if not ok:
+                break
+            stats.add(1, time.perf_counter() - started)
+            if not _put(frames, (index, frame), job):
+                break
+            index += 1
+    except Exception as e:
+        logger.exception("Video job %s: decoder failed", job.job_id)
+        job.fail(f"decode failed: {e}")
+    finally:
+        capture.release()
+        _put(frames, _END, job)
+
+
+def _encode(results: queue.Queue, job: VideoJob, ndjson_path: str, writer):
+    stats = job.stages["encode"]
+    try:
+        with open(ndjson_path, "w", encoding="utf-8") as out:
+            while True:
+                item = _get(results, job)
+                if item is _END:
+                    break
+                index, frame, result = item
+                started = time.perf_counter()
+                out.write(json.dumps({"frame": index, **result}, separators=(",", ":")) + "\n")
+                if writer is not None:
+                    writer.write(annotate_frame(frame, result))
+                stats.add(1, time.perf_counter() - started)
+
+                job.frames_done += 1
+                job.faces += result["faces_detected"]
+                for face in result["results"]:
+                    job.labels[face["label"]] += 1
+                    job.tracks.add(face["track_id"])
+    except Exception as e:
+        logger.exception("Video job %s: encoder failed", job.job_id)
+        job.fail(f"encode failed: {e}")
+    finally:
+        if writer is not None:
+            writer.release()
+
+
+def _infer_batch(batch: list, job: VideoJob, session_id: str, timer=None) -> list:
+    """Detect faces on a batch of (index, frame), then track and classify the frames in order."""
+    face_detector, _ = get_model_registry().models()
+    detections = detect_faces(face_detector, [frame for _, frame in batch], [job.detect_options] * len(batch))
+    outputs = []
+    for (index, frame), frame_detections in zip(batch, detections):
+        result = ai_service.detect_and_predict_mask_with_tracking(
+            frame, session_id, draw_on_image=False, detect_mode="every", detections=frame_detections,
+            shared=False
+        )
+        record_detections(session_id, result)
+        outputs.append((index, frame, result))
+    return outputs
+
+
+def _run_admitted(job: VideoJob, fn, *args) -> Optional[list]:
+    """Run fn on the inference executor, waiting out saturation; None if the job stopped meanwhile."""
+    executor = get_inference_executor()
+    while True:
+        try:
+            outputs, _ = executor.run_blocking(fn, *args, stateful=True)
+            return outputs
+        except ExecutorSaturated as e:
+            if job.stop.wait(e.retry_after):
+                return None
+
+
+def _infer(frames: queue.Queue, results: queue.Queue, job: VideoJob, session_id: str):
+    """Batched detection, then per-frame tracking and classification in frame order."""
+    stats = job.stages["infer"]
+    done = False
+    while not done and not job.stop.is_set():
+        item = _get(frames, job)
+        if item is _END:
+            break
+        batch = [item]
+        while len(batch) < job.batch_size:
+            try:
+                item = frames.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                done = True
+                break
+            batch.append(item)
+
+        started = time.perf_counter()
+        outputs = _run_admitted(job, _infer_batch, batch, job, session_id)
+        if outputs is None:
+            return
+        stats.add(len(batch), time.perf_counter() - started)
+
+        for output in outputs:
+            if not _put(results, output, job):
+                return
+    _put(results, _END, job)
+
+
+def run_job(job: VideoJob):
+    """Run all stages of a job to completion and upload its outputs."""
+    if job.stop.is_set():
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        _remove(job.input_path)
+        return
+
+    job.status = "running"
+    job.started_at = time.time()
+    session_id = f"video-{job.job_id}"
+    ndjson_path = os.path.join(tempfile.gettempdir(), f"{job.job_id}.ndjson")
+    video_path = os.path.join(tempfile.gettempdir(), f"{job.job_id}.mp4")
+
+    try:
+        capture = cv2.VideoCapture(job.input_path)
+        if not capture.isOpened():
+            raise ValueError("Cannot open video")
+        job.frames_total = max(0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+        writer = None
+        if job.annotate:
+            fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+            size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*settings.VIDEO_CODEC), fps, size)
+            if not writer.isOpened():
+                # Writes to an unopened writer are silently dropped
+                capture.release()
+                raise ValueError(f"Cannot write {settings.VIDEO_CODEC} video, codec not available in this OpenCV build")
+
+        frames: queue.Queue = queue.Queue(maxsize=settings.VIDEO_QUEUE_SIZE)
+        results: queue.Queue = queue.Queue(maxsize=settings.VIDEO_QUEUE_SIZE)
+        decoder = threading.Thread(target=_decode, args=(capture, frames, job), name=f"video-decode-{job.job_id[:8]}")
+        encoder = threading.Thread(
+            target=_encode, args=(results, job, ndjson_path, writer), name=f"video-encode-{job.job_id[:8]}"
+        )
+        decoder.start()
+        encoder.start()
+        try:
+            _infer(frames, results, job, session_id)
+        except Exception as e:
+            logger.exception("Video job %s: inference failed", job.job_id)
+            job.fail(f"inference failed: {e}")
+        decoder.join()
+        encoder.join()
+
+        if job.error is None and not job.stop.is_set():
+            bucket = minio_service.settings.MINIO_BUCKET
+            prefix = settings.VIDEO_OUTPUT_PREFIX
+            with open(ndjson_path, "rb") as f:
+                minio_service.upload_fileobj(bucket, f"{prefix}{job.job_id}.ndjson", f,
+                                             content_type="application/x-ndjson")
+            job.outputs["results"] = f"{prefix}{job.job_id}.ndjson"
+            if writer is not None:
+                with open(video_path, "rb") as f:
+                    minio_service.upload_fileobj(bucket, f"{prefix}{job.job_id}.mp4", f, content_type="video/mp4")
+                job.outputs["video"] = f"{prefix}{job.job_id}.mp4"
+    except Exception as e:
+        logger.exception("Video job %s failed", job.job_id)
+        job.fail(str(e))
+    finally:
+        get_session_manager().remove_session(session_id, shared=False)
+        for path in (job.input_path, ndjson_path, video_path):
+            _remove(path)
+        if job.error is not None:
+            job.status = "failed"
+        elif job.stop.is_set():
+            job.status = "cancelled"
+        else:
+            job.status = "completed"
+        job.finished_at = time.time()
+        logger.info("Video job %s %s: %s frames", job.job_id, job.status, job.frames_done)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class VideoJobManager:
+    """
+    Registry and runner of video jobs.
+
+    At most max_concurrent_jobs run at a time, the rest wait in order.
+    Finished jobs stay pollable for job_ttl seconds.
+    """
+
+    def __init__(self, max_concurrent_jobs: int = 1, job_ttl: int = 3600):
+        self.job_ttl = job_ttl
+        self.jobs: Dict[str, VideoJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent_jobs), thread_name_prefix="video-job")
+
+    def submit(self, input_path: str, source: str, annotate: bool = True, batch_size: int = 8,
+               detect_options: Optional[DetectOptions] = None) -> VideoJob:
+        """Queue a job for a video file; the file is deleted when the job ends."""
+        job = VideoJob(input_path, source, annotate=annotate, batch_size=batch_size, detect_options=detect_options)
+        with self._lock:
+            self._purge()
+            self.jobs[job.job_id] = job
+        self._executor.submit(run_job, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[VideoJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            self._purge()
+            jobs = list(self.jobs.values())
+        return [job.to_dict() for job in jobs]
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop a queued or running job; False if it does not exist."""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.stop.set()
+        return True
+
+    def _purge(self):
+        """Forget finished jobs older than job_ttl. Caller holds the lock."""
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished and now - job.finished_at > self.job_ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        """Cancel all jobs and stop the runner threads."""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.stop.set()
+        self._executor.shutdown(wait=False)
+
+
+_manager: Optional[VideoJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_video_job_manager() -> VideoJobManager:
+    """Get the global video job manager, creating it on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = VideoJobManager(
+                    max_concurrent_jobs=settings.VIDEO_MAX_CONCURRENT_JOBS,
+                    job_ttl=settings.VIDEO_JOB_TTL,
+                )
+    return _manager
+
+
+def shutdown_video_jobs():
+    """Cancel running video jobs (app shutdown)."""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
@@ -0,0 +1,381 @@
+"""
+Multi-process model worker pool with shared-memory frame transport.
+
+Each worker process loads its own copy of the models, so pre/post-processing
+is no longer capped by one GIL. Decoded frames are copied into per-worker
+shared-memory slots owned by the API process and only a small task
+descriptor (task id, slot, shape) crosses the process boundary; results come
+back as plain dicts over a single result queue.
+
+A monitor thread restarts workers that died or stopped sending heartbeats
+and fails the requests that were in flight on them.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerUnavailable(Exception):
+    """Raised when a frame could not be processed because its worker died or no slot freed up."""
+
+
+def _configure_worker_threads(threads: int, cpus: Optional[List[int]]):
+    """Thread-count and CPU pinning; env vars must be set before TF/torch are imported."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[var] = str(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+def _worker_main(index: int, task_queue, result_queue, slot_names: List[str],
+                 threads: int, cpus: Optional[List[int]], max_batch: int, heartbeat_interval: float):
+    """Entry point of a worker process."""
+    _configure_worker_threads(threads, cpus)
+
+    def heartbeat():
+        while True:
+            result_queue.put(("heartbeat", index, None, None))
+            time.sleep(heartbeat_interval)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    slots = []
+    for name in slot_names:
+        shm = shared_memory.SharedMemory(name=name)
+        # The API process owns the segments; keep this process's tracker from unlinking them on exit
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        slots.append(shm)
+
+    import cv2
+    cv2.setNumThreads(threads)
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+    except Exception:
+        pass
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+
+    from app.services import ai_service
+    from app.services.model_registry import get_model_registry
+    from app.utils.timing import StageTimer
+
+    # Load and warm up before reporting ready, so no request waits on it
+    get_model_registry().load()
+    result_queue.put(("ready", index, None, None))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        # Drain whatever else is already queued so the worker runs one batched inference
+        tasks = [task]
+        while len(tasks) < max_batch:
+            try:
+                nxt = task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is None:
+                task_queue.put(None)
+                break
+            tasks.append(nxt)
+
+        images = []
+        options = []
+        for task_id, slot, shape, pickled, detect_options in tasks:
+            if pickled is not None:
+                images.append(pickled)
+            else:
+                images.append(np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf))
+            options.append(detect_options)
+
+        timer = StageTimer()
+        try:
+            results = ai_service.detect_and_predict_mask_batch(images, timer=timer, detect_options=options)
+        except Exception as e:
+            for t in tasks:
+                result_queue.put(("error", index, t[0], repr(e)))
+            continue
+        for t, result in zip(tasks, results):
+            result_queue.put(("result", index, t[0], (result, timer.stages)))
+
+    for shm in slots:
+        shm.close()
+
+
+class _Worker:
+    """API-side handle of one worker process and its shared-memory slots."""
+
+    def __init__(self, index: int, slots: List[shared_memory.SharedMemory], cpus: Optional[List[int]]):
+        self.index = index
+        self.slots = slots
+        self.cpus = cpus
+        self.free_slots: "queue.Queue[int]" = queue.Queue()
+        for i in range(len(slots)):
+            self.free_slots.put(i)
+        # Slots taken by a submitter that is still copying its frame in
+        self.reserved: Set[int] = set()
+        self.task_queue = None
+        self.process = None
+        self.ready = False
+        # Bumped when the process is replaced; slots of an older generation are not released again
+        self.generation = 0
+        self.restarts = 0
+        self.completed = 0
+        self.last_heartbeat = time.monotonic()
+
+
+class WorkerPool:
+    """
+    Pool of model worker processes.
+
+    Attributes:
+        num_workers: Number of worker processes
+        threads_per_worker: Intra-op threads for TF/torch/OpenCV in each worker
+        pin_cpus: Pin worker i to its own block of CPUs
+        slot_bytes: Size of each shared-memory frame slot
+        slots_per_worker: Frames that can be in flight per worker
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        threads_per_worker: int = 1,
+        pin_cpus: bool = False,
+        slot_bytes: int = 3840 * 2160 * 3,
+        slots_per_worker: int = 2,
+        max_batch: int = 8,
+        heartbeat_interval: float = 2.0,
+        heartbeat_timeout: float = 30.0,
+        submit_timeout: float = 5.0,
+    ):
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.pin_cpus = pin_cpus
+        self.slot_bytes = slot_bytes
+        self.slots_per_worker = max(1, slots_per_worker)
+        self.max_batch = max(1, max_batch)
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.submit_timeout = submit_timeout
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._result_queue = self._ctx.Queue()
+        self._pending: Dict[int, Tuple[Future, int, int, int]] = {}
+        self._pending_lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._rr = itertools.cycle(range(self.num_workers))
+        self._closed = False
+
+        cpu_count = os.cpu_count() or 1
+        self.workers: List[_Worker] = []
+        for i in range(self.num_workers):
+            cpus = None
+            if pin_cpus:
+                start = i * self.threads_per_worker
+                cpus = [(start + k) % cpu_count for k in range(self.threads_per_worker)]
+            slots = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(self.slots_per_worker)]
+            worker = _Worker(i, slots, cpus)
+            self.workers.append(worker)
+            self._start_worker(worker)
+
+        threading.Thread(target=self._collect_results, daemon=True).start()
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def _start_worker(self, worker: _Worker):
+        worker.task_queue = self._ctx.Queue()
+        worker.ready = False
+        worker.last_heartbeat = time.monotonic()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, worker.task_queue, self._result_queue, [s.name for s in worker.slots],
+                  self.threads_per_worker, worker.cpus, self.max_batch, self.heartbeat_interval),
+            name=f"inference-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def submit(self, image: np.ndarray, detect_options=None) -> Future:
+        """
+        Hand a decoded frame to a worker.
+
+        Args:
+            image: BGR uint8 frame
+            detect_options: DetectOptions for this frame (None = settings)
+
+        Returns:
+            Future resolving to (result, worker stage timings)
+        """
+        if self._closed:
+            raise WorkerUnavailable("Worker pool is shut down")
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        deadline = time.monotonic() + self.submit_timeout
+        task_id = next(self._task_ids)
+        future: Future = Future()
+
+        while True:
+            worker, slot, generation = self._acquire_slot(deadline)
+            try:
+                if image.nbytes <= self.slot_bytes:
+                    np.ndarray(image.shape, dtype=np.uint8, buffer=worker.slots[slot].buf)[...] = image
+                    pickled = None
+                else:
+                    # Larger than a slot: fall back to pickling this one frame
+                    pickled = image
+            except BaseException:
+                with self._pending_lock:
+                    worker.reserved.discard(slot)
+                    worker.free_slots.put(slot)
+                raise
+
+            with self._pending_lock:
+                worker.reserved.discard(slot)
+                # The worker was restarted while the frame was copied in: the
+                # reserved slot was kept out of the reclaimed queue, so return
+                # it there and pick again
+                if generation != worker.generation:
+                    worker.free_slots.put(slot)
+                    continue
+                self._pending[task_id] = (future, worker.index, slot, generation)
+                task_queue = worker.task_queue
+            task_queue.put((task_id, slot, image.shape, pickled, detect_options))
+            return future
+
+    def _acquire_slot(self, deadline: float) -> Tuple[_Worker, int, int]:
+        """Round-robin over ready workers for a free slot, waiting until deadline."""
+        while True:
+            for _ in range(self.num_workers):
+                worker = self.workers[next(self._rr)]
+                with self._pending_lock:
+                    if not worker.ready:
+                        continue
+                    try:
+                        slot = worker.free_slots.get_nowait()
+                    except queue.Empty:
+                        continue
+                    # Reserved until submit() registers or returns it
+                    worker.reserved.add(slot)
+                    return worker, slot, worker.generation
+            if time.monotonic() >= deadline:
+                raise WorkerUnavailable("No inference worker slot available")
+            time.sleep(0.001)
+
+    def _collect_results(self):
+        while True:
+            kind, index, task_id, payload = self._result_queue.get()
+            worker = self.workers[index]
+            if kind == "heartbeat":
+                worker.last_heartbeat = time.monotonic()
+                continue
+            if kind == "ready":
+                worker.ready = True
+                worker.last_heartbeat = time.monotonic()
+                logger.info("Inference worker %d ready (pid %s)", index, worker.process.pid)
+                continue
+
+            with self._pending_lock:
+                entry = self._pending.pop(task_id, None)
+                if entry is None:
+                    continue
+                future, _, slot, generation = entry
+                # Released under the same lock as _fail_pending's reclaim
+                if generation == worker.generation:
+                    worker.free_slots.put(slot)
+            worker.completed += 1
+            if kind == "result":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _monitor(self):
+        while not self._closed:
+            time.sleep(self.heartbeat_interval)
+            for worker in self.workers:
+                stale = time.monotonic() - worker.last_heartbeat > self.heartbeat_timeout
+                if worker.process.is_alive() and not stale:
+                    continue
+                if self._closed:
+                    return
+                logger.warning(
+                    "Restarting inference worker %d (alive=%s, stale=%s)",
+                    worker.index, worker.process.is_alive(), stale,
+                )
+                if worker.process.is_alive():
+                    worker.process.kill()
+                worker.process.join(timeout=5)
+                self._fail_pending(worker)
+                worker.restarts += 1
+                self._start_worker(worker)
+
+    def _fail_pending(self, worker: _Worker):
+        """Fail requests in flight on a dead worker and reclaim its slots."""
+        with self._pending_lock:
+            lost = [tid for tid, (_, index, _, _) in self._pending.items() if index == worker.index]
+            entries = [self._pending.pop(tid) for tid in lost]
+            worker.ready = False
+            worker.generation += 1
+            worker.free_slots = queue.Queue()
+            # Slots a submitter is still writing to stay with it; it returns them
+            for i in range(len(worker.slots)):
+                if i not in worker.reserved:
+                    worker.free_slots.put(i)
+        for future, _, _, _ in entries:
+            future.set_exception(WorkerUnavailable(f"Inference worker {worker.index} crashed"))
+
+    def get_stats(self) -> dict:
+        """Health of every worker."""
+        now = time.monotonic()
+        with self._pending_lock:
+            in_flight = len(self._pending)
+        return {
+            "num_workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "in_flight": in_flight,
+            "workers": [
+                {
+                    "index": w.index,
+                    "pid": w.process.pid,
+                    "alive": w.process.is_alive(),
+                    "ready": w.ready,
+                    "restarts": w.restarts,
+                    "completed": w.completed,
+                    "cpus": w.cpus,
+                    "heartbeat_age_s": round(now - w.last_heartbeat, 3),
+                }
+                for w in self.workers
+            ],
+        }
+
+    def shutdown(self):
+        """Stop the workers and release the shared memory."""
+        self._closed = True
+        for worker in self.workers:
+            worker.task_queue.put(None)
+        for worker in self.workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+            for shm in worker.slots:
+                shm.close()
+                shm.unlink()
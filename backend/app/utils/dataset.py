@@ -0,0 +1,54 @@
+import os
+import random
+from typing import Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Folder names of the training dataset (see mask-reconize.ipynb); label 1 = mask
+LABEL_DIRS = {"with_mask": 1, "without_mask": 0}
+LABEL_NAMES = {1: "Mask", 0: "No Mask"}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+def list_labelled_images(root: str) -> List[Tuple[str, int]]:
+    """(path, label) for every image under root/with_mask and root/without_mask, sorted by path."""
+    items = []
+    for dirpath, _, filenames in os.walk(root):
+        parts = os.path.relpath(dirpath, root).split(os.sep)
+        label = next((LABEL_DIRS[p] for p in reversed(parts) if p in LABEL_DIRS), None)
+        if label is None:
+            continue
+        for name in filenames:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                items.append((os.path.join(dirpath, name), label))
+    return sorted(items)
+
+def label_from_path(path: str) -> Optional[int]:
+    """Label of an image path or object name from its nearest with_mask/without_mask folder."""
+    parts = path.replace("\\", "/").split("/")[:-1]
+    return next((LABEL_DIRS[p] for p in reversed(parts) if p in LABEL_DIRS), None)
+
+def label_paths(paths: Iterable[str]) -> List[Tuple[str, int]]:
+    """(path, label) for the image paths (e.g. MinIO object names) under a label folder, sorted."""
+    items = []
+    for path in paths:
+        label = label_from_path(path)
+        if label is not None and path.lower().endswith(IMAGE_EXTENSIONS):
+            items.append((path, label))
+    return sorted(items)
+
+def split_dataset(items: List[Tuple[str, int]], holdout_fraction: float = 0.2, seed: int = 2):
+    """Deterministic (train, holdout) split so calibration never sees held-out images."""
+    shuffled = list(items)
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - holdout_fraction))
+    return shuffled[:cut], shuffled[cut:]
+
+def load_face_crop(path: str, size: int = 128) -> np.ndarray:
+    """Read an already-cropped face and preprocess it like the inference path (RGB, float32 0..1)."""
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Cannot read image: {path}")
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    image = cv2.resize(image, (size, size))
+    return image.astype(np.float32) / 255.0
@@ -1,5 +1,77 @@
 from PIL import Image
 import io
+import struct
+import cv2
+import numpy as np
+
+_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# JPEG start-of-frame markers carrying the image dimensions
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
 
 def pil_from_bytes(data: bytes):
     return Image.open(io.BytesIO(data))
+
+def jpeg_size(data: bytes):
+    """Return (width, height) from a JPEG header without decoding, or None if not a JPEG."""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    n = len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+def choose_reduce_factor(data: bytes, max_side: int) -> int:
+    """Largest JPEG reduced-decode factor that keeps the longer side >= max_side."""
+    if max_side <= 0:
+        return 1
+    size = jpeg_size(data)
+    if size is None:
+        return 1
+    longest = max(size)
+    factor = 1
+    for candidate in (2, 4, 8):
+        if longest // candidate >= max_side:
+            factor = candidate
+    return factor
+
+def decode_image_bytes(data, reduce_factor: int = 1):
+    """
+    Decode encoded image bytes to a BGR array without touching disk.
+
+    Args:
+        data: Encoded image (bytes, bytearray or memoryview)
+        reduce_factor: 1, 2, 4 or 8; JPEGs are decoded directly at reduced resolution
+
+    Returns:
+        BGR uint8 image
+    """
+    if reduce_factor not in _REDUCED_DECODE_FLAGS:
+        raise ValueError(f"Unsupported reduce factor: {reduce_factor}")
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        raise ValueError("Cannot read image")
+    image = cv2.imdecode(buf, _REDUCED_DECODE_FLAGS[reduce_factor])
+    if image is None:
+        raise ValueError("Cannot read image")
+    return image
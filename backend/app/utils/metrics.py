@@ -0,0 +1,196 @@
+"""
+Minimal Prometheus-compatible metrics (text exposition format 0.0.4).
+
+Counters and histograms are plain Python objects updated under a short
+lock: an observation is a bisect and three additions, cheap enough for
+every request and every batch (see benchmarks/bench_metrics.py). Gauges
+read their value from a callback at scrape time, so nothing is updated
+on the hot path for them.
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond preprocessing up to multi-second requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labels: str):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._series.items()]
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    Value read from a callback at scrape time.
+
+    The callback returns a number, or a dict of label tuple -> number for
+    labelled gauges. Exceptions skip the gauge for that scrape.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], object], labelnames: Sequence[str] = (),
+                 kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def collect(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in value.items()]
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together for /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, fn: Callable[[], object], labelnames: Sequence[str] = (),
+              kind: str = "gauge") -> Gauge:
+        return self.register(Gauge(name, documentation, fn, labelnames, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "facemask_stage_seconds",
+    "Time per inference stage (decode, detect, preprocess, classify, render, ...). "
+    "Batched stages are observed once per batch.",
+    ("stage",),
+)
+REQUEST_SECONDS = registry.histogram(
+    "facemask_request_seconds", "End-to-end prediction time per endpoint", ("endpoint",)
+)
+PREDICTIONS_TOTAL = registry.counter(
+    "facemask_predictions_total", "Predictions served, by endpoint and source (model or cache)", ("endpoint", "source")
+)
+FACES_TOTAL = registry.counter("facemask_faces_total", "Faces returned, by label", ("label",))
+
+
+def observe_stages(stages: Dict[str, float], skip: Iterable[str] = ("total",)):
+    """Observe a StageTimer-style dict of milliseconds into the stage histogram."""
+    for name, ms in stages.items():
+        if name not in skip:
+            STAGE_SECONDS.observe(ms / 1000.0, name)
+
+
+def observe_prediction(endpoint: str, stages: Dict[str, float], result: Optional[dict], cached: bool = False):
+    """Record one served prediction: stage times, total time, face/label counts."""
+    observe_stages(stages)
+    total = stages.get("total")
+    if total is None:
+        total = sum(stages.values())
+    REQUEST_SECONDS.observe(total / 1000.0, endpoint)
+    PREDICTIONS_TOTAL.inc(1.0, endpoint, "cache" if cached else "model")
+    if result:
+        for face in result.get("results", ()):
+            FACES_TOTAL.inc(1.0, face["label"])
@@ -0,0 +1,28 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+class StageTimer:
+    """Accumulates wall-clock milliseconds per named stage of a request."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000.0)
+
+    def add(self, name: str, ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+def timed(timer: Optional[StageTimer], name: str):
+    """Stage context for an optional timer, a no-op when timer is None."""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+def server_timing_header(stages: Dict[str, float]) -> str:
+    """Format stage durations as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in stages.items())
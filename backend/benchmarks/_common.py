@@ -0,0 +1,81 @@
+"""Shared helpers for the benchmark scripts (run from the backend directory)."""
+
+import json
+import os
+import sys
+import time
+from typing import Callable, List
+
+import numpy as np
+
+
+def time_calls(fn: Callable[[], object], repeat: int = 50, warmup: int = 3) -> List[float]:
+    """Call fn repeatedly and return per-call latencies in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return latencies
+
+
+def summarize(latencies_ms: List[float]) -> dict:
+    """Mean and tail percentiles of a latency sample."""
+    arr = np.asarray(latencies_ms, dtype=np.float64)
+    if arr.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux /proc, falls back to peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def synthetic_jpeg(width: int, height: int, quality: int = 90, seed: int = 0) -> bytes:
+    """A JPEG with enough texture that the encoder does not collapse it to a few bytes."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, size=(max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+def configure_env(overrides: dict = None):
+    """
+    Set app settings through the environment. Must run before any app module is imported.
+
+    Required secrets get throwaway defaults so benchmarks run without a .env file.
+    """
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("MINIO_ACCESS_KEY", "minioadmin")
+    os.environ.setdefault("MINIO_SECRET_KEY", "minioadmin")
+    for key, value in (overrides or {}).items():
+        os.environ[key] = str(value)
+
+
+def emit(results, output: str = None):
+    """Print results as JSON and optionally write them to a file."""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    sys.stdout.write(text + "\n")
@@ -0,0 +1,112 @@
+"""
+In-process Redis-protocol stand-in, for benchmarks.
+
+Speaks just enough RESP2 for RedisSessionStore: PING, AUTH, SELECT,
+GET, SET (EX/PX), DEL and FLUSHALL, with key expiry. It listens on a TCP
+port, so worker processes can share it like a real Redis server.
+"""
+
+import socketserver
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    standin: "RedisStandIn" = None
+    disable_nagle_algorithm = True
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            if not command:
+                continue
+            self.wfile.write(self.standin.execute(command))
+            self.wfile.flush()
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class RedisStandIn:
+    """
+    Threaded TCP server with an in-memory keyspace.
+
+    Args:
+        latency_ms: Delay added to every command, like a remote server
+    """
+
+    def __init__(self, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency_ms = latency_ms
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"standin": self})
+        self._server = socketserver.ThreadingTCPServer((host, port), handler)
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "RedisStandIn":
+        threading.Thread(target=self._server.serve_forever, name="redis-standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry[0]
+
+    def execute(self, command) -> bytes:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        name = command[0].upper().decode("ascii", "replace")
+        args = command[1:]
+        with self._lock:
+            self.commands[name] = self.commands.get(name, 0) + 1
+            if name == "PING":
+                return b"+PONG\r\n"
+            if name in ("AUTH", "SELECT"):
+                return b"+OK\r\n"
+            if name == "GET":
+                return _bulk(self._get(args[0]))
+            if name == "SET":
+                expires = None
+                options = [a.upper() for a in args[2:]]
+                for flag, scale in ((b"PX", 0.001), (b"EX", 1.0)):
+                    if flag in options:
+                        expires = time.time() + int(args[2 + options.index(flag) + 1]) * scale
+                self.data[args[0]] = (args[1], expires)
+                return b"+OK\r\n"
+            if name == "DEL":
+                removed = sum(self.data.pop(key, None) is not None for key in args)
+                return b":%d\r\n" % removed
+            if name == "FLUSHALL":
+                self.data.clear()
+                return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command[0]
@@ -0,0 +1,192 @@
+"""
+In-process S3-compatible stand-in for MinIO, for benchmarks.
+
+Implements just enough of the S3 API for the MinIO client calls this
+backend makes: bucket location/HEAD/PUT, object HEAD/GET/PUT with user
+metadata, and multipart uploads. Objects live in memory, or are drained
+and dropped with discard=True when only client-side cost matters.
+"""
+
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+class _StoredObject:
+    __slots__ = ("data", "metadata", "content_type", "etag", "modified")
+
+    def __init__(self, data: bytes, metadata: Dict[str, str], content_type: str):
+        self.data = data
+        self.metadata = metadata
+        self.content_type = content_type
+        self.etag = uuid.uuid4().hex
+        self.modified = formatdate(usegmt=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    standin: "S3StandIn" = None
+
+    def log_message(self, *args):
+        pass
+
+    def _target(self):
+        url = urlparse(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        return bucket, key, parse_qs(url.query, keep_blank_values=True)
+
+    def _body(self) -> bytes:
+        remaining = int(self.headers.get("Content-Length") or 0)
+        if not self.standin.discard:
+            return self.rfile.read(remaining)
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        return b""
+
+    def _reply(self, status: int = 200, body: bytes = b"", headers: Optional[dict] = None, length: int = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body) if length is None else length))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _xml(self, body: str, status: int = 200):
+        self._reply(status, body.encode("utf-8"), {"Content-Type": "application/xml"})
+
+    def _not_found(self, bucket: str, key: str):
+        if self.command == "HEAD":
+            self._reply(404)
+            return
+        self._xml(f"<Error><Code>NoSuchKey</Code><Message>The specified key does not exist.</Message>"
+                  f"<Key>{key}</Key><BucketName>{bucket}</BucketName><Resource>/{bucket}/{key}</Resource>"
+                  f"<RequestId>standin</RequestId><HostId>standin</HostId></Error>", 404)
+
+    def _object_headers(self, obj: _StoredObject) -> dict:
+        headers = {"ETag": f'"{obj.etag}"', "Last-Modified": obj.modified, "Content-Type": obj.content_type}
+        headers.update(obj.metadata)
+        return headers
+
+    def do_HEAD(self):
+        self.standin.count("HEAD")
+        bucket, key, _ = self._target()
+        if not key:
+            self._reply(200)
+            return
+        obj = self.standin.objects.get((bucket, key))
+        if obj is None:
+            self._not_found(bucket, key)
+            return
+        self._reply(200, headers=self._object_headers(obj), length=len(obj.data))
+
+    def do_GET(self):
+        self.standin.count("GET")
+        bucket, key, query = self._target()
+        if not key and "location" in query:
+            self._xml(f'<LocationConstraint xmlns="{_NS}"></LocationConstraint>')
+            return
+        obj = self.standin.objects.get((bucket, key))
+        if obj is None:
+            self._not_found(bucket, key)
+            return
+        self.standin.delay()
+        self._reply(200, obj.data, self._object_headers(obj))
+
+    def do_PUT(self):
+        self.standin.count("PUT")
+        bucket, key, query = self._target()
+        body = self._body()
+        if key and "uploadId" in query:
+            upload = self.standin.uploads.get(query["uploadId"][0])
+            if upload is not None:
+                upload["parts"][int(query["partNumber"][0])] = body
+        elif key:
+            self.standin.store(bucket, key, body, self._metadata(), self.headers.get("Content-Type"))
+        self._reply(200, headers={"ETag": f'"{uuid.uuid4().hex}"'})
+
+    def do_POST(self):
+        self.standin.count("POST")
+        bucket, key, query = self._target()
+        self._body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            self.standin.uploads[upload_id] = {
+                "parts": {}, "metadata": self._metadata(), "content_type": self.headers.get("Content-Type"),
+            }
+            self._xml(f'<InitiateMultipartUploadResult xmlns="{_NS}"><Bucket>{bucket}</Bucket><Key>{key}</Key>'
+                      f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+            return
+        upload = self.standin.uploads.pop(query.get("uploadId", [""])[0], None)
+        if upload is not None:
+            data = b"".join(upload["parts"][n] for n in sorted(upload["parts"]))
+            self.standin.store(bucket, key, data, upload["metadata"], upload["content_type"])
+        self._xml(f'<CompleteMultipartUploadResult xmlns="{_NS}"><Location>/{bucket}/{key}</Location>'
+                  f'<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>"{uuid.uuid4().hex}"</ETag>'
+                  f"</CompleteMultipartUploadResult>")
+
+    def _metadata(self) -> Dict[str, str]:
+        return {k.lower(): v for k, v in self.headers.items() if k.lower().startswith("x-amz-meta-")}
+
+
+class S3StandIn:
+    """
+    Threaded HTTP server speaking the S3 subset above.
+
+    Args:
+        latency_ms: Delay added to every object GET, like a remote store
+        discard: Drain uploaded bodies instead of keeping them
+    """
+
+    def __init__(self, latency_ms: float = 0.0, discard: bool = False):
+        self.latency_ms = latency_ms
+        self.discard = discard
+        self.objects: Dict[tuple, _StoredObject] = {}
+        self.uploads: Dict[str, dict] = {}
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"standin": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> "S3StandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="s3-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def put(self, bucket: str, key: str, data: bytes, metadata: Optional[Dict[str, str]] = None,
+            content_type: str = "application/octet-stream"):
+        """Seed an object directly, without going through HTTP."""
+        headers = {f"x-amz-meta-{k}": v for k, v in (metadata or {}).items()}
+        self.objects[(bucket, key)] = _StoredObject(data, headers, content_type)
+
+    def store(self, bucket: str, key: str, data: bytes, metadata: Dict[str, str], content_type: Optional[str]):
+        if not self.discard:
+            self.objects[(bucket, key)] = _StoredObject(data, metadata, content_type or "application/octet-stream")
+
+    def count(self, method: str):
+        with self._lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+    def delay(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
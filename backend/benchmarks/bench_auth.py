@@ -0,0 +1,153 @@
+"""
+Auth hot path: users.json vs the SQLite user store, and per-frame token checks.
+
+    lookup      find one user's password hash: parse the whole users.json
+                (previous behaviour) vs UserStore (LRU hit and database probe)
+    register    add one user: rewrite users.json vs one INSERT
+    login       logins per second with --concurrency clients: users.json +
+                bcrypt on the threadpool vs UserStore + the bcrypt executor
+    per_frame   verify_token on every frame: jwt.decode vs the token cache
+
+bcrypt dominates login time; --rounds lowers its cost so the surrounding
+work is visible (the app uses passlib's default of 12).
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth --users 5000 --logins 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._common import configure_env, emit, summarize, time_calls
+
+
+def _legacy_lookup(path: str, username: str):
+    with open(path, "r", encoding="utf-8") as f:
+        users = json.load(f)
+    return users.get(username, {}).get("password")
+
+
+def _legacy_register(path: str, username: str, hashed: str):
+    with open(path, "r", encoding="utf-8") as f:
+        users = json.load(f)
+    users[username] = {"password": hashed}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(users, f, ensure_ascii=False, indent=2)
+
+
+async def _logins(login, names, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(name):
+        async with semaphore:
+            started = time.perf_counter()
+            ok = await login(name)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            assert ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(name) for name in names))
+    elapsed = time.perf_counter() - started
+    return {"logins_per_s": round(len(names) / elapsed, 1), **summarize(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost of the test passwords")
+    parser.add_argument("--hash-workers", type=int, default=4, help="PASSWORD_HASH_WORKERS")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-auth-")
+    legacy_file = os.path.join(workdir, "users.json")
+    configure_env({
+        "USER_DB_PATH": os.path.join(workdir, "users.db"),
+        "USERS_FILE": legacy_file,
+        "PASSWORD_HASH_WORKERS": args.hash_workers,
+        "TOKEN_CACHE_TTL": 30,
+    })
+    from app.core import security
+    from app.core.security import create_access_token, pwd_context, verify_password
+    from app.services.user_store import get_user_store
+
+    password = "benchmark-password"
+    hashed = pwd_context.hash(password, rounds=args.rounds)
+    names = [f"user{i:06d}" for i in range(args.users)]
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump({name: {"password": hashed} for name in names}, f, ensure_ascii=False, indent=2)
+    store = get_user_store()  # imports users.json
+
+    probe = names[len(names) // 2]
+    results = {"users": args.users, "bcrypt_rounds": args.rounds, "users_json_kb": os.path.getsize(legacy_file) // 1024}
+
+    def store_miss():
+        store._cache.clear()
+        store.get_password_hash(probe)
+
+    results["lookup"] = {
+        "users_json": summarize(time_calls(lambda: _legacy_lookup(legacy_file, probe), repeat=args.repeat)),
+        "store_cached": summarize(time_calls(lambda: store.get_password_hash(probe), repeat=args.repeat)),
+        "store_db": summarize(time_calls(store_miss, repeat=args.repeat)),
+    }
+
+    counter = iter(range(10 ** 9))
+    register_file = os.path.join(workdir, "register.json")
+    shutil.copyfile(legacy_file, register_file)
+    results["register"] = {
+        "users_json": summarize(time_calls(lambda: _legacy_register(register_file, f"new{next(counter)}", hashed),
+                                           repeat=min(args.repeat, 50), warmup=1)),
+        "store": summarize(time_calls(lambda: store.create(f"new{next(counter)}", hashed),
+                                      repeat=min(args.repeat, 50), warmup=1)),
+    }
+
+    login_names = [names[i % len(names)] for i in range(args.logins)]
+    # The previous sync route ran on Starlette's threadpool (40 threads)
+    threadpool = ThreadPoolExecutor(40)
+
+    async def legacy_login(name):
+        def work():
+            return pwd_context.verify(password, _legacy_lookup(legacy_file, name))
+        return await asyncio.get_running_loop().run_in_executor(threadpool, work)
+
+    async def store_login(name):
+        stored = await asyncio.get_running_loop().run_in_executor(threadpool, store.get_password_hash, name)
+        return await verify_password(password, stored)
+
+    results["login"] = {
+        "concurrency": args.concurrency,
+        "hash_workers": args.hash_workers,
+        "users_json": asyncio.run(_logins(legacy_login, login_names, args.concurrency)),
+        "store": asyncio.run(_logins(store_login, login_names, args.concurrency)),
+    }
+    threadpool.shutdown()
+
+    token = create_access_token({"sub": probe})
+    cache = security.get_token_cache()
+
+    def uncached():
+        cache.clear()
+        security.verify_token(token)
+
+    uncached_stats = summarize(time_calls(uncached, repeat=args.repeat * 10))
+    cached_stats = summarize(time_calls(lambda: security.verify_token(token), repeat=args.repeat * 10))
+    results["per_frame"] = {
+        "jwt_decode": uncached_stats,
+        "token_cache": cached_stats,
+        "speedup": round(uncached_stats["mean_ms"] / cached_stats["mean_ms"], 1) if cached_stats["mean_ms"] else None,
+    }
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Parity, latency, throughput and RSS of the native and ONNX inference backends.
+
+Each backend runs in its own subprocess so RSS reflects only the frameworks
+it imports. Detections on the sample images are matched by IoU and the
+classifier outputs on identical face crops are compared; the run fails
+(exit code 1) when the backends disagree beyond the tolerances.
+
+Usage (from backend/):
+    python -m benchmarks.bench_backends --images path/to/samples --backends native onnx
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks._common import emit, summarize
+
+
+def _load_images(pattern_dir: str):
+    paths = sorted(
+        p for ext in ("*.jpg", "*.jpeg", "*.png")
+        for p in glob.glob(os.path.join(pattern_dir, "**", ext), recursive=True)
+    )
+    return paths, [cv2.imread(p) for p in paths]
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def run_backend(backend: str, image_dir: str, repeat: int):
+    """Subprocess side: load one backend, run every image, report results and resources."""
+    from app.services.inference_backends import create_classifier, create_detector
+
+    started = time.perf_counter()
+    detector = create_detector(backend)
+    classifier = create_classifier(backend)
+    load_s = time.perf_counter() - started
+
+    paths, images = _load_images(image_dir)
+    rng = np.random.default_rng(0)
+    faces = rng.random((32, 128, 128, 3), dtype=np.float32)
+
+    # Warm-up
+    detector.detect(images[:1])
+    classifier.predict(faces[:1])
+
+    detections = [detector.detect([img])[0] for img in images]
+    det_latencies = []
+    for _ in range(repeat):
+        for img in images:
+            t = time.perf_counter()
+            detector.detect([img])
+            det_latencies.append((time.perf_counter() - t) * 1000.0)
+
+    cls_latencies = {}
+    for bs in (1, 8, 32):
+        lat = []
+        for _ in range(repeat * 5):
+            t = time.perf_counter()
+            classifier.predict(faces[:bs])
+            lat.append((time.perf_counter() - t) * 1000.0)
+        cls_latencies[str(bs)] = summarize(lat)
+
+    t = time.perf_counter()
+    detector.detect(images)
+    batch_s = time.perf_counter() - t
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 3),
+        "detect": summarize(det_latencies),
+        "detect_images_per_s": round(len(images) / batch_s, 2) if batch_s else None,
+        "classify": cls_latencies,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        "boxes": [d.xyxy.tolist() for d in detections],
+        "scores": [d.conf.tolist() for d in detections],
+        "class_probs": classifier.predict(faces).tolist(),
+        "images": paths,
+    }
+
+
+def compare(reference: dict, other: dict, iou_threshold: float, score_tol: float, prob_tol: float) -> dict:
+    matched, missing, extra, worst_iou, worst_score = 0, 0, 0, 1.0, 0.0
+    for ref_boxes, ref_scores, boxes, scores in zip(reference["boxes"], reference["scores"], other["boxes"], other["scores"]):
+        a, b = np.asarray(ref_boxes).reshape(-1, 4), np.asarray(boxes).reshape(-1, 4)
+        if len(a) == 0 or len(b) == 0:
+            missing += len(a)
+            extra += len(b)
+            continue
+        iou = _iou(a, b)
+        best = iou.argmax(axis=1)
+        for i, j in enumerate(best):
+            if iou[i, j] >= iou_threshold:
+                matched += 1
+                worst_iou = min(worst_iou, float(iou[i, j]))
+                worst_score = max(worst_score, abs(ref_scores[i] - scores[j]))
+            else:
+                missing += 1
+        extra += max(0, len(b) - len(set(best.tolist())))
+    prob_diff = float(np.abs(np.asarray(reference["class_probs"]) - np.asarray(other["class_probs"])).max())
+    ok = missing == 0 and extra == 0 and worst_score <= score_tol and prob_diff <= prob_tol
+    return {
+        "matched_boxes": matched,
+        "missing_boxes": missing,
+        "extra_boxes": extra,
+        "min_matched_iou": round(worst_iou, 4),
+        "max_score_diff": round(worst_score, 4),
+        "max_class_prob_diff": round(prob_diff, 5),
+        "parity": ok,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="directory of sample images")
+    parser.add_argument("--backends", nargs="+", default=["native", "onnx"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--iou", type=float, default=0.9)
+    parser.add_argument("--score-tol", type=float, default=0.02)
+    parser.add_argument("--prob-tol", type=float, default=1e-3)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.stdout.write(json.dumps(run_backend(args.worker, args.images, args.repeat)))
+        return
+
+    runs = []
+    for backend in args.backends:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_backends", "--images", args.images,
+             "--repeat", str(args.repeat), "--worker", backend],
+            capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    reference = runs[0]
+    report = {"reference": reference["backend"], "backends": [], "parity": {}}
+    for run in runs:
+        report["backends"].append({k: v for k, v in run.items() if k not in ("boxes", "scores", "class_probs", "images")})
+        if run is not reference:
+            report["parity"][run["backend"]] = compare(reference, run, args.iou, args.score_tol, args.prob_tol)
+
+    emit(report, args.output)
+    if not all(p["parity"] for p in report["parity"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
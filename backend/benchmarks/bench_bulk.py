@@ -0,0 +1,148 @@
+"""
+Throughput of bulk prediction (prefetch + batched inference) by concurrency.
+
+Without --endpoint, objects come from an in-process stand-in that serves
+synthetic JPEGs with a fixed per-request latency, like a local MinIO
+would. With --endpoint, the images are uploaded to that MinIO/S3 server
+first and fetched through the pooled client.
+
+By default inference is a stand-in too: a BatchScheduler whose batches
+cost --batch-ms + --image-ms per frame, so the effect of batching shows
+without model weights. --real-models runs the actual pipeline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bulk --objects 500 --concurrency 1 4 8 16 32
+    python -m benchmarks.bench_bulk --endpoint localhost:9000 --access-key minioadmin --secret-key minioadmin
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.services.batch_scheduler import BatchMetrics, BatchScheduler
+from app.services.bulk_predict import stream_predictions, summarize_run
+from benchmarks._common import emit, synthetic_jpeg
+
+
+class StandInStore:
+    """Object store stand-in: fixed latency per GET, bytes served from memory."""
+
+    def __init__(self, objects: dict, latency_ms: float):
+        self.objects = objects
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+    def get(self, name: str) -> bytes:
+        self.requests += 1
+        time.sleep(self.latency_ms / 1000.0)
+        return self.objects[name]
+
+
+def _minio_fetch(args, objects: dict):
+    import io
+
+    import urllib3
+    from minio import Minio
+
+    client = Minio(
+        args.endpoint, access_key=args.access_key, secret_key=args.secret_key, secure=False,
+        http_client=urllib3.PoolManager(maxsize=max(args.concurrency)),
+    )
+    if not client.bucket_exists(args.bucket):
+        client.make_bucket(args.bucket)
+    for name, data in objects.items():
+        client.put_object(args.bucket, name, io.BytesIO(data), length=len(data), content_type="image/jpeg")
+
+    def fetch(name: str) -> bytes:
+        response = client.get_object(args.bucket, name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    return fetch
+
+
+def _stand_in_predict(args):
+    def process_batch(images, options=None):
+        time.sleep((args.batch_ms + args.image_ms * len(images)) / 1000.0)
+        return [{"faces_detected": 0, "results": []} for _ in images]
+
+    scheduler = BatchScheduler(process_batch, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    async def predict(data: bytes) -> dict:
+        return await asyncio.wrap_future(scheduler.submit(data))
+
+    return predict, scheduler
+
+
+async def _run(names, fetch, predict, concurrency: int) -> dict:
+    started = time.perf_counter()
+    count = errors = 0
+    async for item in stream_predictions(names, fetch, predict, concurrency=concurrency):
+        count += 1
+        errors += "error" in item
+    return summarize_run(count, errors, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=300)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8, 16, 32])
+    parser.add_argument("--latency-ms", type=float, default=15.0, help="Stand-in store latency per GET")
+    parser.add_argument("--endpoint", default=None, help="Use a real MinIO/S3 endpoint instead of the stand-in")
+    parser.add_argument("--access-key", default="minioadmin")
+    parser.add_argument("--secret-key", default="minioadmin")
+    parser.add_argument("--bucket", default="bench-bulk")
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--batch-ms", type=float, default=20.0, help="Stand-in inference cost per batch")
+    parser.add_argument("--image-ms", type=float, default=4.0, help="Stand-in inference cost per frame")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    objects = {f"bench/{i:06d}.jpg": synthetic_jpeg(width, height, seed=i % 16) for i in range(args.objects)}
+    names = sorted(objects)
+
+    if args.endpoint:
+        fetch = _minio_fetch(args, objects)
+    else:
+        fetch = StandInStore(objects, args.latency_ms).get
+
+    scheduler = None
+    if args.real_models:
+        from app.services.bulk_predict import predict_bytes_with_backoff
+        from app.services.model_registry import get_model_registry
+        get_model_registry().load()
+        predict = predict_bytes_with_backoff
+    else:
+        predict, scheduler = _stand_in_predict(args)
+
+    results = {
+        "objects": args.objects,
+        "size": args.size,
+        "store": args.endpoint or f"stand-in ({args.latency_ms} ms/GET)",
+        "inference": "real" if args.real_models else f"stand-in ({args.batch_ms} ms + {args.image_ms} ms/frame)",
+        "runs": [],
+    }
+
+    async def run_all():
+        # One event loop for all runs: the inference executor's semaphore is bound to it
+        for concurrency in args.concurrency:
+            run = await _run(names, fetch, predict, concurrency)
+            run["concurrency"] = concurrency
+            if scheduler is not None:
+                run["avg_batch_size"] = scheduler.get_stats()["avg_batch_size"]
+                scheduler.metrics = BatchMetrics()
+            results["runs"].append(run)
+
+    asyncio.run(run_all())
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Per-request decode latency and /tmp usage: temp-file round trip vs in-memory decode.
+
+Usage (from backend/):
+    python -m benchmarks.bench_decode --sizes 640x480 1920x1080 3840x2160
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import cv2
+
+from app.utils.image_utils import choose_reduce_factor, decode_image_bytes
+from benchmarks._common import emit, summarize, synthetic_jpeg, time_calls
+
+
+def _tmp_usage_bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1920x1080", "3840x2160"])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--max-side", type=int, default=960, help="DECODE_MAX_SIDE used for the reduced path")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        data = synthetic_jpeg(width, height)
+
+        # Old path: NamedTemporaryFile(delete=False) + cv2.imread, never cleaned up
+        tmp_dir = tempfile.mkdtemp(prefix="bench_decode_")
+
+        def temp_file_path():
+            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg", dir=tmp_dir)
+            tmp.write(data)
+            tmp.flush()
+            tmp.close()
+            image = cv2.imread(tmp.name)
+            assert image is not None
+
+        temp_latencies = time_calls(temp_file_path, repeat=args.repeat)
+        leaked = _tmp_usage_bytes(tmp_dir)
+        leaked_files = len(os.listdir(tmp_dir))
+        shutil.rmtree(tmp_dir)
+
+        memory_latencies = time_calls(lambda: decode_image_bytes(data), repeat=args.repeat)
+
+        factor = choose_reduce_factor(data, args.max_side)
+        reduced_latencies = time_calls(lambda: decode_image_bytes(data, reduce_factor=factor), repeat=args.repeat)
+
+        results.append({
+            "size": size,
+            "jpeg_bytes": len(data),
+            "temp_file": dict(summarize(temp_latencies), tmp_bytes_left=leaked, tmp_files_left=leaked_files),
+            "in_memory": dict(summarize(memory_latencies), tmp_bytes_left=0, tmp_files_left=0),
+            "in_memory_reduced": dict(summarize(reduced_latencies), reduce_factor=factor),
+        })
+
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
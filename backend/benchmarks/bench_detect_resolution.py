@@ -0,0 +1,134 @@
+"""
+Detector latency and recall per detection resolution (DETECT_MAX_SIDE).
+
+Every image is detected once at full resolution (max_side=0); those boxes
+are the reference. For each --sizes value the detector runs on the frame
+downscaled to that longer side, boxes are mapped back, and the run reports
+detect_faces latency, prepare_for_detection (resize) latency, and
+recall/precision against the reference at IoU >= --iou. Recall that stays
+near 1.0 while latency drops marks a safe DETECT_MAX_SIDE for the photos
+given; small faces are what lower resolutions lose first.
+
+Usage (from backend/):
+    python -m benchmarks.bench_detect_resolution --images ~/photos --sizes 320 480 640 960 1280
+    python -m benchmarks.bench_detect_resolution --backend onnx --images ~/photos --min-face 24
+"""
+
+import argparse
+import os
+
+from benchmarks._common import configure_env, emit, summarize, synthetic_jpeg, time_calls
+
+_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def _load_images(args) -> list:
+    import cv2
+    import numpy as np
+
+    if not args.images:
+        # Synthetic frames only exercise the code path; recall needs real photos
+        return [cv2.imdecode(np.frombuffer(synthetic_jpeg(1920, 1080, seed=i), np.uint8), cv2.IMREAD_COLOR)
+                for i in range(args.limit or 8)]
+    paths = []
+    for root, _, files in os.walk(os.path.expanduser(args.images)):
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(_EXTENSIONS))
+    paths.sort()
+    if args.limit:
+        paths = paths[: args.limit]
+    images = [cv2.imread(path, cv2.IMREAD_COLOR) for path in paths]
+    return [image for image in images if image is not None]
+
+
+def _iou(a, b):
+    """Pairwise IoU of two (N, 4) and (M, 4) xyxy arrays."""
+    import numpy as np
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def _matches(reference, found, threshold: float) -> int:
+    """Greedy one-to-one matches between reference and found boxes at IoU >= threshold."""
+    if not len(reference) or not len(found):
+        return 0
+    iou = _iou(reference.xyxy, found.xyxy)
+    matched = 0
+    while True:
+        i, j = divmod(int(iou.argmax()), iou.shape[1])
+        if iou[i, j] < threshold:
+            return matched
+        matched += 1
+        iou[i, :] = -1.0
+        iou[:, j] = -1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=None, help="Directory of photos (searched recursively)")
+    parser.add_argument("--limit", type=int, default=0, help="Use at most this many images")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[320, 480, 640, 960, 1280])
+    parser.add_argument("--min-face", type=int, default=0, help="MIN_FACE_SIZE applied to every run")
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed detector calls per image")
+    parser.add_argument("--backend", default="native", help="INFERENCE_BACKEND")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_env({"INFERENCE_BACKEND": args.backend, "DETECT_MAX_SIDE": 0, "MIN_FACE_SIZE": args.min_face})
+    from app.services.detection import DetectOptions, detect_faces, prepare_for_detection
+    from app.services.model_registry import get_model_registry
+
+    images = _load_images(args)
+    if not images:
+        parser.error(f"no readable images under {args.images}")
+    registry = get_model_registry()
+    registry.load()
+    detector = registry.models()[0]
+
+    def run(options: DetectOptions) -> dict:
+        latencies, resize, found = [], [], []
+        for image in images:
+            latencies.extend(time_calls(lambda: detect_faces(detector, [image], [options]),
+                                        repeat=args.repeat, warmup=1))
+            resize.extend(time_calls(lambda: prepare_for_detection(image, options), repeat=args.repeat, warmup=0))
+            found.append(detect_faces(detector, [image], [options])[0])
+        return {"detect": summarize(latencies), "prepare": summarize(resize), "found": found}
+
+    reference = run(DetectOptions(max_side=0, min_face=args.min_face))
+    reference_faces = sum(len(d) for d in reference["found"])
+    runs = [{"max_side": 0, "faces": reference_faces, "detect": reference["detect"], "prepare": reference["prepare"],
+             "recall": 1.0, "precision": 1.0}]
+    for max_side in args.sizes:
+        result = run(DetectOptions(max_side=max_side, min_face=args.min_face))
+        faces = sum(len(d) for d in result["found"])
+        matched = sum(_matches(ref, found, args.iou) for ref, found in zip(reference["found"], result["found"]))
+        runs.append({
+            "max_side": max_side,
+            "faces": faces,
+            "detect": result["detect"],
+            "prepare": result["prepare"],
+            "recall": round(matched / reference_faces, 4) if reference_faces else None,
+            "precision": round(matched / faces, 4) if faces else None,
+            "speedup": round(reference["detect"]["mean_ms"] / result["detect"]["mean_ms"], 2)
+            if result["detect"]["mean_ms"] else None,
+        })
+
+    emit({
+        "backend": args.backend,
+        "images": len(images),
+        "source": args.images or "synthetic",
+        "min_face": args.min_face,
+        "iou": args.iou,
+        "runs": runs,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Detector invocations saved by adaptive detection scheduling (no models needed).
+
+Replays a synthetic stream through TrackerSession.should_detect: a static
+corridor scene with occasional bursts of motion (someone walking through),
+at several executor load levels, and reports the effective detection rate
+and the cost of the motion check itself.
+
+Usage (from backend/):
+    python -m benchmarks.bench_detect_schedule --frames 3000 --motion-ratio 0.1
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+from app.services.preprocess import motion_thumbnail
+from app.services.tracker_manager import TrackerSession
+from benchmarks._common import emit, summarize, time_calls
+
+
+def _stream(frames: int, motion_ratio: float, width: int, height: int, seed: int = 0):
+    """Static background with sensor noise; a moving block during motion bursts."""
+    rng = np.random.default_rng(seed)
+    background = cv2.resize(
+        rng.integers(0, 255, size=(height // 16, width // 16, 3), dtype=np.uint8), (width, height)
+    )
+    burst_len = 30
+    bursts = max(0, int(frames * motion_ratio / burst_len))
+    starts = set(rng.choice(max(1, frames - burst_len), size=bursts, replace=False).tolist()) if bursts else set()
+    moving_until = -1
+    for i in range(frames):
+        if i in starts:
+            moving_until = i + burst_len
+        frame = background.copy()
+        noise = rng.integers(-3, 4, size=frame.shape, dtype=np.int16)
+        frame = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        if i < moving_until:
+            x = int((i % burst_len) / burst_len * (width - 200))
+            frame[height // 3:height // 3 + 200, x:x + 120] = (40, 60, 200)
+        yield frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--motion-ratio", type=float, default=0.1, help="Fraction of frames with motion")
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--loads", nargs="+", type=float, default=[0.0, 0.5, 1.0])
+    parser.add_argument("--max-interval", type=int, default=8)
+    parser.add_argument("--motion-threshold", type=float, default=6.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    thumbnails = [motion_thumbnail(f) for f in _stream(args.frames, args.motion_ratio, width, height)]
+
+    results = {"frames": args.frames, "motion_ratio": args.motion_ratio, "size": args.size, "runs": []}
+    for load in args.loads:
+        session = TrackerSession()
+        for thumb in thumbnails:
+            session.should_detect(thumb, load=load, max_interval=args.max_interval,
+                                  motion_threshold=args.motion_threshold)
+        results["runs"].append({
+            "load": load,
+            "frames_detected": session.frames_detected,
+            "detection_rate": round(session.get_detection_rate(), 4),
+            "detector_calls_saved": round(1.0 - session.get_detection_rate(), 4),
+        })
+
+    frame = next(_stream(1, 0.0, width, height))
+    results["motion_check"] = summarize(time_calls(lambda: motion_thumbnail(frame), repeat=200))
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
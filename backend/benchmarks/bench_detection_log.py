@@ -0,0 +1,153 @@
+"""
+Detection log ingest rate and compliance query latency.
+
+Feeds --rows detections (--sessions webcam sessions, about --faces faces
+per frame, tracks coming and going) through DetectionLog.record() with
+timestamps spread over the last --hours, for each sink/format: aggregates
+only ("memory") and segments on local disk as Parquet and .npz.
+
+Reports the request-path cost of record(), end-to-end ingest rate (rows
+per second until everything is aggregated and written), segment size per
+row, and the latency of the stats queries (all sessions, one session,
+with the per-minute series). As the baseline, the same one-session window
+answer is computed by scanning the written segments with numpy, once
+including reading the files and once on columns already in memory; both
+answers are compared.
+
+Usage (from backend/):
+    python -m benchmarks.bench_detection_log --rows 2000000 --sessions 50
+"""
+
+import argparse
+import glob
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks._common import configure_env, emit, summarize, time_calls
+
+
+def _frames(args, now: float):
+    """(timestamp, session_id, faces) of the workload, in time order."""
+    rng = random.Random(0)
+    box = {"startX": 120, "startY": 80, "endX": 220, "endY": 200}
+    labels = ("Mask", "Mask", "No Mask")
+    frames = int(args.rows / args.faces)
+    start = now - args.hours * 3600
+    step = args.hours * 3600 / frames
+    for f in range(frames):
+        session = f % args.sessions
+        local = f // args.sessions
+        faces = [
+            {"box": box, "label": labels[rng.randrange(3)], "confidence": 0.93,
+             "track_id": (local // 90) * 8 + k}
+            for k in range(rng.randint(args.faces - 1, args.faces + 1))
+        ]
+        yield start + f * step, f"cam-{session}", {"results": faces}
+
+
+def _ingest(DetectionLog, args, sink: str, fmt: str, directory: str, now: float):
+    log = DetectionLog(sink=sink, directory=directory, fmt=fmt, segment_rows=args.segment_rows,
+                       max_pending=10 ** 9, window_minutes=60, max_sessions=args.sessions * 2)
+    frames = list(_frames(args, now))
+    rows = sum(len(result["results"]) for _, _, result in frames)
+    started = time.perf_counter()
+    for ts, session_id, result in frames:
+        log.record(session_id, result, timestamp=ts)
+    recorded = time.perf_counter()
+    log.flush()
+    finished = time.perf_counter()
+    stats = {
+        "rows": rows,
+        "record_us": round((recorded - started) / len(frames) * 1e6, 3),
+        "ingest_rows_per_s": int(rows / (finished - started)),
+        "writer_lag_s": round(finished - recorded, 3),
+        "dropped": log.dropped,
+    }
+    if sink != "memory":
+        stats["segments"] = log.segments
+        stats["bytes_per_row"] = round(log.segment_bytes / max(1, log.rows), 2)
+    return log, stats
+
+
+def _scan(columns, session_id: str, head: int) -> dict:
+    sel = (columns["session_id"] == session_id) & (columns["timestamp"] // 60 >= head - 59)
+    labels = columns["label"][sel]
+    return {
+        "faces": int(sel.sum()),
+        "masked": int((labels == "Mask").sum()),
+        "unmasked": int((labels == "No Mask").sum()),
+        "unique_tracks": int(len(np.unique(columns["track_id"][sel]))),
+    }
+
+
+def _load_all(load_segment, directory: str, fmt: str) -> dict:
+    parts = [load_segment(p) for p in sorted(glob.glob(os.path.join(directory, "**", f"*.{fmt}"), recursive=True))]
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--faces", type=int, default=3, help="Average faces per frame")
+    parser.add_argument("--hours", type=float, default=2.0, help="Time span of the rows (window is 60 min)")
+    parser.add_argument("--segment-rows", type=int, default=250000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_env()
+    from app.services.detection_log import DetectionLog, load_segment
+
+    try:
+        import pyarrow  # noqa: F401
+        formats = ["parquet", "npz"]
+    except ImportError:
+        formats = ["npz"]
+
+    now = time.time()
+    head = int(now // 60)
+    session_id = "cam-1"
+    runs = {}
+    for sink, fmt in [("memory", None)] + [("local", f) for f in formats]:
+        directory = tempfile.mkdtemp(prefix="detection-log-")
+        try:
+            log, stats = _ingest(DetectionLog, args, sink, fmt or "npz", directory, now)
+            stats["query_ms"] = {
+                "all_sessions": summarize(time_calls(log.get_stats, args.repeat)),
+                "all_sessions_15min": summarize(time_calls(lambda: log.get_stats(15), args.repeat)),
+                "session": summarize(time_calls(lambda: log.session_stats(session_id), args.repeat)),
+                "session_series": summarize(time_calls(lambda: log.session_stats(session_id, series=True),
+                                                       args.repeat)),
+            }
+            window = log.session_stats(session_id)["window"]
+            answer = {key: window[key] for key in ("faces", "masked", "unmasked", "unique_tracks")}
+            if sink != "memory":
+                started = time.perf_counter()
+                columns = _load_all(load_segment, directory, fmt)
+                scanned = _scan(columns, session_id, head)
+                stats["scan_with_read_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+                stats["scan_in_memory_ms"] = summarize(time_calls(lambda: _scan(columns, session_id, head), 5, 1))
+                stats["scan_matches_aggregates"] = scanned == answer
+            stats["session_window"] = answer
+            log.close()
+            runs[sink if fmt is None else fmt] = stats
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    emit({
+        "rows": args.rows,
+        "sessions": args.sessions,
+        "hours": args.hours,
+        "segment_rows": args.segment_rows,
+        **runs,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
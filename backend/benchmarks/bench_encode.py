@@ -0,0 +1,69 @@
+"""
+Render cost and payload size of each response mode.
+
+For every frame size, times annotation + encoding per response mode and
+reports the bytes that go over the wire (JSON body, plus the binary body
+for jpeg/webp/png). "json" is the no-image baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_encode --sizes 640x480 1920x1080 --faces 4
+"""
+
+import argparse
+import json
+
+import cv2
+import numpy as np
+
+from app.services.render import BINARY_MODES, RESPONSE_MODES, RenderOptions, detections_header, render
+from benchmarks._common import emit, summarize, synthetic_jpeg, time_calls
+
+
+def _fake_result(width: int, height: int, faces: int) -> dict:
+    rng = np.random.default_rng(0)
+    results = []
+    for i in range(faces):
+        x, y = int(rng.integers(0, width - 120)), int(rng.integers(0, height - 120))
+        results.append({
+            "box": {"startX": x, "startY": y, "endX": x + 100, "endY": y + 100},
+            "label": "Mask" if i % 2 else "No Mask",
+            "confidence": 0.97,
+        })
+    return {"faces_detected": faces, "results": results, "width": width, "height": height}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1280x720", "1920x1080"])
+    parser.add_argument("--faces", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=list(RESPONSE_MODES))
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        image = cv2.imdecode(np.frombuffer(synthetic_jpeg(width, height), np.uint8), cv2.IMREAD_COLOR)
+        base = _fake_result(width, height, args.faces)
+
+        row = {"size": size}
+        for mode in args.modes:
+            options = RenderOptions(mode=mode)
+            frame = image.copy()
+
+            def run():
+                return render(json.loads(json.dumps(base)), frame, options)
+
+            latencies = time_calls(run, repeat=args.repeat)
+            result, encoded = run()
+            body_bytes = len(encoded) if encoded is not None else len(json.dumps(result))
+            header_bytes = len(detections_header(result)) if mode in BINARY_MODES else 0
+            row[mode] = dict(summarize(latencies), response_bytes=body_bytes + header_bytes)
+        results.append(row)
+
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
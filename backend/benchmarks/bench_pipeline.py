@@ -0,0 +1,136 @@
+"""
+Microbenchmarks of the per-frame hot paths.
+
+    detect_and_predict_mask   full stateless pipeline on one decoded frame,
+                              with and without the legacy base64 rendering
+    get_smoothed_prediction   label smoothing of a tracker session, per
+                              history size and number of tracks
+    preprocess                JPEG decode and face-crop batch preparation
+
+Models default to the weight-free stub backend so the numbers isolate the
+Python around the models; --backend native/onnx times the real ones.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline --sizes 640x480 1920x1080 --faces 1 8
+    python -m benchmarks.bench_pipeline --backend onnx --only detect
+"""
+
+import argparse
+
+from benchmarks._common import configure_env, emit, summarize, synthetic_jpeg, time_calls
+
+
+def _bench_detect(args, face_counts) -> list:
+    import cv2
+    import numpy as np
+
+    from app.services import ai_service
+    from app.services.model_registry import get_model_registry
+
+    runs = []
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        image = cv2.imdecode(np.frombuffer(synthetic_jpeg(width, height), np.uint8), cv2.IMREAD_COLOR)
+        for faces in face_counts:
+            if faces is not None:
+                # Stub detector: faces per frame is a knob; real models find what they find
+                get_model_registry().models()[0].faces = faces
+            for draw in (False, True):
+                runs.append({
+                    "size": size,
+                    "faces": faces,
+                    "draw_on_image": draw,
+                    **summarize(time_calls(lambda: ai_service.detect_and_predict_mask(image, draw_on_image=draw),
+                                           repeat=args.repeat)),
+                })
+    return runs
+
+
+def _bench_smoothing(args) -> list:
+    from app.services.tracker_manager import TrackerSession
+
+    runs = []
+    for history in args.history:
+        for tracks in args.tracks:
+            session = TrackerSession(history_size=history)
+            for track_id in range(tracks):
+                for i in range(history):
+                    session.update_track(track_id, "Mask" if (track_id + i) % 3 else "No Mask", 0.9)
+
+            def smooth_all():
+                for track_id in range(tracks):
+                    session.get_smoothed_prediction(track_id)
+
+            stats = summarize(time_calls(smooth_all, repeat=args.repeat))
+            stats["per_track_us"] = round(stats["mean_ms"] * 1000.0 / tracks, 3)
+            runs.append({"history": history, "tracks": tracks, **stats})
+    return runs
+
+
+def _bench_preprocess(args) -> list:
+    import numpy as np
+
+    from app.services.preprocess import FaceBatchBuffer, clip_boxes, prepare_face_batch
+    from app.utils.image_utils import decode_image_bytes
+
+    runs = []
+    buffer = FaceBatchBuffer()
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        data = synthetic_jpeg(width, height)
+        image = decode_image_bytes(data)
+        runs.append({"size": size, "step": "decode", **summarize(time_calls(lambda: decode_image_bytes(data),
+                                                                             repeat=args.repeat))})
+        for faces in args.faces:
+            side = max(16, min(width, height) // 6)
+            x1 = rng.integers(0, width - side, size=faces)
+            y1 = rng.integers(0, height - side, size=faces)
+            boxes, _ = clip_boxes(np.stack([x1, y1, x1 + side, y1 + side], axis=1), width, height)
+            crops = [(image, tuple(b)) for b in boxes.tolist()]
+            runs.append({
+                "size": size,
+                "step": "face_batch",
+                "faces": faces,
+                **summarize(time_calls(lambda: prepare_face_batch(crops, buffer), repeat=args.repeat)),
+            })
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=("detect", "smoothing", "preprocess"),
+                        default=["detect", "smoothing", "preprocess"])
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1280x720", "1920x1080"])
+    parser.add_argument("--faces", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--history", nargs="+", type=int, default=[5, 15, 30])
+    parser.add_argument("--tracks", nargs="+", type=int, default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--backend", default="stub", help="INFERENCE_BACKEND (stub needs no weights)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    # Stub model latency is left out by default: only the code around the models is timed
+    overrides = {"INFERENCE_BACKEND": args.backend, "STUB_DETECT_MS": 0, "STUB_DETECT_IMAGE_MS": 0,
+                 "STUB_CLASSIFY_MS": 0, "RESULT_CACHE_ENABLED": "false"}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key.strip()] = value.strip()
+    configure_env(overrides)
+
+    results = {"backend": args.backend}
+    if "detect" in args.only:
+        from app.services.model_registry import get_model_registry
+        get_model_registry().load()
+        face_counts = args.faces if args.backend == "stub" else [None]
+        results["detect_and_predict_mask"] = _bench_detect(args, face_counts)
+    if "smoothing" in args.only:
+        results["get_smoothed_prediction"] = _bench_smoothing(args)
+    if "preprocess" in args.only:
+        results["preprocess"] = _bench_preprocess(args)
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Face-crop preprocessing: legacy per-face loop vs the batched buffer path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_preprocess --faces 1 10 50
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+from app.services.preprocess import FaceBatchBuffer, clip_boxes, prepare_face_batch
+from benchmarks._common import emit, summarize, time_calls
+
+
+def legacy_preprocess(image, boxes):
+    """The per-face loop detect_and_predict_mask used before (float64, expand_dims, vstack)."""
+    faces_list = []
+    for startX, startY, endX, endY in boxes:
+        face = image[startY:endY, startX:endX]
+        face_input = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
+        face_input = cv2.resize(face_input, (128, 128))
+        face_input = face_input / 255.0
+        face_input = np.expand_dims(face_input, axis=0)
+        faces_list.append(face_input)
+    return np.vstack(faces_list)
+
+
+def random_boxes(n, width, height, rng):
+    sizes = rng.integers(40, 240, size=n)
+    x1 = rng.integers(0, width - 240, size=n)
+    y1 = rng.integers(0, height - 240, size=n)
+    return np.stack([x1, y1, x1 + sizes, y1 + sizes], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", nargs="+", type=int, default=[1, 10, 50])
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    buffer = FaceBatchBuffer()
+
+    results = []
+    for n in args.faces:
+        boxes, _ = clip_boxes(random_boxes(n, width, height, rng), width, height)
+        box_list = [tuple(b) for b in boxes.tolist()]
+        crops = [(image, b) for b in box_list]
+
+        legacy = legacy_preprocess(image, box_list)
+        batched = prepare_face_batch(crops, buffer)
+        max_diff = float(np.abs(legacy - batched).max())
+
+        legacy_stats = summarize(time_calls(lambda: legacy_preprocess(image, box_list), repeat=args.repeat))
+        batched_stats = summarize(time_calls(lambda: prepare_face_batch(crops, buffer), repeat=args.repeat))
+        results.append({
+            "faces": n,
+            "legacy": legacy_stats,
+            "batched": batched_stats,
+            "speedup": round(legacy_stats["mean_ms"] / batched_stats["mean_ms"], 2),
+            "max_abs_diff": round(max_diff, 6),
+        })
+
+    emit({"frame": args.size, "runs": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Accuracy-vs-speed report for the float and INT8 mask classifiers.
+
+Evaluates each classifier on the held-out split of the dataset (the same
+deterministic split scripts/quantize_classifier.py calibrates on the other
+side of), then measures latency per batch size, model file size and the
+RSS growth from loading the model. CPU only.
+
+Usage (from backend/):
+    python -m benchmarks.bench_quantization --dataset data --classifiers keras onnx onnx-int8
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from app.services.inference_backends import MODEL_DIR, create_classifier
+from app.utils.dataset import list_labelled_images, load_face_crop, split_dataset
+from benchmarks._common import emit, rss_mb, summarize, time_calls
+
+MODEL_FILES = {
+    "keras": "model.h5",
+    "native": "model.h5",
+    "onnx": "model.onnx",
+    "onnx-int8": "model_int8.onnx",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", required=True, help="root with with_mask/ and without_mask/")
+    parser.add_argument("--classifiers", nargs="+", default=["keras", "onnx", "onnx-int8"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32, 64])
+    parser.add_argument("--limit", type=int, default=0, help="cap on held-out images (0 = all)")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=2)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    _, holdout = split_dataset(list_labelled_images(args.dataset), seed=args.seed)
+    if args.limit:
+        holdout = holdout[:args.limit]
+    x = np.stack([load_face_crop(p) for p, _ in holdout])
+    y = np.array([label for _, label in holdout])
+
+    report = {"holdout_images": int(len(y)), "classifiers": []}
+    reference_pred = None
+    for name in args.classifiers:
+        before = rss_mb()
+        classifier = create_classifier(name)
+        loaded = rss_mb()
+
+        probs = np.concatenate([classifier.predict(x[i:i + 64]) for i in range(0, len(x), 64)])
+        pred = probs.argmax(axis=1)
+        if reference_pred is None:
+            reference_pred = pred
+
+        latency = {}
+        for bs in args.batch_sizes:
+            batch = x[:bs] if len(x) >= bs else np.resize(x, (bs,) + x.shape[1:])
+            stats = summarize(time_calls(lambda: classifier.predict(batch), repeat=args.repeat))
+            stats["faces_per_s"] = round(bs * 1000.0 / stats["mean_ms"], 1) if stats["mean_ms"] else None
+            latency[str(bs)] = stats
+
+        model_path = os.path.join(MODEL_DIR, MODEL_FILES.get(name, ""))
+        report["classifiers"].append({
+            "classifier": name,
+            "accuracy": round(float((pred == y).mean()), 4),
+            "agreement_with_first": round(float((pred == reference_pred).mean()), 4),
+            "confusion_matrix": [[int(((y == t) & (pred == p)).sum()) for p in (0, 1)] for t in (0, 1)],
+            "latency_by_batch_size": latency,
+            "model_file_mb": round(os.path.getsize(model_path) / (1024.0 * 1024.0), 2) if os.path.isfile(model_path) else None,
+            "load_rss_mb": round(loaded - before, 1),
+        })
+
+    emit(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Cost of sharing a tracker session: snapshot size, encode/decode time and
+session store round trips.
+
+Builds sessions the way the app does (stub models, detections fed to the
+real tracker) with --tracks faces in view for --frames frames, then times
+TrackerSession.snapshot / restore (including the HMAC) with the app's
+tracker codec for every combination of track count and history size. The store section times the
+per-frame calls of a shared session against the in-process store and the
+Redis-protocol stand-in (optionally with added latency): get_meta (every
+frame), save (every SESSION_SYNC_INTERVAL frames) and load (on migration).
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_snapshot --tracks 2 8 32 --history 5 15 --latency-ms 0.2
+"""
+
+import argparse
+
+from benchmarks._common import configure_env, emit, summarize, time_calls
+
+KEY = b"benchmark-secret"
+
+
+def _build_session(ai_service, tracks: int, history: int, frames: int):
+    import numpy as np
+
+    from app.services.inference_backends import Detections
+    from app.services.tracker_manager import get_session_manager
+
+    manager = get_session_manager()
+    session_id = f"bench-{tracks}-{history}"
+    manager.remove_session(session_id, shared=False)
+    manager.get_or_create_session(session_id, history_size=history, shared=False)
+    image = np.zeros((720, 1280, 3), dtype=np.uint8)
+    cols = int(np.ceil(np.sqrt(tracks)))
+    for frame in range(frames):
+        corners = [(40 + (i % cols) * 150 + frame, 40 + (i // cols) * 110) for i in range(tracks)]
+        boxes = [(x, y, x + 100, y + 100) for x, y in corners]
+        ai_service.detect_and_predict_mask_with_tracking(
+            image, session_id, draw_on_image=False, shared=False,
+            detections=Detections(np.asarray(boxes, dtype=np.float32), np.full(tracks, 0.9)),
+        )
+    return manager.get_or_create_session(session_id, shared=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, nargs="+", default=[2, 8, 32])
+    parser.add_argument("--history", type=int, nargs="+", default=[5, 15])
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every stand-in command")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_env({"INFERENCE_BACKEND": "stub", "STUB_CLASSIFY_MS": 0, "MODEL_PRELOAD": "false"})
+    from app.services import ai_service
+    from app.services.model_registry import get_model_registry
+    from app.services.session_store import MemorySessionStore, RedisSessionStore
+    from app.services.tracker_manager import TrackerSession
+    from benchmarks._redis_standin import RedisStandIn
+
+    get_model_registry().load()
+
+    snapshots = []
+    payloads = {}
+    for tracks in args.tracks:
+        for history in args.history:
+            session = _build_session(ai_service, tracks, history, args.frames)
+            data = session.snapshot(ai_service.dump_tracker, key=KEY)
+            payloads[tracks] = data
+            tracker_bytes = len(ai_service.dump_tracker(session.tracker))
+            snapshots.append({
+                "tracks": tracks,
+                "history": history,
+                "bytes": len(data),
+                "tracker_bytes": tracker_bytes,
+                "snapshot": summarize(time_calls(lambda: session.snapshot(ai_service.dump_tracker, key=KEY),
+                                                 args.repeat)),
+                "restore": summarize(time_calls(lambda: TrackerSession.restore(data, ai_service.load_tracker, key=KEY),
+                                                args.repeat)),
+            })
+
+    standin = RedisStandIn(latency_ms=args.latency_ms).start()
+    stores = {"memory": MemorySessionStore(), "redis": RedisSessionStore(standin.url)}
+    round_trips = {}
+    try:
+        for name, store in stores.items():
+            for tracks, data in payloads.items():
+                store.save("bench", data, ("bench-worker", 1), 300)
+                round_trips[f"{name}/{tracks}_tracks"] = {
+                    "get_meta": summarize(time_calls(lambda: store.get_meta("bench"), args.repeat)),
+                    "save": summarize(time_calls(lambda: store.save("bench", data, ("bench-worker", 1), 300), args.repeat)),
+                    "load": summarize(time_calls(lambda: store.load("bench"), args.repeat)),
+                }
+            store.close()
+    finally:
+        standin.stop()
+
+    emit({
+        "frames_per_session": args.frames,
+        "standin_latency_ms": args.latency_ms,
+        "snapshots": snapshots,
+        "store": round_trips,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cold-start and first-request latency of the API.
+
+Starts uvicorn in a subprocess and records the time until the process
+answers at all (GET /), until it reports /health/ready (models loaded and
+warmed up), and the latency of the first and following predictions.
+Compare runs with MODEL_PRELOAD=true/false, or against an older commit
+(which has no /health/ready: the readiness time is then skipped).
+
+Usage (from backend/, with .env settings available):
+    python -m benchmarks.bench_startup --port 8765
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from benchmarks._common import emit, synthetic_jpeg
+
+
+def _get(url: str, timeout: float = 2.0) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return 0
+
+
+def _wait_for(url: str, ok_codes, deadline: float) -> bool:
+    while time.monotonic() < deadline:
+        status = _get(url)
+        if status in ok_codes:
+            return True
+        if status == 404:
+            return False
+        time.sleep(0.05)
+    return False
+
+
+def _predict(base: str, token: str, image: bytes) -> float:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"frame.jpg\"\r\n"
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + image + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(
+        f"{base}/predict/from-file-json", data=body, method="POST",
+        headers={"Authorization": f"Bearer {token}", "Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=300) as resp:
+        resp.read()
+    return (time.perf_counter() - started) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from app.core.security import create_access_token
+
+    base = f"http://127.0.0.1:{args.port}"
+    token = create_access_token({"sub": "bench"})
+    image = synthetic_jpeg(1280, 720)
+
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=dict(os.environ),
+    )
+    deadline = started + args.timeout
+    try:
+        result = {"model_preload": os.environ.get("MODEL_PRELOAD", "default")}
+        if not _wait_for(f"{base}/", {200}, deadline):
+            raise SystemExit("API did not come up")
+        result["first_response_s"] = round(time.monotonic() - started, 3)
+
+        if _wait_for(f"{base}/health/ready", {200}, deadline):
+            result["ready_s"] = round(time.monotonic() - started, 3)
+
+        result["first_request_ms"] = round(_predict(base, token, image), 1)
+        result["first_prediction_s"] = round(time.monotonic() - started, 3)
+        result["next_requests_ms"] = [round(_predict(base, token, image), 1) for _ in range(args.requests - 1)]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
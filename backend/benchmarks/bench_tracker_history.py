@@ -0,0 +1,148 @@
+"""
+Label-history memory and update cost: previous TrackerSession vs the array-backed one.
+
+"legacy" is the previous implementation: a defaultdict of deques of
+TrackPrediction dataclasses per session, smoothing rebuilt from the whole
+history every call, dead track IDs kept forever. "current" is
+TrackerSession with per-slot ring buffers, running vote counts and
+stale-track pruning.
+
+Each session simulates --frames frames with --tracks faces in view; a
+face leaves and a new track ID appears with probability --churn per
+frame, which is what makes the legacy history grow. Reports tracemalloc
+memory after the run, tracks still held, and the time of one
+update + smoothed read per face. Smoothed labels of both are compared.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tracker_history --sessions 2000 --tracks 8 --frames 300
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+from benchmarks._common import configure_env, emit
+
+
+@dataclass
+class TrackPrediction:
+    label: str
+    confidence: float
+    timestamp: float
+
+
+class LegacySession:
+    """The label history of TrackerSession before the array-backed rewrite."""
+
+    def __init__(self, history_size: int = 5):
+        self.track_history = defaultdict(lambda: deque(maxlen=history_size))
+        self.last_activity = time.time()
+
+    def update_track(self, track_id, label, confidence):
+        self.track_history[track_id].append(TrackPrediction(label, confidence, time.time()))
+        self.last_activity = time.time()
+
+    def get_smoothed_prediction(self, track_id):
+        history = self.track_history[track_id]
+        if not history:
+            return "Unknown", 0.0
+        label_votes = defaultdict(list)
+        for pred in history:
+            label_votes[pred.label].append(pred.confidence)
+        winner_label = max(label_votes.keys(), key=lambda k: len(label_votes[k]))
+        return winner_label, sum(label_votes[winner_label]) / len(label_votes[winner_label])
+
+
+def _workload(args, seed: int):
+    """Per-frame list of (track_id, label, confidence) for one session."""
+    rng = random.Random(seed)
+    alive = list(range(args.tracks))
+    next_id = args.tracks
+    frames = []
+    for _ in range(args.frames):
+        if rng.random() < args.churn:
+            alive[rng.randrange(len(alive))] = next_id
+            next_id += 1
+        frames.append([(t, "Mask" if rng.random() < 0.8 else "No Mask", 0.5 + rng.random() / 2) for t in alive])
+    return frames
+
+
+def _run(make_session, workloads, stale_frames: int) -> dict:
+    tracemalloc.start()
+    sessions = [make_session() for _ in workloads]
+    faces = 0
+    elapsed = 0.0
+    for session, frames in zip(sessions, workloads):
+        prune = getattr(session, "prune_stale", None)
+        for f, faces_in_frame in enumerate(frames):
+            started = time.perf_counter()
+            if prune is not None:
+                # should_detect() advances the frame counter in the app
+                session.frames_seen = f + 1
+                prune(stale_frames)
+            for track_id, label, confidence in faces_in_frame:
+                session.update_track(track_id, label, confidence)
+                session.get_smoothed_prediction(track_id)
+            elapsed += time.perf_counter() - started
+            faces += len(faces_in_frame)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracks = sum(s.track_count if prune is not None else len(s.track_history) for s in sessions)
+    return {
+        "memory_mb": round(current / (1024 * 1024), 2),
+        "peak_mb": round(peak / (1024 * 1024), 2),
+        "bytes_per_session": int(current / len(sessions)),
+        "tracks_held": tracks,
+        "update_us": round(elapsed / faces * 1e6, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--tracks", type=int, default=8, help="Faces in view per frame")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--history", type=int, default=5)
+    parser.add_argument("--churn", type=float, default=0.05, help="Probability per frame that a face is replaced")
+    parser.add_argument("--stale-frames", type=int, default=90)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_env()
+    from app.services.tracker_manager import TrackerSession
+
+    workloads = [_workload(args, seed) for seed in range(args.sessions)]
+    legacy = _run(lambda: LegacySession(args.history), workloads, args.stale_frames)
+    current = _run(lambda: TrackerSession(args.history), workloads, args.stale_frames)
+
+    # Same labels on a sample of sessions (confidences match up to float rounding)
+    sample = workloads[: min(50, len(workloads))]
+    mismatches = 0
+    for frames in sample:
+        old, new = LegacySession(args.history), TrackerSession(args.history)
+        for faces_in_frame in frames:
+            for track_id, label, confidence in faces_in_frame:
+                old.update_track(track_id, label, confidence)
+                new.update_track(track_id, label, confidence)
+                a, b = old.get_smoothed_prediction(track_id), new.get_smoothed_prediction(track_id)
+                mismatches += a[0] != b[0] or abs(a[1] - b[1]) > 1e-9
+
+    emit({
+        "sessions": args.sessions,
+        "tracks_in_view": args.tracks,
+        "frames": args.frames,
+        "history": args.history,
+        "churn": args.churn,
+        "legacy": legacy,
+        "current": current,
+        "memory_ratio": round(legacy["memory_mb"] / current["memory_mb"], 2) if current["memory_mb"] else None,
+        "update_speedup": round(legacy["update_us"] / current["update_us"], 2) if current["update_us"] else None,
+        "mismatches": mismatches,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
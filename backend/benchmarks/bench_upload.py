@@ -0,0 +1,127 @@
+"""
+Upload throughput and peak memory: buffered upload vs part-streamed upload.
+
+"buffered" is the previous upload_fileobj (read the whole file, copy it
+into a BytesIO, check the bucket on every call); "streamed" is the
+current one (put_object straight from the spooled file, part by part,
+bucket existence cached). Peak memory is the tracemalloc peak of Python
+allocations during one upload.
+
+Without --endpoint, uploads go to an in-process S3-compatible stand-in
+(bucket HEAD/PUT, single PUT and multipart upload) that discards the
+bodies, so only client-side cost is measured.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload --sizes-mb 16 64 256
+    python -m benchmarks.bench_upload --endpoint localhost:9000 --access-key minioadmin --secret-key minioadmin
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import urllib3
+from minio import Minio
+
+from benchmarks._common import emit
+from benchmarks._s3_standin import S3StandIn
+
+
+def _buffered_upload(client: Minio, bucket: str, name: str, fileobj):
+    """upload_fileobj before streaming: bucket check per call, two full in-memory copies."""
+    if not client.bucket_exists(bucket):
+        client.make_bucket(bucket)
+    fileobj.seek(0)
+    data = fileobj.read()
+    stream = io.BytesIO(data)
+    client.put_object(bucket, name, stream, length=len(data))
+
+
+def _streamed_upload(client: Minio, bucket: str, name: str, fileobj, part_size: int, known: set):
+    """Current upload_fileobj: cached bucket check, put_object straight from the file."""
+    if bucket not in known:
+        if not client.bucket_exists(bucket):
+            client.make_bucket(bucket)
+        known.add(bucket)
+    fileobj.seek(0, os.SEEK_END)
+    length = fileobj.tell()
+    fileobj.seek(0)
+    client.put_object(bucket, name, fileobj, length=length, part_size=part_size)
+
+
+def _spooled_file(size_mb: int):
+    """A SpooledTemporaryFile rolled over to disk, like Starlette's UploadFile.file."""
+    f = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    block = os.urandom(1024 * 1024)
+    for _ in range(size_mb):
+        f.write(block)
+    f.seek(0)
+    return f
+
+
+def _measure(fn) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_mb": round(peak / (1024 * 1024), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", nargs="+", type=int, default=[16, 64, 256])
+    parser.add_argument("--part-size-mb", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--endpoint", default=None, help="Real MinIO/S3 endpoint instead of the stand-in")
+    parser.add_argument("--access-key", default="minioadmin")
+    parser.add_argument("--secret-key", default="minioadmin")
+    parser.add_argument("--bucket", default="bench-upload")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    standin = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        standin = S3StandIn(discard=True).start()
+        endpoint = standin.endpoint
+
+    client = Minio(endpoint, access_key=args.access_key, secret_key=args.secret_key, secure=False,
+                   region="us-east-1", http_client=urllib3.PoolManager(maxsize=4))
+    part_size = args.part_size_mb * 1024 * 1024
+    known = set()
+
+    results = {"endpoint": args.endpoint or "stand-in", "part_size_mb": args.part_size_mb, "runs": []}
+    for size_mb in args.sizes_mb:
+        with _spooled_file(size_mb) as f:
+            for mode in ("buffered", "streamed"):
+                samples = []
+                for _ in range(args.repeat):
+                    name = f"bench/{uuid.uuid4().hex}.bin"
+                    if mode == "buffered":
+                        run = lambda: _buffered_upload(client, args.bucket, name, f)  # noqa: E731
+                    else:
+                        run = lambda: _streamed_upload(client, args.bucket, name, f, part_size, known)  # noqa: E731
+                    samples.append(_measure(run))
+                seconds = sorted(s["seconds"] for s in samples)[len(samples) // 2]
+                results["runs"].append({
+                    "size_mb": size_mb,
+                    "mode": mode,
+                    "median_s": seconds,
+                    "throughput_mb_s": round(size_mb / seconds, 1) if seconds else None,
+                    "peak_mb": max(s["peak_mb"] for s in samples),
+                })
+
+    if standin is not None:
+        results["stand_in_requests"] = dict(standin.requests)
+        standin.stop()
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Throughput scaling of the multi-process worker pool from 1 to N workers.
+
+Needs the real models (yolov8n-face.pt, model/model.h5). Each worker count
+starts a fresh pool, waits until every worker is ready, then pushes
+--frames frames through it with enough concurrency to keep all slots busy.
+
+Usage (from backend/):
+    python -m benchmarks.bench_worker_pool --max-workers 8 --frames 400
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import wait
+
+from app.services.worker_pool import WorkerPool
+from app.utils.image_utils import decode_image_bytes
+from benchmarks._common import emit, synthetic_jpeg
+
+
+def _wait_ready(pool: WorkerPool, timeout: float = 300.0):
+    deadline = time.monotonic() + timeout
+    while not all(w.ready for w in pool.workers):
+        if time.monotonic() > deadline:
+            raise RuntimeError("Workers did not become ready")
+        time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=1, help="threads per worker")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--pin-cpus", action="store_true")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    frame = decode_image_bytes(synthetic_jpeg(width, height))
+
+    results = []
+    counts = sorted({1, *range(2, args.max_workers + 1, 2), args.max_workers})
+    for n in counts:
+        pool = WorkerPool(num_workers=n, threads_per_worker=args.threads, pin_cpus=args.pin_cpus,
+                          slot_bytes=frame.nbytes, slots_per_worker=4, submit_timeout=60.0)
+        try:
+            _wait_ready(pool)
+            # Warm-up so graph compilation is not counted
+            wait([pool.submit(frame.copy()) for _ in range(n * 2)])
+
+            started = time.perf_counter()
+            futures = [pool.submit(frame) for _ in range(args.frames)]
+            wait(futures)
+            elapsed = time.perf_counter() - started
+        finally:
+            pool.shutdown()
+
+        fps = args.frames / elapsed
+        results.append({"workers": n, "frames": args.frames, "seconds": round(elapsed, 3), "frames_per_s": round(fps, 2)})
+
+    base = results[0]["frames_per_s"]
+    for r in results:
+        r["speedup"] = round(r["frames_per_s"] / base, 2) if base else None
+    emit({"size": args.size, "threads_per_worker": args.threads, "runs": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
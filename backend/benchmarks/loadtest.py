@@ -0,0 +1,418 @@
+"""
+Load test of the whole backend, in-process and reproducible.
+
+Starts the FastAPI app on uvicorn in a background thread (stub models by
+default, see INFERENCE_BACKEND=stub, so no weights or GPU are needed),
+an in-process S3 stand-in in place of MinIO, and drives the app over
+real HTTP/WebSocket connections with N concurrent clients per scenario:
+
+    upload   POST /predict/from-file, a different image per request
+    webcam   POST /predict/from-file with a session_id per client, frames
+             of a synthetic moving scene at --fps (0 = as fast as possible)
+    ws       /predict/ws, one tracked stream per client, send/receive in turn
+    minio    POST /predict/from-minio on objects seeded into the stand-in
+
+Every (scenario, clients) run reports throughput, p50/p95/p99 latency,
+status codes, RSS (start/peak/end) and process CPU. The clients share the
+process with the server, so CPU includes their (small) share. The JSON
+output is stable (sorted keys) and carries the git commit and settings,
+so results of two commits can be diffed directly.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --clients 1 8 32 --duration 10 --output loadtest.json
+    python -m benchmarks.loadtest --scenarios upload minio --set BATCH_ENABLED=false
+    python -m benchmarks.loadtest --backend onnx --clients 4
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from http.client import HTTPConnection
+from typing import Callable, Dict, List, Optional
+
+from benchmarks._common import configure_env, emit, rss_mb, summarize, synthetic_jpeg
+from benchmarks._s3_standin import S3StandIn
+
+SCENARIOS = ("upload", "webcam", "ws", "minio")
+BUCKET = "loadtest"
+
+
+def _multipart(fields: Dict[str, str], file_bytes: bytes, filename: str = "frame.jpg"):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: image/jpeg\r\n\r\n".encode()
+    )
+    parts.append(file_bytes)
+    parts.append(f"\r\n--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _moving_scene(width: int, height: int, frames: int) -> List[bytes]:
+    """JPEG frames of a textured background with a few slowly moving blobs."""
+    import cv2
+    import numpy as np
+
+    background = cv2.imdecode(np.frombuffer(synthetic_jpeg(width, height, seed=7), np.uint8), cv2.IMREAD_COLOR)
+    side = max(8, min(width, height) // 6)
+    out = []
+    for i in range(frames):
+        frame = background.copy()
+        for k in range(3):
+            x = int((width - side) * (0.5 + 0.4 * np.sin(i / 15.0 + k * 2.1)))
+            y = int((height - side) * (0.5 + 0.4 * np.cos(i / 20.0 + k * 1.7)))
+            cv2.rectangle(frame, (x, y), (x + side, y + side), (40 + 60 * k, 180, 220), -1)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        out.append(buf.tobytes())
+    return out
+
+
+class _Client:
+    """Keep-alive HTTP client for one simulated user."""
+
+    def __init__(self, port: int, token: str):
+        self.conn = HTTPConnection("127.0.0.1", port, timeout=60)
+        self.auth = {"Authorization": f"Bearer {token}"}
+
+    def post(self, path: str, body: bytes, content_type: str) -> int:
+        self.conn.request("POST", path, body=body, headers={**self.auth, "Content-Type": content_type})
+        response = self.conn.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self.conn.close()
+
+
+def _upload_worker(args, images: List[bytes]):
+    def make(client_id: int, client: _Client) -> Callable[[int], int]:
+        fields = {"response_mode": args.response_mode}
+
+        def step(i: int) -> int:
+            body, content_type = _multipart(fields, images[(client_id * 7919 + i) % len(images)])
+            return client.post("/predict/from-file", body, content_type)
+        return step
+    return make
+
+
+def _webcam_worker(args, frames: List[bytes]):
+    def make(client_id: int, client: _Client) -> Callable[[int], int]:
+        fields = {"session_id": f"loadtest-{client_id}-{uuid.uuid4().hex[:8]}", "response_mode": args.response_mode}
+        if args.detect_mode:
+            fields["detect_mode"] = args.detect_mode
+
+        def step(i: int) -> int:
+            body, content_type = _multipart(fields, frames[(client_id * 5 + i) % len(frames)])
+            return client.post("/predict/from-file", body, content_type)
+        return step
+    return make
+
+
+def _minio_worker(args, names: List[str]):
+    def make(client_id: int, client: _Client) -> Callable[[int], int]:
+        def step(i: int) -> int:
+            body = json.dumps({"object_name": names[(client_id * 7919 + i) % len(names)],
+                               "response_mode": args.response_mode}).encode()
+            return client.post("/predict/from-minio", body, "application/json")
+        return step
+    return make
+
+
+def _run_clients(port: int, token: str, clients: int, make_step, duration: float, warmup: int,
+                 fps: float = 0.0, close: Optional[Callable[[int], None]] = None) -> dict:
+    """Run `clients` threads for `duration` seconds; each calls its step function in a loop."""
+    latencies: List[List[float]] = [[] for _ in range(clients)]
+    statuses: List[Dict[str, int]] = [{} for _ in range(clients)]
+    start_at: List[float] = []
+    ready = threading.Barrier(clients + 1, action=lambda: start_at.append(time.perf_counter()))
+
+    def client_loop(client_id: int):
+        client = _Client(port, token)
+        step = None
+        try:
+            try:
+                step = make_step(client_id, client)
+                for i in range(warmup):
+                    step(-1 - i)
+            except Exception:
+                step = None
+            ready.wait()
+            deadline = start_at[0] + duration
+            i = 0
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                try:
+                    if step is None:
+                        step = make_step(client_id, client)
+                    status = str(step(i))
+                except Exception as e:
+                    status = type(e).__name__
+                    client.close()
+                    client = _Client(port, token)
+                    step = None
+                latencies[client_id].append((time.perf_counter() - now) * 1000.0)
+                statuses[client_id][status] = statuses[client_id].get(status, 0) + 1
+                i += 1
+                if fps > 0:
+                    pause = now + 1.0 / fps - time.perf_counter()
+                    if pause > 0:
+                        time.sleep(pause)
+        finally:
+            if close is not None:
+                close(client_id)
+            client.close()
+
+    threads = [threading.Thread(target=client_loop, args=(c,), daemon=True) for c in range(clients)]
+    for t in threads:
+        t.start()
+
+    sampler = _ResourceSampler()
+    ready.wait()
+    sampler.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start_at[0]
+    resources = sampler.stop(elapsed)
+
+    all_latencies = [ms for per_client in latencies for ms in per_client]
+    merged: Dict[str, int] = {}
+    for per_client in statuses:
+        for status, count in per_client.items():
+            merged[status] = merged.get(status, 0) + count
+    ok = merged.get("200", 0)
+    return {
+        "clients": clients,
+        "requests": len(all_latencies),
+        "ok": ok,
+        "errors": len(all_latencies) - ok,
+        "status": merged,
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else None,
+        "latency": summarize(all_latencies),
+        **resources,
+    }
+
+
+class _ResourceSampler:
+    """Peak RSS (sampled every 50 ms) and process CPU time over a run."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.rss_start = self.rss_peak = rss_mb()
+        times = os.times()
+        self.cpu_start = times.user + times.system
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.rss_peak = max(self.rss_peak, rss_mb())
+
+    def stop(self, elapsed: float) -> dict:
+        self._stop.set()
+        self._thread.join()
+        times = os.times()
+        cpu = times.user + times.system - self.cpu_start
+        rss_end = rss_mb()
+        return {
+            "rss_mb": {"start": round(self.rss_start, 1), "peak": round(max(self.rss_peak, rss_end), 1),
+                       "end": round(rss_end, 1)},
+            "cpu_s": round(cpu, 3),
+            "cpu_percent": round(100.0 * cpu / elapsed, 1) if elapsed else None,
+        }
+
+
+def _ws_run(args, port: int, token: str, clients: int, frames: List[bytes]) -> dict:
+    """Tracked WebSocket streams: each client sends a frame and waits for its result."""
+    try:
+        from websockets.sync.client import connect
+    except ImportError:
+        return {"clients": clients, "skipped": "websockets>=11 is not installed"}
+
+    class _WsClient:
+        def __init__(self, client_id: int):
+            query = f"token={token}&session_id=loadtest-ws-{client_id}-{uuid.uuid4().hex[:8]}"
+            if args.detect_mode:
+                query += f"&detect_mode={args.detect_mode}"
+            self.ws = connect(f"ws://127.0.0.1:{port}/predict/ws?{query}", max_size=None)
+            self.ws.recv(timeout=10)  # session message
+
+        def step(self, frame: bytes) -> str:
+            self.ws.send(frame)
+            # Frames the server drops under load are never answered
+            message = json.loads(self.ws.recv(timeout=args.ws_timeout))
+            return "200" if message.get("type") == "result" else "error"
+
+        def close(self):
+            self.ws.close()
+
+    sockets: Dict[int, _WsClient] = {}
+
+    def close(client_id: int):
+        ws = sockets.pop(client_id, None)
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def make(client_id: int, _client: _Client):
+        # Also called after a failed step: reconnect, which starts a new tracker session
+        close(client_id)
+        ws = sockets[client_id] = _WsClient(client_id)
+        return lambda i: ws.step(frames[(client_id * 5 + i) % len(frames)])
+
+    return _run_clients(port, token, clients, make, args.duration, args.warmup, args.fps, close=close)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _start_server(app):
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="on", ws_max_size=64 * 1024 * 1024))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.05)
+    return server, thread, sock.getsockname()[1]
+
+
+def _wait_ready(port: int, timeout: float = 600.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        conn = HTTPConnection("127.0.0.1", port, timeout=10)
+        try:
+            conn.request("GET", "/health/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        time.sleep(0.2)
+    raise RuntimeError("Models did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per (scenario, clients) run")
+    parser.add_argument("--warmup", type=int, default=2, help="Unrecorded requests per client before each run")
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--images", type=int, default=64, help="Distinct images for upload/minio")
+    parser.add_argument("--frames", type=int, default=90, help="Frames in the synthetic webcam scene")
+    parser.add_argument("--fps", type=float, default=15.0, help="Per-client frame rate of webcam/ws (0 = unpaced)")
+    parser.add_argument("--response-mode", default="json")
+    parser.add_argument("--detect-mode", default=None, choices=("every", "adaptive"))
+    parser.add_argument("--ws-timeout", type=float, default=5.0)
+    parser.add_argument("--backend", default="stub", help="INFERENCE_BACKEND (stub needs no weights)")
+    parser.add_argument("--minio-latency-ms", type=float, default=2.0, help="Stand-in latency per object GET")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache on (off by default)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Any other setting, e.g. --set BATCH_ENABLED=false --set INFERENCE_EXECUTOR=workers")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    # The stand-in must be up before app.services.minio_service builds its client
+    standin = S3StandIn(latency_ms=args.minio_latency_ms).start()
+    overrides = {
+        "INFERENCE_BACKEND": args.backend,
+        "MINIO_ENDPOINT": standin.endpoint,
+        "MINIO_BUCKET": BUCKET,
+        "RESULT_CACHE_ENABLED": "true" if args.cache else "false",
+    }
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key.strip()] = value.strip()
+    configure_env(overrides)
+
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.main import app
+
+    width, height = (int(v) for v in args.size.split("x"))
+    images = [synthetic_jpeg(width, height, seed=i) for i in range(args.images)]
+    names = []
+    for i, data in enumerate(images):
+        names.append(f"loadtest/{i:05d}.jpg")
+        standin.put(BUCKET, names[-1], data, content_type="image/jpeg")
+    frames = _moving_scene(width, height, args.frames) if {"webcam", "ws"} & set(args.scenarios) else []
+
+    server, thread, port = _start_server(app)
+    started = time.perf_counter()
+    _wait_ready(port)
+    token = create_access_token({"sub": "loadtest"})
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "ready_s": round(time.perf_counter() - started, 2),
+            "size": args.size,
+            "duration_s": args.duration,
+            "fps": args.fps,
+            "response_mode": args.response_mode,
+            "detect_mode": args.detect_mode or settings.TRACK_DETECT_MODE,
+            "settings": {key: getattr(settings, key, value) for key, value in overrides.items()
+                         if key != "MINIO_ENDPOINT"},
+            "executor": settings.INFERENCE_EXECUTOR,
+            "batching": settings.BATCH_ENABLED,
+        },
+        "runs": [],
+    }
+
+    workers = {
+        "upload": lambda: _upload_worker(args, images),
+        "webcam": lambda: _webcam_worker(args, frames),
+        "minio": lambda: _minio_worker(args, names),
+    }
+    try:
+        for scenario in args.scenarios:
+            for clients in args.clients:
+                if scenario == "ws":
+                    run = _ws_run(args, port, token, clients, frames)
+                else:
+                    fps = args.fps if scenario == "webcam" else 0.0
+                    run = _run_clients(port, token, clients, workers[scenario](), args.duration, args.warmup, fps)
+                run["scenario"] = scenario
+                results["runs"].append(run)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+        results["meta"]["stand_in_requests"] = dict(standin.requests)
+        standin.stop()
+
+    emit(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Track-ID continuity of a webcam session whose frames move between workers.
+
+Starts --workers worker processes (each with its own session manager,
+like uvicorn workers) and a Redis-protocol stand-in they share. Frames of
+--sessions sessions are sent one at a time and hop to the next worker
+every --switch-every frames. Faces follow a script: one appears every few
+frames, moves across the image and leaves again, so every face has a
+known identity. Detections are fed to the tracker directly; mask
+classification runs on the stub model.
+
+Each face should keep one track ID for its whole life. The run is done
+with SESSION_STORE=redis (sessions migrate between workers) and with
+SESSION_STORE=local (each worker tracks on its own copy), and reports
+track-ID switches, migrations and per-frame latency for both.
+
+Usage (from backend/):
+    python -m benchmarks.session_continuity --workers 3 --frames 300 --switch-every 10
+"""
+
+import argparse
+import multiprocessing
+import time
+
+from benchmarks._common import configure_env, emit, summarize
+
+WIDTH, HEIGHT = 640, 480
+
+
+def scripted_faces(frame: int, spawn_every: int = 7, lifetime: int = 45):
+    """(face_id, (x1, y1, x2, y2)) of the faces in view at a frame."""
+    faces = []
+    first = max(0, (frame - lifetime) // spawn_every)
+    for face_id in range(first, frame // spawn_every + 1):
+        age = frame - face_id * spawn_every
+        if not 0 <= age < lifetime:
+            continue
+        lane = face_id % 4
+        x = 20 + age * (WIDTH - 120) / lifetime
+        y = 30 + lane * 110 + 10 * ((face_id * 7) % 3)
+        faces.append((face_id, (x, y, x + 70, y + 80)))
+    return faces
+
+
+def _worker(worker_id: str, env: dict, tasks, results):
+    configure_env({**env, "WORKER_ID": worker_id})
+    import numpy as np
+
+    from app.services import ai_service
+    from app.services.inference_backends import Detections
+    from app.services.model_registry import get_model_registry
+    from app.services.tracker_manager import get_session_manager
+
+    get_model_registry().load()
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    results.put(("ready", worker_id))
+    for session_id, frame in iter(tasks.get, None):
+        boxes = [box for _, box in scripted_faces(frame)]
+        detections = Detections(np.asarray(boxes, dtype=np.float32).reshape(-1, 4), np.full(len(boxes), 0.9))
+        started = time.perf_counter()
+        result = ai_service.detect_and_predict_mask_with_tracking(
+            image, session_id, draw_on_image=False, detections=detections
+        )
+        elapsed = (time.perf_counter() - started) * 1000.0
+        tracks = [(r["track_id"], r["box"]["startX"], r["box"]["startY"]) for r in result["results"]]
+        results.put((session_id, frame, tracks, elapsed))
+    stats = get_session_manager().get_session_stats()
+    results.put(("stats", worker_id, {"migrated_sessions": stats["migrated_sessions"],
+                                      "store_errors": stats["store_errors"]}))
+
+
+def _match(frame: int, tracks):
+    """Map returned tracks to scripted face IDs by nearest top-left corner."""
+    faces = scripted_faces(frame)
+    matched = {}
+    for track_id, x, y in tracks:
+        distance, face_id = min(((abs(x - box[0]) + abs(y - box[1]), face_id) for face_id, box in faces),
+                                default=(None, None))
+        if face_id is not None and distance < 20:
+            matched[face_id] = track_id
+    return matched
+
+
+def _run(store: str, url: str, args) -> dict:
+    env = {
+        "INFERENCE_BACKEND": "stub", "STUB_CLASSIFY_MS": 0, "SESSION_STORE": store, "SESSION_STORE_URL": url,
+        "SESSION_STORE_SECRET": "benchmark-session-secret",
+        "TRACK_DETECT_MODE": "every", "MODEL_PRELOAD": "false",
+    }
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = []
+    for i in range(args.workers):
+        tasks = ctx.Queue()
+        process = ctx.Process(target=_worker, args=(f"worker-{i}", env, tasks, results), daemon=True)
+        process.start()
+        workers.append((process, tasks))
+    for _ in workers:
+        results.get(timeout=120)
+
+    sessions = [f"cam-{s}" for s in range(args.sessions)]
+    face_tracks = {}
+    latencies = []
+    for frame in range(args.frames):
+        for s, session_id in enumerate(sessions):
+            _, tasks = workers[(frame // args.switch_every + s) % args.workers]
+            tasks.put((session_id, frame))
+            _, _, tracks, elapsed = results.get(timeout=60)
+            latencies.append(elapsed)
+            for face_id, track_id in _match(frame, tracks).items():
+                face_tracks.setdefault((session_id, face_id), []).append(track_id)
+
+    for _, tasks in workers:
+        tasks.put(None)
+    migrations = errors = 0
+    for _ in workers:
+        _, _, stats = results.get(timeout=60)
+        migrations += stats["migrated_sessions"]
+        errors += stats["store_errors"]
+    for process, _ in workers:
+        process.join(timeout=10)
+
+    switches = sum(sum(a != b for a, b in zip(ids, ids[1:])) for ids in face_tracks.values())
+    return {
+        "faces": len(face_tracks),
+        "faces_with_one_id": sum(len(set(ids)) == 1 for ids in face_tracks.values()),
+        "id_switches": switches,
+        "migrations": migrations,
+        "store_errors": errors,
+        "frame_ms": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--switch-every", type=int, default=10, help="Frames before a session hops to the next worker")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every store command")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from benchmarks._redis_standin import RedisStandIn
+
+    standin = RedisStandIn(latency_ms=args.latency_ms).start()
+    try:
+        runs = {store: _run(store, standin.url, args) for store in ("redis", "local")}
+    finally:
+        standin.stop()
+    emit({
+        "workers": args.workers,
+        "sessions": args.sessions,
+        "frames": args.frames,
+        "switch_every": args.switch_every,
+        "store_commands": standin.commands,
+        **runs,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
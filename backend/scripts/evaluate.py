@@ -0,0 +1,322 @@
+"""
+Score a labelled image set through the serving pipeline.
+
+Images come from a directory tree or a MinIO prefix; the label of each
+image is its nearest with_mask/ or without_mask/ folder (the training
+dataset layout, see mask-reconize.ipynb). Every image goes through the
+same decode (decode_upload) and detect_and_predict_mask_batch path as
+the API, with the models and backend selected by the usual settings
+(INFERENCE_BACKEND, MASK_CLASSIFIER, DETECT_MAX_SIDE, ...).
+
+Reading is streamed: a pool of --decode-workers threads fetches and
+decodes at most --prefetch images ahead of inference, and decoded images
+are scored in batches of --batch-size (one detector call and one
+classifier call per batch) on --inference-threads threads. Memory stays
+bounded whatever the number of images.
+
+An image is predicted from its faces by --face-rule: the label of the
+largest face (default), or "No Mask" if any face is unmasked. Images
+without a detected face count as "No face" (wrong), unless
+--whole-image-fallback classifies the whole image as one face crop
+(datasets of pre-cropped faces).
+
+Writes a JSON report (accuracy, confusion matrix, per-class precision
+and recall, detection rate, images/s and per-stage time) to --output and
+one CSV row per image to --images.
+
+Usage (from backend/):
+    python -m scripts.evaluate --dataset data --output eval.json
+    python -m scripts.evaluate --minio-prefix datasets/masks/ --batch-size 32 --decode-workers 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.dataset import LABEL_NAMES, label_paths, list_labelled_images, split_dataset
+from app.utils.timing import StageTimer
+
+NO_FACE = "No face"
+PREDICTED = (LABEL_NAMES[1], LABEL_NAMES[0], NO_FACE)
+
+
+def ordered_map(pool: ThreadPoolExecutor, fn: Callable, items: Iterable, window: int) -> Iterator[Tuple]:
+    """
+    Like pool.map, but with at most `window` calls submitted ahead of the consumer.
+
+    Yields:
+        (item, result, error) in input order; error is the exception raised, if any
+    """
+    items = iter(items)
+    pending = deque()
+    for item in items:
+        pending.append((item, pool.submit(fn, item)))
+        if len(pending) >= max(1, window):
+            break
+    while pending:
+        item, future = pending.popleft()
+        following = next(items, None)
+        if following is not None:
+            pending.append((following, pool.submit(fn, following)))
+        try:
+            yield item, future.result(), None
+        except Exception as e:
+            yield item, None, e
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _area(face: dict) -> int:
+    box = face["box"]
+    return (box["endX"] - box["startX"]) * (box["endY"] - box["startY"])
+
+
+def image_prediction(result: dict, rule: str) -> Tuple[str, float]:
+    """(label, confidence) of a whole image from its face results."""
+    faces = result.get("results") or []
+    if not faces:
+        return NO_FACE, 0.0
+    if rule == "any-unmasked":
+        unmasked = [f for f in faces if f["label"] == LABEL_NAMES[0]]
+        chosen = max(unmasked or faces, key=lambda f: f["confidence"])
+    else:
+        chosen = max(faces, key=_area)
+    return chosen["label"], chosen["confidence"]
+
+
+class Evaluator:
+    """
+    Runs batches through the pipeline and accumulates the scores.
+
+    Args:
+        face_rule: "largest" or "any-unmasked"
+        whole_image_fallback: Classify images without a detected face as one crop
+        detect_options: DetectOptions for every image (None = settings)
+    """
+
+    def __init__(self, face_rule: str = "largest", whole_image_fallback: bool = False, detect_options=None):
+        from app.services.model_registry import get_model_registry
+
+        self.face_rule = face_rule
+        self.whole_image_fallback = whole_image_fallback
+        self.detect_options = detect_options
+        self.registry = get_model_registry()
+        # rows: true label (Mask, No Mask), columns: PREDICTED
+        self.confusion = np.zeros((2, len(PREDICTED)), dtype=np.int64)
+        self.stages = {}
+        self.images = 0
+        self.faces = 0
+        self.fallbacks = 0
+        self.errors = 0
+
+    def score_batch(self, batch: List[Tuple[Tuple[str, int], np.ndarray]]) -> Tuple[list, dict]:
+        """
+        Predict one batch of decoded images.
+
+        Returns:
+            (per-image (label, confidence, faces, source) list, stage milliseconds)
+        """
+        from app.services import ai_service
+        from app.services.preprocess import prepare_face_batch
+
+        timer = StageTimer()
+        images = [image for _, image in batch]
+        results = ai_service.detect_and_predict_mask_batch(
+            images, timer=timer, detect_options=[self.detect_options] * len(images)
+        )
+        predictions = [(*image_prediction(r, self.face_rule), r["faces_detected"], "faces") for r in results]
+
+        missing = [i for i, p in enumerate(predictions) if p[0] == NO_FACE]
+        if self.whole_image_fallback and missing:
+            with timer.stage("fallback"):
+                crops = [(images[i], (0, 0, images[i].shape[1], images[i].shape[0])) for i in missing]
+                probs = self.registry.models()[1].predict(prepare_face_batch(crops))
+            for i, (nomask, mask) in zip(missing, probs):
+                label = LABEL_NAMES[1] if mask > nomask else LABEL_NAMES[0]
+                predictions[i] = (label, round(float(max(mask, nomask)), 4), 0, "whole_image")
+        return predictions, timer.stages
+
+    def add(self, true_label: int, prediction: Optional[tuple]):
+        if prediction is None:
+            self.errors += 1
+            return
+        label, _, faces, source = prediction
+        self.images += 1
+        self.faces += faces
+        self.fallbacks += source == "whole_image"
+        self.confusion[1 - true_label, PREDICTED.index(label)] += 1
+
+    def add_stages(self, stages: dict):
+        for name, ms in stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def report(self, elapsed_s: float) -> dict:
+        cm = self.confusion
+        total = int(cm.sum())
+        correct = int(cm[0, 0] + cm[1, 1])
+        detected = int(cm[:, :2].sum())
+        per_class = {}
+        for i, name in enumerate(PREDICTED[:2]):
+            tp, predicted, actual = int(cm[i, i]), int(cm[:, i].sum()), int(cm[i].sum())
+            precision = tp / predicted if predicted else None
+            recall = tp / actual if actual else None
+            f1 = 2 * precision * recall / (precision + recall) if precision and recall else None
+            per_class[name] = {
+                "support": actual,
+                "precision": round(precision, 4) if precision is not None else None,
+                "recall": round(recall, 4) if recall is not None else None,
+                "f1": round(f1, 4) if f1 is not None else None,
+            }
+        return {
+            "images": self.images,
+            "errors": self.errors,
+            "accuracy": round(correct / total, 4) if total else None,
+            "accuracy_detected": round(correct / detected, 4) if detected else None,
+            "detection_rate": round((detected - self.fallbacks) / total, 4) if total else None,
+            "whole_image_fallbacks": self.fallbacks,
+            "faces": self.faces,
+            "confusion_matrix": {
+                "rows": list(PREDICTED[:2]),
+                "columns": list(PREDICTED),
+                "counts": cm.tolist(),
+            },
+            "per_class": per_class,
+            "elapsed_s": round(elapsed_s, 3),
+            "images_per_s": round(self.images / elapsed_s, 1) if elapsed_s else None,
+            "stage_ms_per_image": {k: round(v / self.images, 3) for k, v in self.stages.items()} if self.images else {},
+        }
+
+
+def _sources(args) -> Tuple[List[Tuple[str, int]], Callable[[str], bytes]]:
+    """Labelled items and a function returning the bytes of one."""
+    if args.minio_prefix is not None:
+        from app.services import minio_service
+
+        bucket = args.bucket
+        items = label_paths(minio_service.list_object_names(bucket, prefix=args.minio_prefix))
+        return items, lambda name: minio_service.get_object_bytes(bucket, name)
+
+    def read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    return list_labelled_images(args.dataset), read
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dataset", help="root with with_mask/ and without_mask/ folders (any depth)")
+    source.add_argument("--minio-prefix", help="object prefix with with_mask/ and without_mask/ folders")
+    parser.add_argument("--bucket", default=None, help="MinIO bucket (default: MINIO_BUCKET)")
+    parser.add_argument("--split", choices=["all", "holdout"], default="all",
+                        help="holdout: only the split quantize_classifier.py does not calibrate on")
+    parser.add_argument("--seed", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=0, help="cap on images (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--decode-workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--prefetch", type=int, default=256, help="images fetched/decoded ahead of inference")
+    parser.add_argument("--inference-threads", type=int, default=1)
+    parser.add_argument("--face-rule", choices=["largest", "any-unmasked"], default="largest")
+    parser.add_argument("--whole-image-fallback", action="store_true")
+    parser.add_argument("--detect-max-side", type=int, default=None)
+    parser.add_argument("--min-face-size", type=int, default=None)
+    parser.add_argument("--output", default="evaluation.json")
+    parser.add_argument("--images", default=None, help="per-image CSV (default: <output>.images.csv)")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    from app.services.ai_service import decode_upload
+    from app.services.detection import parse_detect_options
+
+    args.bucket = args.bucket or settings.MINIO_BUCKET
+    try:
+        detect_options = parse_detect_options(args.detect_max_side, args.min_face_size, None)
+    except ValueError as e:
+        parser.error(str(e))
+
+    items, fetch = _sources(args)
+    if args.split == "holdout":
+        _, items = split_dataset(items, seed=args.seed)
+        items.sort()
+    if args.limit:
+        items = items[:args.limit]
+    if not items:
+        raise SystemExit("No labelled images found")
+
+    evaluator = Evaluator(args.face_rule, args.whole_image_fallback, detect_options)
+    started = time.perf_counter()
+    evaluator.registry.load()
+    load_s = time.perf_counter() - started
+
+    def load(item):
+        return decode_upload(fetch(item[0]))
+
+    images_path = args.images or os.path.splitext(args.output)[0] + ".images.csv"
+    started = time.perf_counter()
+    with open(images_path, "w", newline="", encoding="utf-8") as f, \
+            ThreadPoolExecutor(max(1, args.decode_workers), thread_name_prefix="eval-decode") as decode_pool, \
+            ThreadPoolExecutor(max(1, args.inference_threads), thread_name_prefix="eval-infer") as infer_pool:
+        writer = csv.writer(f)
+        writer.writerow(["path", "label", "predicted", "confidence", "faces", "source", "error"])
+
+        def decoded() -> Iterator[Tuple[Tuple[str, int], np.ndarray]]:
+            for item, image, error in ordered_map(decode_pool, load, items, args.prefetch):
+                if error is not None:
+                    evaluator.add(item[1], None)
+                    writer.writerow([item[0], LABEL_NAMES[item[1]], "", "", "", "", str(error) or type(error).__name__])
+                    continue
+                yield item, image
+
+        batches = batched(decoded(), max(1, args.batch_size))
+        for batch, scored, error in ordered_map(infer_pool, evaluator.score_batch, batches, args.inference_threads * 2):
+            if error is not None:
+                for item, _ in batch:
+                    evaluator.add(item[1], None)
+                    writer.writerow([item[0], LABEL_NAMES[item[1]], "", "", "", "", str(error) or type(error).__name__])
+                continue
+            predictions, stages = scored
+            evaluator.add_stages(stages)
+            for (item, _), prediction in zip(batch, predictions):
+                evaluator.add(item[1], prediction)
+                label, confidence, faces, source = prediction
+                writer.writerow([item[0], LABEL_NAMES[item[1]], label, confidence, faces, source, ""])
+    elapsed = time.perf_counter() - started
+
+    report = evaluator.report(elapsed)
+    report.update({
+        "source": args.dataset or f"minio://{args.bucket}/{args.minio_prefix}",
+        "split": args.split,
+        "backend": settings.INFERENCE_BACKEND,
+        "classifier": settings.MASK_CLASSIFIER or settings.INFERENCE_BACKEND,
+        "face_rule": args.face_rule,
+        "batch_size": args.batch_size,
+        "decode_workers": args.decode_workers,
+        "inference_threads": args.inference_threads,
+        "model_load_s": round(load_s, 2),
+        "images_file": images_path,
+    })
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({k: report[k] for k in ("images", "errors", "accuracy", "detection_rate", "images_per_s")}))
+    print(f"Report written to {args.output}, per-image results to {images_path}")
+
+
+if __name__ == "__main__":
+    main()
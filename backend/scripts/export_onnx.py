@@ -0,0 +1,55 @@
+"""
+Export the face detector and the mask classifier to ONNX for INFERENCE_BACKEND=onnx.
+
+Needs the export-only packages on top of requirements.txt:
+    pip install onnx onnxslim tf2onnx
+
+Usage (from backend/):
+    python -m scripts.export_onnx --yolo yolov8n-face.pt --mask model/model.h5 --out-dir model
+"""
+
+import argparse
+import os
+import shutil
+
+
+def export_detector(weights: str, out_path: str, imgsz: int):
+    from ultralytics import YOLO
+
+    exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(out_path):
+        shutil.move(exported, out_path)
+    print(f"Detector exported to {out_path}")
+
+
+def export_classifier(h5_path: str, out_path: str, opset: int):
+    import tensorflow as tf
+    import tf2onnx
+    from tensorflow.keras.models import load_model
+
+    model = load_model(h5_path)
+    spec = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=out_path)
+    print(f"Classifier exported to {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--yolo", default="yolov8n-face.pt")
+    parser.add_argument("--mask", default=os.path.join("model", "model.h5"))
+    parser.add_argument("--out-dir", default="model")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--opset", type=int, default=13)
+    parser.add_argument("--skip-detector", action="store_true")
+    parser.add_argument("--skip-classifier", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    if not args.skip_detector:
+        export_detector(args.yolo, os.path.join(args.out_dir, "yolov8n-face.onnx"), args.imgsz)
+    if not args.skip_classifier:
+        export_classifier(args.mask, os.path.join(args.out_dir, "model.onnx"), args.opset)
+
+
+if __name__ == "__main__":
+    main()
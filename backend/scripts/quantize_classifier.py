@@ -0,0 +1,90 @@
+"""
+Post-training INT8 quantization of the mask classifier with ONNX Runtime.
+
+Starts from the float ONNX export (scripts/export_onnx.py), calibrates
+activation ranges on face crops from the training split of the dataset
+(root/with_mask, root/without_mask) and writes a QDQ model with per-channel
+INT8 weights. Runs offline on CPU; select the result with
+MASK_CLASSIFIER=onnx-int8.
+
+Usage (from backend/):
+    python -m scripts.quantize_classifier --dataset data --float model/model.onnx --out model/model_int8.onnx
+"""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from app.utils.dataset import list_labelled_images, load_face_crop, split_dataset
+
+
+class _CropReader:
+    """CalibrationDataReader over preprocessed face crops."""
+
+    def __init__(self, input_name: str, paths, batch_size: int):
+        self.input_name = input_name
+        self.paths = paths
+        self.batch_size = batch_size
+        self._offset = 0
+
+    def get_next(self):
+        if self._offset >= len(self.paths):
+            return None
+        chunk = self.paths[self._offset:self._offset + self.batch_size]
+        self._offset += self.batch_size
+        return {self.input_name: np.stack([load_face_crop(p) for p in chunk])}
+
+    def rewind(self):
+        self._offset = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", required=True, help="root with with_mask/ and without_mask/")
+    parser.add_argument("--float", dest="float_path", default=os.path.join("model", "model.onnx"))
+    parser.add_argument("--out", default=os.path.join("model", "model_int8.onnx"))
+    parser.add_argument("--calib-size", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--method", choices=["minmax", "entropy", "percentile"], default="percentile")
+    parser.add_argument("--seed", type=int, default=2)
+    args = parser.parse_args()
+
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    train, _ = split_dataset(list_labelled_images(args.dataset), seed=args.seed)
+    if not train:
+        raise SystemExit(f"No labelled images found under {args.dataset}")
+    # Balanced calibration subset
+    per_label = args.calib_size // 2
+    calib = [p for p, y in train if y == 1][:per_label] + [p for p, y in train if y == 0][:per_label]
+
+    input_name = ort.InferenceSession(args.float_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    methods = {
+        "minmax": CalibrationMethod.MinMax,
+        "entropy": CalibrationMethod.Entropy,
+        "percentile": CalibrationMethod.Percentile,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "model_prep.onnx")
+        quant_pre_process(args.float_path, prepared)
+        quantize_static(
+            prepared,
+            args.out,
+            _CropReader(input_name, calib, args.batch_size),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=methods[args.method],
+        )
+
+    print(f"Calibrated on {len(calib)} crops; INT8 model written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
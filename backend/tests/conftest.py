@@ -0,0 +1,23 @@
+"""
+Shared test setup.
+
+App settings come from the environment, so required secrets get throwaway
+values before any app module is imported. Tests cover the pure-Python
+parts of the backend and run without model weights.
+
+Run from backend/:
+    python -m pytest
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("MINIO_ACCESS_KEY", "minioadmin")
+os.environ.setdefault("MINIO_SECRET_KEY", "minioadmin")
+os.environ.setdefault("INFERENCE_BACKEND", "stub")
+os.environ.setdefault("MODEL_PRELOAD", "false")
@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services.inference_backends import (
+    Detections,
+    KerasClassifier,
+    OnnxClassifier,
+    OnnxDetector,
+    UltralyticsDetector,
+    classifier_path,
+    detector_path,
+)
+from app.services.preprocess import FaceBatchBuffer, prepare_face_batch
+
+
+def _detector(dynamic=False, num_classes=1, iou=0.7, max_det=300):
+    """OnnxDetector with only the attributes pre/post-processing read, no session."""
+    detector = OnnxDetector.__new__(OnnxDetector)
+    detector.dynamic = dynamic
+    detector.num_classes = num_classes
+    detector.iou = iou
+    detector.max_det = max_det
+    return detector
+
+
+def _raw_output(rows):
+    """YOLOv8 head output (4 + nc, anchors) from (cx, cy, w, h, score...) rows."""
+    return np.asarray(rows, dtype=np.float32).T
+
+
+def test_detections_xywh_and_indexing():
+    dets = Detections([[10, 20, 50, 80], [0, 0, 4, 2]], [0.9, 0.6])
+    np.testing.assert_array_equal(dets.xywh, [[30, 50, 40, 60], [2, 1, 4, 2]])
+    np.testing.assert_array_equal(dets.cls, [0, 0])
+    high = dets[dets.conf > 0.7]
+    assert len(high) == 1
+    np.testing.assert_array_equal(high.xyxy, [[10, 20, 50, 80]])
+    assert len(Detections(np.empty((0, 4)), np.empty(0))) == 0
+
+
+def test_letterbox_fixed_shape_pads_to_square():
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    image[..., 0] = 255  # blue in BGR
+    blob, r, left, top = _detector()._letterbox(image, 640)
+
+    assert blob.shape == (1, 3, 640, 640)
+    assert (r, left, top) == (1.0, 0, 80)
+    np.testing.assert_allclose(blob[0, :, :80], 114 / 255.0, atol=1e-6)
+    # Channels come out RGB: the blue input lands in the last plane
+    assert blob[0, :2, 80:560].max() == 0.0
+    assert blob[0, 2, 80:560].min() == 1.0
+
+
+def test_letterbox_dynamic_pads_to_stride():
+    blob, r, left, top = _detector(dynamic=True)._letterbox(np.zeros((1000, 1280, 3), dtype=np.uint8), 640)
+    # 1280x1000 -> 640x500, padded to the next multiple of 32 only
+    assert blob.shape == (1, 3, 512, 640)
+    assert (r, left, top) == (0.5, 0, 6)
+
+
+def test_postprocess_filters_suppresses_and_maps_back():
+    output = _raw_output([
+        [100, 200, 40, 60, 0.9],
+        [102, 201, 40, 60, 0.8],  # overlaps the first: suppressed
+        [400, 300, 20, 20, 0.6],
+        [500, 500, 30, 30, 0.3],  # below conf
+    ])
+    dets = _detector()._postprocess(output, r=0.5, left=0, top=80, shape=(960, 1280, 3), conf=0.5)
+
+    assert len(dets) == 2
+    np.testing.assert_allclose(dets.conf, [0.9, 0.6])
+    np.testing.assert_allclose(dets.xyxy, [[160, 180, 240, 300], [780, 420, 820, 460]])
+
+
+def test_postprocess_clips_to_image_and_picks_class():
+    output = _raw_output([[5, 85, 40, 40, 0.2, 0.7]])
+    dets = _detector(num_classes=2)._postprocess(output, r=1.0, left=0, top=80, shape=(480, 640, 3), conf=0.5)
+    np.testing.assert_allclose(dets.xyxy, [[0, 0, 25, 25]])
+    np.testing.assert_allclose(dets.conf, [0.7])
+    np.testing.assert_array_equal(dets.cls, [1])
+
+
+def test_postprocess_without_detections():
+    dets = _detector()._postprocess(_raw_output([[10, 10, 5, 5, 0.1]]), 1.0, 0, 0, (64, 64, 3), conf=0.5)
+    assert len(dets) == 0
+    assert dets.xyxy.shape == (0, 4)
+
+
+def test_postprocess_max_det():
+    rows = [[50 + 100 * i, 50, 20, 20, 0.9 - 0.01 * i] for i in range(6)]
+    dets = _detector(max_det=4)._postprocess(_raw_output(rows), 1.0, 0, 0, (640, 640, 3), conf=0.5)
+    np.testing.assert_allclose(dets.conf, [0.9, 0.89, 0.88, 0.87], atol=1e-6)
+
+
+def _require_models(*paths):
+    for path in paths:
+        if not os.path.exists(path):
+            pytest.skip(f"{path} not available")
+
+
+def test_onnx_classifier_matches_keras():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tensorflow")
+    _require_models(classifier_path("keras"), classifier_path("onnx"))
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    crops = [(frame, (x, 40, x + 90, 150)) for x in range(0, 500, 50)]
+    faces = prepare_face_batch(crops, FaceBatchBuffer()).copy()
+
+    keras = KerasClassifier(classifier_path("keras")).predict(faces)
+    onnx = OnnxClassifier(classifier_path("onnx")).predict(faces)
+    np.testing.assert_allclose(onnx, keras, atol=1e-4)
+    np.testing.assert_array_equal(onnx.argmax(axis=1), keras.argmax(axis=1))
+
+
+def test_onnx_detector_matches_ultralytics():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("ultralytics")
+    _require_models(detector_path("native"), detector_path("onnx"))
+
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)]
+    native = UltralyticsDetector(detector_path("native")).detect(images, conf=0.25)[0]
+    onnx = OnnxDetector(detector_path("onnx")).detect(images, conf=0.25)[0]
+    assert len(onnx) == len(native)
+    np.testing.assert_allclose(onnx.xyxy, native.xyxy, atol=1.0)
+    np.testing.assert_allclose(onnx.conf, native.conf, atol=1e-3)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.services.preprocess import FACE_SIZE, FaceBatchBuffer, clip_boxes, motion_thumbnail, prepare_face_batch
+from benchmarks.bench_preprocess import legacy_preprocess, random_boxes
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("n", [1, 7, 40])
+def test_batch_matches_legacy_per_face_loop(frame, n):
+    boxes, _ = clip_boxes(random_boxes(n, 640, 480, np.random.default_rng(n)), 640, 480)
+    box_list = [tuple(b) for b in boxes.tolist()]
+
+    batch = prepare_face_batch([(frame, b) for b in box_list], FaceBatchBuffer(capacity=4))
+    legacy = legacy_preprocess(frame, box_list)
+
+    assert batch.shape == legacy.shape == (len(box_list), FACE_SIZE, FACE_SIZE, 3)
+    assert batch.dtype == np.float32
+    # Same resize and channel order; only the float32 scaling differs from the float64 division
+    np.testing.assert_allclose(batch, legacy, rtol=0, atol=1e-6)
+
+
+def test_faces_from_different_frames(frame):
+    other = frame[::-1, ::-1].copy()
+    box = (10, 20, 110, 140)
+    batch = prepare_face_batch([(frame, box), (other, box)], FaceBatchBuffer())
+    np.testing.assert_allclose(batch[0], legacy_preprocess(frame, [box])[0], atol=1e-6)
+    np.testing.assert_allclose(batch[1], legacy_preprocess(other, [box])[0], atol=1e-6)
+
+
+def test_channel_order_is_rgb():
+    image = np.zeros((50, 50, 3), dtype=np.uint8)
+    image[..., 0] = 255  # blue in BGR
+    batch = prepare_face_batch([(image, (0, 0, 50, 50))], FaceBatchBuffer())
+    assert batch[0, ..., 2].min() == 1.0
+    assert batch[0, ..., :2].max() == 0.0
+
+
+def test_buffer_grows_and_is_reused(frame):
+    buffer = FaceBatchBuffer(capacity=2)
+    crops = [(frame, (i, i, i + 60, i + 60)) for i in range(5)]
+    batch = prepare_face_batch(crops, buffer)
+    assert buffer.capacity == 8
+    assert np.shares_memory(batch, buffer.batch)
+
+    batch = prepare_face_batch(crops[:3], buffer)
+    assert buffer.capacity == 8
+    assert batch.shape[0] == 3
+
+
+def test_empty_batch():
+    assert prepare_face_batch([], FaceBatchBuffer()).shape == (0, FACE_SIZE, FACE_SIZE, 3)
+
+
+def test_clip_boxes():
+    boxes, keep = clip_boxes(np.array([
+        [-5.7, -3.2, 50.9, 60.1],  # clipped at the top-left
+        [600, 400, 700, 500],  # clipped at the bottom-right
+        [30, 30, 30, 80],  # zero width
+        [700, 10, 800, 50],  # entirely outside
+    ]), 640, 480)
+    assert keep.tolist() == [True, True, False, False]
+    assert boxes.tolist() == [[0, 0, 50, 60], [600, 400, 639, 479]]
+    assert clip_boxes(np.empty((0, 4)), 640, 480)[0].shape == (0, 4)
+
+
+def test_motion_thumbnail(frame):
+    thumb = motion_thumbnail(frame, width=64)
+    assert thumb.shape == (48, 64)
+    assert thumb.dtype == np.uint8
@@ -0,0 +1,142 @@
+import io
+
+import pytest
+
+from app.services.detection import DetectOptions
+from app.services.session_store import (
+    HashRing,
+    MemorySessionStore,
+    RedisSessionStore,
+    SessionStore,
+    SessionStoreError,
+    _RespConnection,
+    create_session_store,
+)
+from benchmarks._redis_standin import RedisStandIn
+
+
+def _reply(raw: bytes):
+    conn = _RespConnection.__new__(_RespConnection)
+    conn.reader = io.BytesIO(raw)
+    return conn._reply()
+
+
+def test_resp_encode_command():
+    assert _RespConnection._encode(("SET", "k", b"\x00v", "PX", 1500)) == (
+        b"*5\r\n$3\r\nSET\r\n$1\r\nk\r\n$2\r\n\x00v\r\n$2\r\nPX\r\n$4\r\n1500\r\n"
+    )
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (b"+OK\r\n", b"OK"),
+    (b":42\r\n", 42),
+    (b"$5\r\nhe\r\nl\r\n", b"he\r\nl"),
+    (b"$0\r\n\r\n", b""),
+    (b"$-1\r\n", None),
+    (b"*-1\r\n", None),
+    (b"*3\r\n:1\r\n$1\r\na\r\n$-1\r\n", [1, b"a", None]),
+])
+def test_resp_replies(raw, expected):
+    assert _reply(raw) == expected
+
+
+def test_resp_error_reply_is_returned_not_raised():
+    reply = _reply(b"-WRONGTYPE bad key\r\n")
+    assert isinstance(reply, SessionStoreError)
+    assert "WRONGTYPE" in str(reply)
+
+
+@pytest.mark.parametrize("raw", [b"", b"$10\r\nshort\r\n", b"+OK"])
+def test_resp_truncated_reply(raw):
+    with pytest.raises(ConnectionError):
+        _reply(raw)
+
+
+def test_resp_unexpected_reply():
+    with pytest.raises(SessionStoreError):
+        _reply(b"?what\r\n")
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_create_session_store():
+    assert create_session_store("local") is None
+    assert isinstance(create_session_store("memory"), MemorySessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("etcd")
+
+
+def test_memory_store_round_trip_and_expiry():
+    store = MemorySessionStore()
+    store.save("cam", b"snapshot", ("worker-1", 7), ttl=60)
+    assert store.get_meta("cam") == ("worker-1", 7)
+    assert store.load("cam") == b"snapshot"
+    store.save("old", b"x", ("worker-1", 1), ttl=-1)
+    assert store.load("old") is None and store.get_meta("old") is None
+    store.delete("cam")
+    assert store.load("cam") is None
+
+
+def test_redis_store_against_standin():
+    standin = RedisStandIn().start()
+    try:
+        store = RedisSessionStore(standin.url)
+        assert store.get_meta("cam") is None
+        store.save("cam", b"\x00\r\nsnapshot", ("worker:a\nb", 12), ttl=60)
+        assert store.get_meta("cam") == ("worker:a\nb", 12)
+        assert store.load("cam") == b"\x00\r\nsnapshot"
+        store.delete("cam")
+        assert store.load("cam") is None
+        store.close()
+    finally:
+        standin.stop()
+
+
+def test_redis_store_rejects_other_schemes():
+    with pytest.raises(ValueError):
+        RedisSessionStore("http://localhost:6379/0")
+
+
+def test_hash_ring_is_deterministic_and_balanced():
+    ring = HashRing(["w1", "w2", "w3"])
+    keys = [f"session-{i}" for i in range(3000)]
+    owners = [ring.node_for(key) for key in keys]
+    assert owners == [HashRing(["w3", "w1", "w2"]).node_for(key) for key in keys]
+    counts = {node: owners.count(node) for node in ring.nodes}
+    assert set(counts) == {"w1", "w2", "w3"}
+    assert min(counts.values()) > 3000 / 3 * 0.6
+
+
+def test_hash_ring_moves_only_the_removed_workers_keys():
+    keys = [f"session-{i}" for i in range(3000)]
+    before = HashRing(["w1", "w2", "w3"])
+    after = HashRing(["w1", "w2"])
+    for key in keys:
+        if before.node_for(key) != "w3":
+            assert after.node_for(key) == before.node_for(key)
+
+
+def test_hash_ring_without_nodes():
+    assert HashRing([]).node_for("session") is None
+
+
+def test_detect_options_json_round_trip():
+    options = DetectOptions(max_side=640, min_face=24,
+                            roi=(((0.1, 0.1), (0.9, 0.1), (0.5, 0.9)), ((0.0, 0.0), (0.2, 0.0), (0.2, 0.2))))
+    assert DetectOptions.from_json(options.to_json()) == options
+    assert DetectOptions.from_json(DetectOptions().to_json()) == DetectOptions()
+
+
+@pytest.mark.parametrize("text", [
+    "not json",
+    "[1, 2]",
+    '{"max_side": 8}',
+    '{"roi": [[[0.1, 0.1], [0.2, 0.2]]]}',
+    '{"roi": [[[0.1, 0.1, 0.3], [0.2, 0.2], [0.3, 0.3]]]}',
+])
+def test_detect_options_from_invalid_json(text):
+    with pytest.raises(ValueError):
+        DetectOptions.from_json(text)
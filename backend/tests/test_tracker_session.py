@@ -0,0 +1,172 @@
+import pickle
+import random
+from collections import deque
+
+import numpy as np
+import pytest
+
+from app.services.detection import DetectOptions
+from app.services.tracker_manager import LABELS, TrackerSession, _snapshot_digest
+
+KEY = b"k" * 32
+
+
+def _naive_smoothed(history):
+    """Majority vote over a plain deque; ties go to the oldest label."""
+    if not history:
+        return "Unknown", 0.0
+    votes = {label: [c for l, c in history if l == label] for label in LABELS}
+    counts = {label: len(confs) for label, confs in votes.items()}
+    if counts[LABELS[0]] != counts[LABELS[1]]:
+        winner = max(counts, key=counts.get)
+    else:
+        winner = history[0][0]
+    return winner, sum(votes[winner]) / len(votes[winner])
+
+
+@pytest.mark.parametrize("history_size", [1, 2, 5, 8])
+def test_ring_buffer_votes_match_naive_history(history_size):
+    rng = random.Random(history_size)
+    session = TrackerSession(history_size=history_size, capacity=2)
+    reference = {}
+    for _ in range(2000):
+        track_id = rng.randrange(12)
+        label, confidence = rng.choice(LABELS), rng.random()
+        session.update_track(track_id, label, confidence)
+        reference.setdefault(track_id, deque(maxlen=history_size)).append((label, confidence))
+        expected_label, expected_conf = _naive_smoothed(reference[track_id])
+        label, confidence = session.get_smoothed_prediction(track_id)
+        assert label == expected_label
+        assert confidence == pytest.approx(expected_conf, abs=1e-9)
+
+
+def test_tie_goes_to_oldest_prediction():
+    session = TrackerSession(history_size=4)
+    for label in ("No Mask", "Mask", "Mask", "No Mask"):
+        session.update_track(1, label, 0.5)
+    assert session.get_smoothed_prediction(1)[0] == "No Mask"
+    # Evicts the oldest "No Mask": Mask, Mask, No Mask, Mask
+    session.update_track(1, "Mask", 0.9)
+    assert session.get_smoothed_prediction(1) == ("Mask", pytest.approx((0.5 + 0.5 + 0.9) / 3))
+
+
+def test_unknown_track():
+    assert TrackerSession().get_smoothed_prediction(42) == ("Unknown", 0.0)
+
+
+def test_needs_classification_cache():
+    session = TrackerSession(history_size=5)
+    assert session.needs_classification(1, 100.0)
+    for _ in range(3):
+        session.update_track(1, "Mask", 0.95)
+    session.mark_classified(1, 100.0)
+
+    assert not session.needs_classification(1, 100.0, min_history=3)
+    assert session.needs_classification(1, 100.0, min_history=4)
+    assert session.needs_classification(1, 140.0, max_scale_change=0.3)
+    assert session.needs_classification(1, 100.0, min_confidence=0.96)
+
+    for _ in range(3):
+        session.mark_cached(1)
+    assert session.needs_classification(1, 100.0, max_age=3)
+    assert not session.needs_classification(1, 100.0, max_age=4)
+    assert (session.cache_hits, session.cache_misses) == (3, 1)
+
+
+def test_prune_stale_recycles_slots():
+    session = TrackerSession(history_size=3, capacity=4)
+    for track_id in range(4):
+        session.update_track(track_id, "Mask", 0.9)
+    for _ in range(10):
+        session.frames_seen += 1
+        session.mark_seen(0)
+
+    assert session.prune_stale(8) == 3
+    assert session.track_count == 1
+    assert session.get_smoothed_prediction(1) == ("Unknown", 0.0)
+
+    # A new track reuses a freed slot and starts from an empty history
+    session.update_track(99, "No Mask", 0.7)
+    assert session._capacity == 4
+    assert session.get_smoothed_prediction(99) == ("No Mask", pytest.approx(0.7))
+    assert session.needs_classification(99, 100.0)
+
+
+def _populated_session():
+    session = TrackerSession(history_size=4, tracker={"frame": 5}, capacity=2)
+    rng = random.Random(7)
+    for _ in range(60):
+        session.frames_seen += 1
+        session.update_track(rng.randrange(5), rng.choice(LABELS), rng.random())
+    session.mark_classified(2, 321.0)
+    session.mark_cached(2)
+    session.detect_mode = "adaptive"
+    session.detect_interval = 3
+    session.detect_options = DetectOptions(max_side=480, min_face=16,
+                                           roi=(((0.0, 0.0), (1.0, 0.0), (0.5, 1.0)),))
+    session._motion_reference = np.arange(48, dtype=np.uint8).reshape(6, 8)
+    return session
+
+
+def test_snapshot_round_trip():
+    session = _populated_session()
+    restored = TrackerSession.restore(session.snapshot(key=KEY), key=KEY)
+
+    assert restored.tracker == {"frame": 5}
+    assert restored.history_size == session.history_size
+    assert restored.detect_mode == "adaptive"
+    assert restored.detect_interval == 3
+    assert restored.detect_options == session.detect_options
+    assert restored.frames_seen == session.frames_seen
+    assert (restored.cache_hits, restored.cache_misses) == (session.cache_hits, session.cache_misses)
+    np.testing.assert_array_equal(restored._motion_reference, session._motion_reference)
+    assert sorted(restored._slots) == sorted(session._slots)
+    for track_id in session._slots:
+        assert restored.get_smoothed_prediction(track_id) == session.get_smoothed_prediction(track_id)
+        assert restored.needs_classification(track_id, 321.0) == session.needs_classification(track_id, 321.0)
+
+    # The restored ring buffers keep evicting in the same order
+    for _ in range(5):
+        session.update_track(0, "No Mask", 0.6)
+        restored.update_track(0, "No Mask", 0.6)
+        assert restored.get_smoothed_prediction(0) == session.get_smoothed_prediction(0)
+
+
+def test_snapshot_of_empty_session():
+    restored = TrackerSession.restore(TrackerSession(history_size=3).snapshot(key=KEY), key=KEY)
+    assert restored.track_count == 0
+    assert restored.tracker is None
+    assert restored.detect_options is None
+    assert restored._motion_reference is None
+
+
+def _refuse(data):
+    raise AssertionError("tracker state deserialized from an unauthenticated snapshot")
+
+
+def test_restore_rejects_wrong_key():
+    data = _populated_session().snapshot(key=KEY)
+    with pytest.raises(ValueError, match="authentication"):
+        TrackerSession.restore(data, _refuse, key=b"another deployment")
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda data: data[:40] + bytes([data[40] ^ 1]) + data[41:],
+    lambda data: data[:-1] + bytes([data[-1] ^ 1]),
+    lambda data: data[:-5],
+])
+def test_restore_rejects_tampered_snapshot(tamper):
+    data = _populated_session().snapshot(key=KEY)
+    with pytest.raises(ValueError, match="authentication"):
+        TrackerSession.restore(tamper(data), _refuse, key=KEY)
+
+
+def test_restore_rejects_truncated_snapshot():
+    with pytest.raises(ValueError, match="Truncated"):
+        TrackerSession.restore(b"FMTS\x02", _refuse, key=KEY)
+
+
+def test_restore_rejects_signed_foreign_format():
+    body = pickle.dumps({"not": "a snapshot"}).ljust(128, b"\0")
+    with pytest.raises(ValueError, match="Unsupported"):
+        TrackerSession.restore(body + _snapshot_digest(KEY, body), _refuse, key=KEY)